@@ -1,7 +1,7 @@
 # CodeFileCopier.py
 # Versão 2.0 - Implementação completa com todas as melhorias
 # Compatível com Python 3.8+ e wxPython 4.2+
-# Dependências opcionais: pathspec (para .gitignore avançado)
+# Sem dependências além do wxPython (.gitignore via gitwildmatch.py, nativo)
 #
 # Melhorias implementadas:
 # - Correção: arquivos sem extensão (_get_ext_label)
@@ -20,25 +20,39 @@
 
 import wx
 import wx.html
+import io
 import os
 import re
 import threading
 import json
 import datetime
-import fnmatch
-
-# Tentar importar pathspec para suporte avançado a .gitignore
-try:
-    import pathspec
-    HAS_PATHSPEC = True
-except ImportError:
-    HAS_PATHSPEC = False
+import time
+from functools import partial
+
+from block_pool import ordered_batches, resolve_jobs
+from compressed_output import compression_for, open_input
+from content_probe import FactStore, deep_scan
+from git_index import GitIndexError, tracked_files
+from gitignore_tree import GitignoreTree
+from ignore_matcher import IgnoreMatcher
+from inotify_watcher import InotifyWatcher
+from line_counter import LineCounter
+from output_format import DEFAULT_FORMAT, FORMATS, get_format
+from passthrough import PassthroughBlock, utf8_span
+from read_ahead import DEFAULT_MAX_BYTES, file_size, ordered_map
+from scan_index import ScanIndex
+from selection_tree import CHECKED, SelectionSet, SelectionTree
+from shard_writer import BYTES_PER_TOKEN, ShardWriter, budget_bytes
+from token_counter import TokenCounter, load_tokenizer
+from walker import walk_files
 
 # ---------------------------------------------------------------------------
 # CONSTANTES GLOBAIS
 # ---------------------------------------------------------------------------
 
 CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.json")
+# Contagens de tokens por hash de conteúdo, entre sessões
+TOKEN_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "token_cache.json")
 
 # Padrões de exclusão globais aplicados durante a varredura
 IGNORE_PATTERNS = [
@@ -48,9 +62,20 @@ IGNORE_PATTERNS = [
     ".DS_Store", "Thumbs.db"
 ]
 
+# Mesma semântica de fnmatch.fnmatch (normcase por plataforma), compilada uma vez.
+_IGNORE_MATCHER = IgnoreMatcher.fnmatch(
+    IGNORE_PATTERNS, fold=None if os.path.normcase("A") == "A" else os.path.normcase)
+
+# Lotes parciais enviados à UI durante a varredura (o que vier primeiro)
+SCAN_BATCH_SIZE = 500
+SCAN_BATCH_INTERVAL = 0.25  # segundos
+
 # Encodings tentados em sequência para leitura de arquivos
 ENCODINGS_TO_TRY = ["utf-8", "latin-1", "cp1252"]
 
+# Opções de compressão da saída (rótulo -> compressed_output)
+COMPRESSION_CHOICES = {"Nenhuma": None, "gzip (.gz)": "gz", "xz (.xz)": "xz"}
+
 
 # ---------------------------------------------------------------------------
 # FUNÇÕES UTILITÁRIAS GLOBAIS
@@ -76,42 +101,155 @@ def _get_ext_label(filename):
     return "(sem extensão)"
 
 
-def _read_file_with_fallback(filepath):
+# Resultado da detecção por (caminho, mtime_ns, tamanho): cópias repetidas da
+# mesma seleção pulam a detecção. Guarda o encoding ou "binário"/"encoding_falhou".
+_ENCODING_CACHE = {}
+_ENCODING_CACHE_LIMIT = 100_000
+
+
+def _decode_text(data, enc):
+    """bytes -> str como na leitura em modo texto (quebras de linha viram '\\n')."""
+    if b"\r" in data:
+        # O TextIOWrapper converte \r\n e \r em C, bem mais rápido que str.replace
+        return io.TextIOWrapper(io.BytesIO(data), encoding=enc).read()
+    return data.decode(enc)
+
+
+def _decode_with_cascade(data, known=None):
     """
-    Tenta ler o arquivo com encodings em sequência.
-    Retorna (conteúdo, encoding_usado) ou (None, None) se binário/erro.
+    Decodifica bytes já lidos: `known` primeiro (se houver), depois ASCII puro
+    (caso mais comum, vale para qualquer encoding da lista) e por fim a
+    cascata ENCODINGS_TO_TRY, tudo em memória. Retorna (texto, encoding) ou
+    (None, None).
     """
-    # Verificar se é binário lendo os primeiros 1024 bytes
-    try:
-        with open(filepath, "rb") as f:
-            raw = f.read(1024)
-        if b'\x00' in raw:
-            return None, "binário"
-    except OSError:
-        return None, "erro_io"
-
-    # Tentar encodings em sequência
+    if known:
+        try:
+            return _decode_text(data, known), known
+        except (UnicodeDecodeError, LookupError):
+            pass
+    if data.isascii():
+        return _decode_text(data, "ascii"), ENCODINGS_TO_TRY[0]
     for enc in ENCODINGS_TO_TRY:
         try:
-            with open(filepath, "r", encoding=enc) as f:
-                content = f.read()
-            return content, enc
+            return _decode_text(data, enc), enc
         except (UnicodeDecodeError, LookupError):
             continue
-        except OSError as e:
-            return None, f"erro_io: {e}"
+    return None, None
+
 
-    return None, "encoding_falhou"
+def _read_file_with_fallback(filepath, facts=None):
+    """
+    Lê o arquivo uma única vez e decodifica em memória com os encodings em sequência.
+    Retorna (conteúdo, encoding_usado) ou (None, motivo) se binário/erro.
+    Com `facts` (content_probe.FileFacts ainda válidos), binários são
+    descartados sem abrir o arquivo e o encoding já detectado é usado direto.
+    O conteúdo tem as quebras de linha normalizadas, como na leitura em modo texto.
+    """
+    if facts is not None and facts.is_binary:
+        return None, "binário"
+    try:
+        st = os.stat(filepath)
+    except OSError:
+        return None, "erro_io"
+    key = (filepath, st.st_mtime_ns, st.st_size)
+    known = _ENCODING_CACHE.get(key)
+    if known is not None and known not in ENCODINGS_TO_TRY:
+        return None, known  # binário ou sem encoding válido, e não mudou desde então
+
+    try:
+        with open(filepath, "rb") as f:
+            data = f.read()
+    except OSError as e:
+        return None, f"erro_io: {e}"
+
+    if known is None and facts is not None:
+        known = facts.encoding
+    # Verificar se é binário pelos primeiros 1024 bytes
+    if known is None and b'\x00' in data[:1024]:
+        content, enc = None, "binário"
+    else:
+        content, enc = _decode_with_cascade(data, known)
+        if content is None:
+            enc = "encoding_falhou"
+
+    if len(_ENCODING_CACHE) >= _ENCODING_CACHE_LIMIT:
+        _ENCODING_CACHE.clear()
+    _ENCODING_CACHE[key] = enc
+    return content, enc
+
+
+def _passthrough_span(file_path, facts=None):
+    """
+    Trecho copiável sem conversão (passthrough.Utf8Span) ou None. Só vale para
+    UTF-8 (primeiro da cascata) sem '\r' e com os.linesep == '\n': nesse caso o
+    texto decodificado, gravado em modo texto, teria exatamente os mesmos bytes.
+    """
+    if os.linesep != "\n" or ENCODINGS_TO_TRY[0] != "utf-8":
+        return None
+    if facts is not None and (facts.is_binary or facts.encoding != "utf-8"):
+        return None
+    try:
+        st = os.stat(file_path)
+        known = _ENCODING_CACHE.get((file_path, st.st_mtime_ns, st.st_size))
+        if known is not None and known != "utf-8":
+            return None
+        span = utf8_span(file_path, reject_cr=True, nul_window=1024)
+    except OSError:
+        return None
+    if span is not None:
+        _ENCODING_CACHE[(file_path, span.mtime_ns, span.size)] = "utf-8"
+    return span
+
+
+def _render_copy_block(file_path, name, rel_path, facts=None, encode=False,
+                       fmt=DEFAULT_FORMAT):
+    """
+    Lê um arquivo e monta o bloco da saída no formato `fmt` (output_format).
+    Retorna (bloco, moldura) ou (None, motivo); a moldura (BlockFrame) dá os
+    cabeçalhos e o rodapé do bloco. Arquivos UTF-8 que não precisam de
+    conversão viram um PassthroughBlock, se o formato permite: só cabeçalho e
+    trecho, e os bytes são copiados do arquivo na escrita. Com `encode=True`
+    os demais blocos já vêm em bytes UTF-8, com as quebras de linha que a
+    escrita em modo texto produziria (os.linesep).
+    """
+    output_format = get_format(fmt)
+    span = _passthrough_span(file_path, facts) if output_format.passthrough else None
+    if span is not None:
+        frame = output_format.frame(name, rel_path, "utf-8")
+        return PassthroughBlock(frame.head, file_path, span, frame.tail), frame
+    content, enc = _read_file_with_fallback(file_path, facts)
+    if content is None:
+        return None, enc
+    frame = output_format.frame(name, rel_path, enc, content)
+    block = output_format.block(frame, content)
+    if encode:
+        if os.linesep != "\n":
+            block = block.replace("\n", os.linesep)
+        return block.encode("utf-8"), frame
+    return block, frame
+
+
+def _render_copy_batch(batch, fmt=DEFAULT_FORMAT):
+    """Lote de _render_copy_block executado em um processo (opção "jobs")."""
+    return [_render_copy_block(*item, encode=True, fmt=fmt) for item in batch]
+
+
+def _sorted_insert_position(items, item, key=None):
+    """Posição (busca binária) para inserir `item` em `items`, já ordenada por `key`."""
+    item_key = key(item) if key else item
+    lo, hi = 0, len(items)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if (key(items[mid]) if key else items[mid]) <= item_key:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
 
 
 def _should_ignore(name, is_dir=False):
     """Verifica se um item deve ser ignorado pelos padrões globais."""
-    for pattern in IGNORE_PATTERNS:
-        if fnmatch.fnmatch(name, pattern):
-            return True
-        if is_dir and name == pattern:
-            return True
-    return False
+    return _IGNORE_MATCHER.matches(name)
 
 
 # ---------------------------------------------------------------------------
@@ -119,29 +257,67 @@ def _should_ignore(name, is_dir=False):
 # ---------------------------------------------------------------------------
 
 class TreeNode:
-    """Representa nós da árvore para saída de texto."""
+    """Representa nós da árvore para saída de texto (filhos indexados pelo nome)."""
+
+    __slots__ = ("name", "full_path", "children")
 
     def __init__(self, name, full_path=None):
         self.name = name
         self.full_path = full_path
-        self.children = []
+        self.children = {}
 
     def add_child(self, child):
-        self.children.append(child)
-
-    def print_tree(self, level=0, is_last_child=False, parent_prefix=""):
-        prefix = parent_prefix
-        if level > 0:
-            prefix += "  " if is_last_child else "| "
-        tree_str = parent_prefix + ("`-- " if is_last_child else "|-- ") + f"{self.name}\n"
-        sorted_children = sorted(self.children, key=lambda c: natural_sort_key(c.name))
-        num = len(sorted_children)
-        for i, child in enumerate(sorted_children):
-            tree_str += child.print_tree(level + 1, i == num - 1, prefix)
-        return tree_str
+        self.children[child.name] = child
+
+    def child(self, name):
+        """Filho `name`, criado se ainda não existe."""
+        node = self.children.get(name)
+        if node is None:
+            node = self.children[name] = TreeNode(name)
+        return node
+
+    def remove_child(self, child):
+        self.children.pop(child.name, None)
+
+    def add_path(self, parts):
+        """Cria (se preciso) o caminho `parts` abaixo deste nó; retorna o último nó."""
+        node = self
+        for part in parts:
+            children = node.children
+            node = children.get(part)
+            if node is None:
+                node = children[part] = TreeNode(part)
+        return node
+
+    def iter_lines(self):
+        """
+        Linhas de print_tree, uma a uma, sem recursão: a pilha guarda os
+        iteradores dos filhos já ordenados de cada pasta aberta.
+        """
+        yield f"|-- {self.name}\n"
+        stack = [("", iter(self._sorted_children()))]
+        while stack:
+            prefix, children = stack[-1]
+            entry = next(children, None)
+            if entry is None:
+                stack.pop()
+                continue
+            node, last = entry
+            yield prefix + ("`-- " if last else "|-- ") + node.name + "\n"
+            if node.children:
+                stack.append((prefix + ("  " if last else "| "), iter(node._sorted_children())))
+
+    def _sorted_children(self):
+        """(filho, é o último) em ordem natural."""
+        nodes = sorted(self.children.values(), key=lambda c: natural_sort_key(c.name))
+        last = len(nodes) - 1
+        return [(node, i == last) for i, node in enumerate(nodes)]
+
+    def print_tree(self):
+        return "".join(self.iter_lines())
 
     def print_flat_list(self):
-        return "".join(f"- {child.name}\n" for child in self.children)
+        return "".join(f"- {child.name}\n" for child in self.children.values())
 
 
 # ---------------------------------------------------------------------------
@@ -184,7 +360,10 @@ class GitignoreParser:
     Parser robusto de regras .gitignore.
     Suporta: comentários, negações (!), curingas (*, ?, [a-z]),
     diretórios (/), recursividade (**).
-    Usa pathspec se disponível, caso contrário implementação própria.
+    As regras são compiladas por gitwildmatch.GitignoreSpec (mesmo resultado
+    do pathspec, sem a dependência) e aplicadas como o git: .gitignore
+    aninhados (lidos durante a varredura), .git/info/exclude e
+    core.excludesFile também valem — ver gitignore_tree.GitignoreTree.
     """
 
     def __init__(self, gitignore_path, root_dir, manual_rules=None):
@@ -192,7 +371,7 @@ class GitignoreParser:
         self.root_dir = root_dir
         self.manual_rules = manual_rules or []  # ← Guarda regras manuais separadamente
         self.rules = []          # lista de (negated, pattern_str)
-        self.spec = None         # pathspec.PathSpec se disponível
+        self.tree = None         # GitignoreTree com todas as fontes de regras
         self._parse()            # ← Parseia TUDO (arquivo + manuais)
 
     def _parse(self):
@@ -218,34 +397,23 @@ class GitignoreParser:
             pattern = line[1:] if negated else line
             self.rules.append((negated, pattern.strip()))
 
-        # Reconstrói o pathspec COM TODAS as regras (arquivo + manuais)
-        if HAS_PATHSPEC and all_patterns:
-            try:
-                self.spec = pathspec.PathSpec.from_lines('gitwildmatch', all_patterns)
-            except Exception:
-                self.spec = None
-
-    def is_ignored(self, rel_path):
-        """Verifica se um caminho relativo deve ser ignorado."""
-        rel_path = rel_path.replace(os.sep, '/')
-
-        # Usa pathspec se disponível (AGORA inclui regras manuais!)
-        if HAS_PATHSPEC and self.spec:
-            return self.spec.match_file(rel_path)
-
-        # Fallback com fnmatch
-        ignored = False
-        for negated, pattern in self.rules:
-            p = pattern.lstrip('/')
-            matched = False
-            if '/' in p.replace('**/', ''):
-                matched = fnmatch.fnmatch(rel_path, p) or fnmatch.fnmatch(rel_path, f"**/{p}")
-            else:
-                basename = rel_path.split('/')[-1]
-                matched = fnmatch.fnmatch(basename, p) or fnmatch.fnmatch(rel_path, f"**/{p}")
-            if matched:
-                ignored = not negated
-        return ignored
+        # Recompila COM TODAS as regras (arquivo + manuais + aninhados + git)
+        self.tree = GitignoreTree(self.root_dir, self.manual_rules)
+
+    def reload(self):
+        """Relê as fontes de regras (antes de cada varredura; arquivos podem ter mudado)."""
+        self.tree.reload(self.manual_rules)
+
+    @property
+    def has_rules(self):
+        return self.tree.has_rules
+
+    def is_ignored(self, rel_path, is_dir=False):
+        """
+        Verifica se um caminho relativo deve ser ignorado.
+        Com is_dir=True, True significa que a pasta inteira pode ser podada.
+        """
+        return self.tree.is_ignored(rel_path, is_dir)
 
     def get_rules_list(self):
         """Retorna lista de strings para exibição na UI."""
@@ -264,7 +432,7 @@ class GitignoreParser:
         """Adiciona regra manual e RECONSTRÓI o parser."""
         if rule and rule not in self.manual_rules:
             self.manual_rules.append(rule)
-            self._parse()  # ← RECONSTRÓI TUDO, incluindo pathspec!
+            self._parse()  # ← RECONSTRÓI TUDO, incluindo o GitignoreSpec!
             return True
         return False
 
@@ -296,10 +464,37 @@ class MyFrame(wx.Frame):
         self.all_extensions = []
         self.all_files = []
         self.selected_extensions = set()
-        self.selected_files = set()
+        # Contadores por pasta para o estado das caixas do Explorador (sem os.walk)
+        self._selection_tree = SelectionTree()
+        self.selected_files = SelectionSet(tree=self._selection_tree)
+        # Pastas do Explorador cujos filhos já foram inseridos (a árvore é montada ao expandir)
+        self._tree_loaded = set()
         self.arbitrary_files_for_union = []
         self.source_dir_last_path = None
         self._scan_thread = None
+        self._scan_cancel = None     # threading.Event da varredura em andamento
+        self._scan_generation = 0    # resultados de varreduras antigas são descartados
+        self._scan_streamed = 0      # arquivos já mostrados em lotes parciais
+        self._watcher = None
+        self._tracked_scan = False   # última lista veio do .git/index
+        self._facts = FactStore()    # análise profunda: linhas, binário, encoding, hash
+        self._deep_thread = None
+        self._deep_cancel = None
+        self._read_ahead_bytes = DEFAULT_MAX_BYTES   # orçamento da leitura antecipada na cópia
+        self._jobs = 1   # processos para ler/formatar a saída (0 = um por núcleo)
+        self._shard_max_bytes = None   # limite extra (bytes) por parte, só via config.json
+        self._output_bytes_per_token = BYTES_PER_TOKEN   # medida em _confirm_large_output
+        self._tokens = TokenCounter()  # estimativa até um tokenizador ser configurado
+        self._tokenizer_path = None    # .tiktoken / tokenizer.json / pasta BPE, só via config.json
+        self._token_thread = None
+        self._token_cancel = None
+        # Linhas da seleção: contadas em segundo plano; o total muda pela diferença
+        self._lines = LineCounter(
+            on_counted=lambda changed: wx.CallAfter(self._on_lines_counted, changed),
+            known_lines=self._known_lines)
+        self._counted_lines = {}     # caminho selecionado -> linhas já somadas no total
+        self._selected_lines = 0
+        self._token_stale = set()    # alterados desde a última contagem de tokens
         self._gitignore_parser = None
         self._gitignore_cache_path = None
         self._last_output_path = None
@@ -325,6 +520,7 @@ class MyFrame(wx.Frame):
 
         # --- Carregar configuração ---
         self._load_config()
+        self._tokens.load(TOKEN_CACHE_FILE)
 
         # --- Acelerador ESC ---
         esc_id = wx.NewIdRef()
@@ -377,6 +573,73 @@ class MyFrame(wx.Frame):
             "Desmarque para copiar TUDO, incluindo arquivos de build e dependências."
         )
         opts_sizer.Add(self.ignore_patterns_cb, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
+
+        self.tracked_only_cb = wx.CheckBox(panel, label="Somente arquivos rastreados (git)")
+        self.tracked_only_cb.SetToolTip(
+            "Lista os arquivos direto do .git/index, sem percorrer a pasta.\n"
+            "Arquivos novos ainda não adicionados ao git ficam de fora."
+        )
+        self.tracked_only_cb.Bind(wx.EVT_CHECKBOX, self._on_tracked_only_toggle)
+        opts_sizer.Add(self.tracked_only_cb, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
+
+        self.deep_scan_cb = wx.CheckBox(panel, label="Análise profunda")
+        self.deep_scan_cb.SetToolTip(
+            "Depois da varredura, lê cada arquivo uma vez em segundo plano e guarda\n"
+            "linhas exatas, se é binário, o encoding e um hash do conteúdo.\n"
+            "O contador e a cópia passam a usar esses dados sem reler o disco."
+        )
+        self.deep_scan_cb.Bind(wx.EVT_CHECKBOX, self._on_deep_scan_toggle)
+        opts_sizer.Add(self.deep_scan_cb, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
+
+        self.shard_cb = wx.CheckBox(panel, label="Dividir em partes de")
+        self.shard_cb.SetToolTip(
+            "Grava codigo_completo.part01.txt, part02.txt... com no máximo o número\n"
+            "de tokens indicado cada (estimativa: ~4 bytes por token). Cada parte\n"
+            "tem cabeçalho e árvore próprios; arquivos enormes são cortados em linhas."
+        )
+        opts_sizer.Add(self.shard_cb, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
+        self.shard_tokens_spin = wx.SpinCtrl(panel, min=1, max=10_000, initial=100)
+        opts_sizer.Add(self.shard_tokens_spin, 0, wx.TOP | wx.BOTTOM | wx.ALIGN_CENTER_VERTICAL, 5)
+        opts_sizer.Add(wx.StaticText(panel, label="mil tokens"), 0,
+                       wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
+
+        opts_sizer.Add(wx.StaticText(panel, label="Compressão:"), 0,
+                       wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
+        self.compression_choice = wx.Choice(panel, choices=list(COMPRESSION_CHOICES))
+        self.compression_choice.SetSelection(0)
+        self.compression_choice.SetToolTip(
+            "Grava codigo_completo.txt.gz ou .txt.xz, comprimindo blocos em paralelo.\n"
+            "O restore_codefilecopier.py lê esses arquivos diretamente."
+        )
+        opts_sizer.Add(self.compression_choice, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
+
+        self.bundle_index_cb = wx.CheckBox(panel, label="Índice no fim")
+        self.bundle_index_cb.SetToolTip(
+            "Acrescenta, depois da árvore, um índice com deslocamento, tamanho e crc32\n"
+            "do conteúdo de cada arquivo: ferramentas vão direto a um arquivo sem\n"
+            "varrer o texto. O restore_codefilecopier.py usa o índice quando existe."
+        )
+        opts_sizer.Add(self.bundle_index_cb, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
+
+        self.dedup_cb = wx.CheckBox(panel, label="Deduplicar iguais")
+        self.dedup_cb.SetToolTip(
+            "Arquivos com conteúdo idêntico a outro já copiado (LICENSE, __init__.py,\n"
+            "cópias vendorizadas) entram só com o cabeçalho \"[igual a: ...]\".\n"
+            "O restore_codefilecopier.py recria o conteúdo completo."
+        )
+        opts_sizer.Add(self.dedup_cb, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
+
+        opts_sizer.Add(wx.StaticText(panel, label="Formato:"), 0,
+                       wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
+        self.format_choice = wx.Choice(panel, choices=[fmt.label for fmt in FORMATS.values()])
+        self.format_choice.SetSelection(0)
+        self.format_choice.SetToolTip(
+            "Texto: blocos \"====\" (restaurável pelo restore_codefilecopier.py).\n"
+            "Markdown: blocos de código com a linguagem da extensão.\n"
+            "XML: tags <document path=...>. JSONL: um objeto JSON por arquivo\n"
+            "(sem índice nem corte de arquivos em trechos)."
+        )
+        opts_sizer.Add(self.format_choice, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
         self.main_sizer.Add(opts_sizer, 0, wx.EXPAND | wx.ALL, 5)
 
         # --- Notebook ---
@@ -562,6 +825,7 @@ class MyFrame(wx.Frame):
                   wx.TR_HAS_BUTTONS | wx.TR_LINES_AT_ROOT)
         self.file_tree.AssignImageList(self.file_tree_img_list)
         self.file_tree.Bind(wx.EVT_TREE_ITEM_ACTIVATED, self.on_tree_item_checkbox_activated)
+        self.file_tree.Bind(wx.EVT_TREE_ITEM_EXPANDING, self.on_tree_item_expanding)
         sizer.Add(self.file_tree, 1, wx.EXPAND | wx.ALL, 10)
         self.tree_explorer_panel.SetSizer(sizer)
 
@@ -675,14 +939,6 @@ class MyFrame(wx.Frame):
         splitter.SplitVertically(left_panel, right_panel, 350) # Aumentado de 300 para 350
         sizer.Add(splitter, 1, wx.EXPAND | wx.ALL, 5)
 
-        # Aviso sobre pathspec
-        if not HAS_PATHSPEC:
-            hint = wx.StaticText(
-                self.gitignore_panel,
-                label="💡 Instale 'pathspec' (pip install pathspec) para suporte completo ao .gitignore")
-            hint.SetForegroundColour(wx.Colour(150, 100, 0))
-            sizer.Add(hint, 0, wx.ALL, 5)
-
         self.gitignore_panel.SetSizer(sizer)
         # Guarda regras manuais adicionadas (override)
         self._gitignore_manual_rules = []
@@ -718,28 +974,102 @@ class MyFrame(wx.Frame):
     def _update_selection_counter(self):
         """
         Atualiza o contador de arquivos selecionados e estimativa de linhas.
-        Chamado sempre que a seleção muda.
+        Chamado sempre que a seleção muda; não toca no disco: linhas e tokens
+        vêm dos caches, e o que falta é contado em segundo plano.
         """
         total_files = len(self.selected_files)
-        
-        # Estimativa de linhas: conta linhas reais dos arquivos selecionados
-        total_lines = 0
-        for filepath in self.selected_files:
-            try:
-                if os.path.isfile(filepath):
-                    with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-                        total_lines += sum(1 for _ in f)
-            except:
-                pass  # Se não conseguir ler, ignora
-        
+        total_lines = self._sync_selected_lines()
+
+        # Tokens: contagens em cache somam na hora; o resto é contado em segundo plano
+        tokens, pending = self._tokens.peek_total(self.selected_files)
+        if pending:
+            sizes = (self._lines.get(p) for p in pending)
+            tokens += sum(c.size for c in sizes if c is not None) // BYTES_PER_TOKEN
+        stale = [p for p in self._token_stale if p in self.selected_files]
+        self._token_stale.clear()
+        if pending or stale:
+            self._start_token_count(pending + stale)
+        tokens_text = f"{'~' if pending else ''}{tokens:,} tokens ({self._tokens.tokenizer.name})"
+
         # Atualiza o label
-        label_text = f"{total_files} arquivo(s) selecionado(s) | ~{total_lines:,} linha(s) estimadas"
+        label_text = (f"{total_files} arquivo(s) selecionado(s) | ~{total_lines:,} linha(s) estimadas"
+                      f" | {tokens_text}")
         wx.CallAfter(self.selection_label.SetLabel, label_text)
         
         # Atualiza também na title bar (opcional)
         wx.CallAfter(self.SetTitle, f"Copiador de Código - {total_files} arquivo(s) selecionado(s)")
         wx.CallAfter(self.SetStatusText, f"{total_files} selecionados", 1)
 
+    def _sync_selected_lines(self):
+        """
+        Acerta o total de linhas pela diferença entre a seleção e o que já foi
+        somado: arquivos desmarcados saem, os novos entram com a contagem em
+        cache (0 se ainda não contados) e vão para a revalidação em segundo plano.
+        """
+        counted = self._counted_lines
+        selected = self.selected_files
+        for path in [p for p in counted if p not in selected]:
+            self._selected_lines -= counted.pop(path)
+        added = [p for p in selected if p not in counted]
+        for path in added:
+            known = self._lines.get(path)
+            counted[path] = known.lines if known is not None else 0
+            self._selected_lines += counted[path]
+        self._lines.request(added)
+        return self._selected_lines
+
+    def _on_lines_counted(self, changed):
+        """Contagens novas ou alteradas (thread de fundo, via CallAfter): soma a diferença."""
+        counted = self._counted_lines
+        for path in changed:
+            if path in counted:
+                known = self._lines.get(path)
+                lines = known.lines if known is not None else 0
+                self._selected_lines += lines - counted[path]
+                counted[path] = lines
+                self._token_stale.add(path)
+        self._update_selection_counter()
+
+    def _known_lines(self, path, st):
+        """Linhas da análise profunda, se ela já viu este conteúdo (thread de fundo)."""
+        facts = self._facts.get(path, st.st_size, st.st_mtime)
+        return facts.lines if facts is not None else None
+
+    def _set_tokenizer(self, path):
+        """Passa a contar tokens com o tokenizador BPE de `path`; mantém o atual se falhar."""
+        try:
+            tokenizer = load_tokenizer(path)
+        except (OSError, ValueError, KeyError) as e:
+            self.output_text.AppendText(f"⚠ Tokenizador não carregado ({path}): {e}\n")
+            return
+        self._cancel_token_count()
+        self._tokens = TokenCounter(tokenizer)
+        self._tokens.load(TOKEN_CACHE_FILE)
+        self._tokenizer_path = path
+
+    def _cancel_token_count(self):
+        if self._token_cancel is not None:
+            self._token_cancel.set()
+
+    def _start_token_count(self, paths):
+        """Conta em segundo plano os tokens de `paths`; o contador é refeito ao terminar."""
+        self._cancel_token_count()
+        cancel_event = self._token_cancel = threading.Event()
+        counter = self._tokens
+
+        def digest_of(path):
+            facts = self._facts.fresh(path)
+            return facts.digest if facts is not None else None
+
+        def worker():
+            counted = counter.count_files(paths, cancel_event, digest_of)
+            # Só refaz se algo foi contado: arquivos ilegíveis não disparam outra rodada
+            if counted and not cancel_event.is_set():
+                wx.CallAfter(self._update_selection_counter)
+
+        self._token_thread = threading.Thread(target=worker, daemon=True)
+        self._token_thread.start()
+
     def _create_checkbox_bitmap(self, checked_state):
         """Cria bitmap 16x16 simulando checkbox."""
         bmp = wx.Bitmap(16, 16)
@@ -792,6 +1122,31 @@ class MyFrame(wx.Frame):
                 self._apply_gitignore = cfg["apply_gitignore"]
             if "ignore_patterns_active" in cfg:
                 self.ignore_patterns_cb.SetValue(cfg["ignore_patterns_active"])
+            if "tracked_only" in cfg:
+                self.tracked_only_cb.SetValue(cfg["tracked_only"])
+            if "deep_scan" in cfg:
+                self.deep_scan_cb.SetValue(cfg["deep_scan"])
+            if "read_ahead_mb" in cfg:
+                self._read_ahead_bytes = max(1, int(cfg["read_ahead_mb"])) * 1024 * 1024
+            if "jobs" in cfg:
+                self._jobs = int(cfg["jobs"])
+            if cfg.get("compression") in COMPRESSION_CHOICES.values():
+                self.compression_choice.SetSelection(
+                    list(COMPRESSION_CHOICES.values()).index(cfg["compression"]))
+            if "shard_output" in cfg:
+                self.shard_cb.SetValue(cfg["shard_output"])
+            if "shard_max_tokens" in cfg:
+                self.shard_tokens_spin.SetValue(max(1, int(cfg["shard_max_tokens"]) // 1000))
+            if cfg.get("shard_max_bytes"):
+                self._shard_max_bytes = int(cfg["shard_max_bytes"])
+            if "bundle_index" in cfg:
+                self.bundle_index_cb.SetValue(cfg["bundle_index"])
+            if "dedup_identical" in cfg:
+                self.dedup_cb.SetValue(cfg["dedup_identical"])
+            if cfg.get("output_format") in FORMATS:
+                self.format_choice.SetSelection(list(FORMATS).index(cfg["output_format"]))
+            if cfg.get("tokenizer_path"):
+                self._set_tokenizer(cfg["tokenizer_path"])
             self.output_text.AppendText("✓ Configuração carregada.\n")
         except Exception as e:
             self.output_text.AppendText(f"⚠ Erro ao carregar config: {e}\n")
@@ -807,6 +1162,18 @@ class MyFrame(wx.Frame):
                 "window_pos": list(self.GetPosition()),
                 "apply_gitignore": self.gitignore_active_cb.GetValue(),
                 "ignore_patterns_active": self.ignore_patterns_cb.GetValue(),
+                "tracked_only": self.tracked_only_cb.GetValue(),
+                "deep_scan": self.deep_scan_cb.GetValue(),
+                "read_ahead_mb": self._read_ahead_bytes // (1024 * 1024),
+                "jobs": self._jobs,
+                "compression": self._compression(),
+                "shard_output": self.shard_cb.GetValue(),
+                "shard_max_tokens": self.shard_tokens_spin.GetValue() * 1000,
+                "shard_max_bytes": self._shard_max_bytes,
+                "bundle_index": self.bundle_index_cb.GetValue(),
+                "dedup_identical": self.dedup_cb.GetValue(),
+                "output_format": self._output_format().key,
+                "tokenizer_path": self._tokenizer_path,
             }
             with open(CONFIG_FILE, "w", encoding="utf-8") as f:
                 json.dump(cfg, f, indent=2)
@@ -814,7 +1181,12 @@ class MyFrame(wx.Frame):
             self.output_text.AppendText(f"⚠ Erro ao salvar config: {e}\n")
 
     def _on_close(self, event):
+        self._cancel_scan()
+        self._cancel_deep_scan()
+        self._stop_live_watch()
+        self._cancel_token_count()
         self._save_config()
+        self._tokens.save(TOKEN_CACHE_FILE)
         event.Skip()
 
     # -----------------------------------------------------------------------
@@ -830,12 +1202,21 @@ class MyFrame(wx.Frame):
             event.Skip()
 
     def _start_scan_thread(self, source_dir):
-        """Inicia varredura em thread separada para não travar a UI."""
-        # Cancelar varredura anterior se ainda em andamento
-        if self._scan_thread and self._scan_thread.is_alive():
-            self.output_text.AppendText("⟳ Aguardando varredura anterior...\n")
-            return
+        """Inicia varredura em thread separada para não travar a UI.
 
+        Uma varredura ainda em andamento é cancelada e substituída: o walker
+        para na próxima pasta e nada do que ela já enviou chega à UI.
+        """
+        if self._cancel_scan():
+            self.output_text.AppendText("⟳ Varredura anterior cancelada.\n")
+        self._cancel_deep_scan()
+
+        self._scan_generation += 1
+        self._scan_cancel = threading.Event()
+        self._scan_streamed = 0
+        self._stop_live_watch()
+        # Regras .gitignore carregadas antes da varredura para já podar as pastas ignoradas
+        self._refresh_gitignore_status(source_dir)
         self.copy_button.Disable()
         self.SetStatusText("Varrendo diretório...", 0)
         wx.CallAfter(self.progress_gauge.Show)
@@ -844,58 +1225,165 @@ class MyFrame(wx.Frame):
 
         self._scan_thread = threading.Thread(
             target=self._scan_worker,
-            args=(source_dir,),
+            args=(source_dir, self._scan_generation, self._scan_cancel),
             daemon=True
         )
         self._scan_thread.start()
 
-    def _scan_worker(self, source_dir):
+    def _cancel_scan(self):
+        """Sinaliza o cancelamento da varredura em andamento; True se havia uma."""
+        running = self._scan_thread is not None and self._scan_thread.is_alive()
+        if self._scan_cancel is not None:
+            self._scan_cancel.set()
+        return running
+
+    def _scan_call_after(self, generation, fn, *args):
+        """wx.CallAfter que ignora a chamada se outra varredura já começou."""
+        def run():
+            if generation == self._scan_generation:
+                fn(*args)
+        wx.CallAfter(run)
+
+    def _scan_ignore_fn(self, use_ignore, apply_gi):
+        """
+        Monta o filtro usado pelo walker: padrões globais e .gitignore.
+        Diretórios recusados são podados antes de serem lidos.
+        """
+        parser = self._gitignore_parser
+
+        def _ignore(name, rel, is_dir):
+            if use_ignore and _should_ignore(name, is_dir):
+                return True
+            if apply_gi:
+                return parser.is_ignored(rel, is_dir)
+            return False
+
+        return _ignore
+
+    def _scan_worker(self, source_dir, generation, cancel_event):
         """
         Trabalhador de varredura executado em thread.
-        Usa os.walk com filtros de padrões globais e .gitignore.
-        Todas as atualizações de UI são feitas via wx.CallAfter.
+        Usa o walker paralelo (os.scandir) com filtros de padrões globais e .gitignore.
+        Se houver índice salvo da pasta, publica a listagem em cache na hora e
+        revalida em seguida, relistando apenas as pastas modificadas; sem cache,
+        os arquivos vão para as listas em lotes, à medida que são encontrados.
+        Todas as atualizações de UI são feitas via _scan_call_after, e
+        `cancel_event` interrompe a varredura sem publicar nada.
         """
-        extensions = set()
-        files_list = []
         use_ignore = self.ignore_patterns_cb.GetValue()
         apply_gi = self._apply_gitignore and self._gitignore_parser is not None
+        ignore = self._scan_ignore_fn(use_ignore, apply_gi)
 
-        try:
-            for root, dirs, files in os.walk(source_dir):
-                # Filtrar diretórios in-place para evitar recursão desnecessária
-                if use_ignore:
-                    dirs[:] = [d for d in dirs if not _should_ignore(d, is_dir=True)]
+        self._tracked_scan = False
+        if self.tracked_only_cb.GetValue():
+            # Arquivos rastreados já passaram pelo .gitignore: só os padrões globais valem
+            try:
+                tracked = tracked_files(source_dir, self._scan_ignore_fn(use_ignore, False))
+            except GitIndexError as e:
+                tracked = None
+                self._scan_call_after(generation, self.output_text.AppendText,
+                                      f"⚠ {e} Varrendo a pasta.\n")
+            if tracked is not None:
+                self._tracked_scan = True
+                self._publish_scan([e.abs_path for e in tracked], source_dir, generation)
+                return
+            self._scan_call_after(
+                generation, self.output_text.AppendText,
+                "⚠ A pasta não está em um repositório git; varrendo todos os arquivos.\n")
+        # O tamanho não é usado aqui: basta relistar as pastas cujo mtime mudou.
+        index = ScanIndex.load(source_dir, revalidate_files=False)
 
-                # Filtrar pelo .gitignore
-                if apply_gi:
-                    filtered_dirs = []
-                    for d in dirs:
-                        rel = os.path.relpath(os.path.join(root, d), source_dir)
-                        if not self._gitignore_parser.is_ignored(rel + "/"):
-                            filtered_dirs.append(d)
-                    dirs[:] = filtered_dirs
-
-                for file in files:
-                    # Filtrar pelo padrão global
-                    if use_ignore and _should_ignore(file):
-                        continue
-
-                    filepath = os.path.join(root, file)
-
-                    # Filtrar pelo .gitignore
-                    if apply_gi:
-                        rel = os.path.relpath(filepath, source_dir)
-                        if self._gitignore_parser.is_ignored(rel):
-                            continue
+        cached_files = None
+        if index.has_data:
+            cached_files = [e.abs_path for e in index.cached_files(ignore)]
+            self._publish_scan(cached_files, source_dir, generation, from_cache=True)
 
-                    # Usar _get_ext_label para capturar arquivos sem extensão
-                    ext = _get_ext_label(file)
-                    extensions.add(ext)
-                    files_list.append(filepath)
+        files_list = []
+        batch = []
+        last_flush = time.monotonic()
+        try:
+            for entry in walk_files(source_dir, ignore, cancel_event=cancel_event,
+                                    lister=index.list_directory):
+                files_list.append(entry.abs_path)
+                if cached_files is not None:
+                    continue  # a listagem em cache já está na tela
+                batch.append(entry.abs_path)
+                now = time.monotonic()
+                if len(batch) >= SCAN_BATCH_SIZE or now - last_flush >= SCAN_BATCH_INTERVAL:
+                    self._scan_call_after(generation, self._append_scan_batch, batch)
+                    batch = []
+                    last_flush = now
+            if cancel_event.is_set():
+                # Varredura substituída: o índice só tem parte das pastas, não é salvo
+                return
+            index.save()
 
         except Exception as e:
-            wx.CallAfter(self.output_text.AppendText,
-                         f"⚠ Erro durante varredura: {e}\n")
+            self._scan_call_after(generation, self.output_text.AppendText,
+                                  f"⚠ Erro durante varredura: {e}\n")
+
+        if cached_files is not None and cached_files == files_list:
+            # Lido na thread principal, depois que a listagem em cache foi aplicada
+            self._scan_call_after(generation, lambda: self._finish_scan_ui(
+                len(self.all_files), len(self.all_extensions), "sem alterações desde o cache"))
+            return
+        self._publish_scan(files_list, source_dir, generation)
+
+    def _append_scan_batch(self, paths):
+        """
+        Mostra um lote parcial da varredura em andamento, na ordem em que os
+        arquivos foram encontrados. A lista ordenada e a árvore chegam com o
+        resultado final (_update_ui_after_scan).
+        """
+        if not self._scan_streamed:
+            # Primeiro lote: sai a listagem da pasta anterior
+            self.all_files = []
+            self.all_extensions = []
+            self.file_list.Clear()
+            self.text_file_list.Clear()
+            self.extension_checklist.Clear()
+            self.file_tree.DeleteAllItems()
+        self._scan_streamed += len(paths)
+        self.all_files.extend(paths)
+
+        known = set(self.all_extensions)
+        new_exts = sorted({_get_ext_label(os.path.basename(f)) for f in paths} - known)
+        self.all_extensions.extend(new_exts)
+
+        self.Freeze()
+        try:
+            search = self.extension_search.GetValue().lower()
+            for ext in new_exts:
+                if search in ext.lower():
+                    pos = self.extension_checklist.Append(ext)
+                    self.extension_checklist.Check(pos, ext in self.selected_extensions)
+
+            search = self.file_search.GetValue().lower()
+            visible = [f for f in paths
+                       if not search or search in os.path.basename(f).lower()
+                       or search in os.path.dirname(f).lower()]
+            self._checklist_append(self.file_list, visible, self.selected_files)
+            if not self.text_input.GetValue().strip():
+                self._checklist_append(self.text_file_list, paths, self.selected_files)
+        finally:
+            self.Thaw()
+
+        self.SetStatusText(f"Varrendo... {self._scan_streamed} arquivo(s)", 0)
+
+    @staticmethod
+    def _checklist_append(checklist, items, checked_set):
+        if not items:
+            return
+        start = checklist.GetCount()
+        checklist.Append(items)
+        for i, item in enumerate(items, start):
+            if item in checked_set:
+                checklist.Check(i)
+
+    def _publish_scan(self, files_list, source_dir, generation, from_cache=False):
+        """Ordena o resultado da varredura e envia para a UI (thread principal)."""
+        # Usar _get_ext_label para capturar arquivos sem extensão
+        extensions = {_get_ext_label(os.path.basename(f)) for f in files_list}
 
         # Ordenar resultados
         sort_key = self.get_sort_key()
@@ -903,9 +1391,10 @@ class MyFrame(wx.Frame):
         sorted_files = sorted(files_list, key=sort_key)
 
         # Atualizar UI na thread principal
-        wx.CallAfter(self._update_ui_after_scan, sorted_extensions, sorted_files, source_dir)
+        self._scan_call_after(generation, self._update_ui_after_scan, sorted_extensions,
+                              sorted_files, source_dir, from_cache)
 
-    def _update_ui_after_scan(self, extensions, files_list, source_dir):
+    def _update_ui_after_scan(self, extensions, files_list, source_dir, from_cache=False):
         """Atualiza toda a UI após varredura. Chamado via wx.CallAfter."""
         self.all_extensions = extensions
         self.all_files = files_list
@@ -926,23 +1415,295 @@ class MyFrame(wx.Frame):
                 finally:
                     self.text_file_list.Thaw()
 
-            # Atualizar aba .gitignore
-            self._refresh_gitignore_status(source_dir)
             self.populate_file_tree()
 
         finally:
             self.Thaw()
 
+        if from_cache:
+            # A listagem em cache já pode ser usada; a revalidação segue na thread.
+            self.SetStatusText(f"Cache: {len(files_list)} arquivo(s) — revalidando...", 0)
+            self.output_text.AppendText(
+                f"⟳ Lista em cache: {len(files_list)} arquivo(s). Revalidando...\n")
+        else:
+            self._finish_scan_ui(len(files_list), len(extensions))
+        self._update_selection_counter()
+
+    def _finish_scan_ui(self, files_count, extensions_count, note=None):
+        """Encerra o estado de varredura (gauge, botão, status)."""
         self.progress_gauge.SetValue(0)
         self.progress_gauge.Hide()
         self.main_sizer.Layout()
         self.copy_button.Enable()
-        self.SetStatusText(f"Varredura concluída: {len(files_list)} arquivo(s)", 0)
+        self.SetStatusText(f"Varredura concluída: {files_count} arquivo(s)", 0)
         self.output_text.AppendText(
-            f"✓ Varredura concluída: {len(files_list)} arquivo(s), "
-            f"{len(extensions)} extensão(ões) encontrada(s).\n")
+            f"✓ Varredura concluída: {files_count} arquivo(s), "
+            f"{extensions_count} extensão(ões) encontrada(s)"
+            f"{f' ({note})' if note else ''}.\n")
+        self._start_live_watch(self.source_dir_picker.GetPath())
+        if self.deep_scan_cb.GetValue():
+            self._start_deep_scan()
+
+    # -----------------------------------------------------------------------
+    # ANÁLISE PROFUNDA (CONTEÚDO)
+    # -----------------------------------------------------------------------
+
+    def _on_deep_scan_toggle(self, event):
+        if self.deep_scan_cb.GetValue():
+            if self.all_files and not (self._scan_thread and self._scan_thread.is_alive()):
+                self._start_deep_scan()
+        else:
+            self._cancel_deep_scan()
+
+    def _cancel_deep_scan(self):
+        if self._deep_cancel is not None:
+            self._deep_cancel.set()
+
+    def _start_deep_scan(self):
+        """Lê em segundo plano os arquivos listados ainda sem fatos válidos no store."""
+        self._cancel_deep_scan()
+        cancel_event = self._deep_cancel = threading.Event()
+        generation = self._scan_generation
+        files = list(self.all_files)
+
+        def progress_cb(done, total):
+            self._scan_call_after(generation, self.SetStatusText,
+                                  f"Análise profunda: {done}/{total}", 0)
+
+        def worker():
+            try:
+                probed = deep_scan(files, self._facts, cancel_event=cancel_event,
+                                   progress_cb=progress_cb)
+            except Exception as e:
+                self._scan_call_after(generation, self.output_text.AppendText,
+                                      f"⚠ Erro na análise profunda: {e}\n")
+                return
+            if not cancel_event.is_set():
+                self._scan_call_after(generation, self._on_deep_scan_done, probed, len(files))
+
+        self._deep_thread = threading.Thread(target=worker, daemon=True)
+        self._deep_thread.start()
+
+    def _on_deep_scan_done(self, probed, total):
+        binaries = sum(1 for f in self.all_files
+                       if (facts := self._facts.get(f)) is not None and facts.is_binary)
+        self.SetStatusText(f"Análise profunda concluída: {total} arquivo(s)", 0)
+        self.output_text.AppendText(
+            f"✓ Análise profunda: {probed} arquivo(s) lido(s), "
+            f"{total - probed} já analisado(s); {binaries} binário(s).\n")
+        self._update_selection_counter()
+
+    # -----------------------------------------------------------------------
+    # ÍNDICE VIVO (INOTIFY)
+    # -----------------------------------------------------------------------
+
+    def _start_live_watch(self, source_dir):
+        """Passa a observar a pasta de entrada para atualizar as listas sem nova varredura."""
+        self._stop_live_watch()
+        if not source_dir or not os.path.isdir(source_dir) or not InotifyWatcher.available():
+            return
+        if self._tracked_scan:
+            # A lista veio do index do git: arquivos novos na pasta não entram nela
+            return
+        ignore = self._scan_ignore_fn(
+            self._use_ignore_patterns(),
+            self._apply_gitignore and self._gitignore_parser is not None)
+        watcher = InotifyWatcher(
+            source_dir,
+            on_changes=lambda a, r, d: wx.CallAfter(self._apply_live_changes, a, r, d),
+            ignore=ignore,
+            on_overflow=lambda: wx.CallAfter(self._on_live_watch_overflow, source_dir))
+        try:
+            watcher.start()
+        except OSError as e:
+            self.output_text.AppendText(f"⚠ Observação de alterações indisponível: {e}\n")
+            return
+        self._watcher = watcher
+
+    def _stop_live_watch(self):
+        if self._watcher is not None:
+            self._watcher.stop()
+            self._watcher = None
+
+    def _on_live_watch_overflow(self, source_dir):
+        """Eventos perdidos pelo kernel: só uma varredura completa garante a lista."""
+        if source_dir != self.source_dir_picker.GetPath():
+            return
+        self.output_text.AppendText("⟳ Muitas alterações no disco; varrendo novamente...\n")
+        self._start_scan_thread(source_dir)
+
+    def _apply_live_changes(self, added, removed, removed_dirs):
+        """
+        Aplica um lote de criações/remoções ao índice em memória e envia apenas
+        os deltas para as listas, extensões e árvore. Chamado via wx.CallAfter.
+        """
+        if self._watcher is None:
+            return
+        current = set(self.all_files)
+        gone = set(removed) & current
+        for d in removed_dirs:
+            prefix = d + os.sep
+            gone.update(f for f in self.all_files if f.startswith(prefix))
+        new = set(added) - current
+        if not gone and not new:
+            return
+
+        sort_key = self.get_sort_key()
+        new_sorted = sorted(new, key=sort_key)
+
+        # Índice em memória
+        if gone:
+            self.all_files = [f for f in self.all_files if f not in gone]
+            self.selected_files -= gone
+            for f in gone:
+                self._selection_tree.remove_file(f)
+        for f in new_sorted:
+            self.all_files.insert(_sorted_insert_position(self.all_files, f, sort_key), f)
+            self._selection_tree.add_file(f, f in self.selected_files)
+
+        # Extensões que surgiram/sumiram
+        new_exts = {_get_ext_label(os.path.basename(f)) for f in new} - set(self.all_extensions)
+        lost_exts = set()
+        candidates = {_get_ext_label(os.path.basename(f)) for f in gone}
+        if candidates:
+            remaining = {_get_ext_label(os.path.basename(f)) for f in self.all_files}
+            lost_exts = candidates - remaining
+        if new_exts or lost_exts:
+            self.all_extensions = sorted(set(self.all_extensions) - lost_exts | new_exts)
+            self.selected_extensions -= lost_exts
+
+        self.Freeze()
+        try:
+            search = self.extension_search.GetValue().lower()
+            self._checklist_apply_delta(
+                self.extension_checklist, [e for e in sorted(new_exts) if search in e.lower()],
+                lost_exts, None, self.selected_extensions)
+
+            search = self.file_search.GetValue().lower()
+            visible_new = [f for f in new_sorted
+                           if not search or search in os.path.basename(f).lower()
+                           or search in os.path.dirname(f).lower()]
+            self._checklist_apply_delta(self.file_list, visible_new, gone, sort_key,
+                                        self.selected_files)
+
+            # Com a busca vazia, a lista da aba "Buscar por Nome" mostra todos os arquivos
+            show_new = new_sorted if not self.text_input.GetValue().strip() else []
+            self._checklist_apply_delta(self.text_file_list, show_new, gone, sort_key,
+                                        self.selected_files)
+
+            self._tree_apply_delta(new_sorted, gone, removed_dirs)
+        finally:
+            self.Thaw()
+
+        self.SetStatusText(f"{len(self.all_files)} arquivo(s) (atualizado)", 0)
+        self.output_text.AppendText(
+            f"⟳ Alterações no disco: +{len(new)} / -{len(gone)} arquivo(s).\n")
         self._update_selection_counter()
 
+    def _checklist_apply_delta(self, checklist, to_add, to_remove, sort_key, checked_set):
+        """Remove/insere itens numa CheckListBox ordenada sem recriar a lista inteira."""
+        if not to_add and not to_remove:
+            return
+        checklist.Freeze()
+        try:
+            strings = list(checklist.GetStrings())
+            if to_remove:
+                for idx in reversed([i for i, s in enumerate(strings) if s in to_remove]):
+                    checklist.Delete(idx)
+                    del strings[idx]
+            for item in to_add:
+                pos = _sorted_insert_position(strings, item, sort_key)
+                checklist.Insert(item, pos)
+                strings.insert(pos, item)
+                checklist.Check(pos, item in checked_set)
+        finally:
+            checklist.Thaw()
+
+    def _tree_apply_delta(self, added, gone, removed_dirs):
+        """Insere/remove nós da árvore do Explorador para um lote do observador."""
+        root = self.file_tree.GetRootItem()
+        if not root.IsOk():
+            return
+        for d in removed_dirs:
+            item = self._find_tree_item(d)
+            if item is not None:
+                self.file_tree.Delete(item)
+        for f in gone:
+            item = self._find_tree_item(f)
+            if item is None:
+                continue
+            parent = self.file_tree.GetItemParent(item)
+            self.file_tree.Delete(item)
+            # Pastas que ficaram vazias e não existem mais no disco também saem
+            while (parent.IsOk() and parent != root
+                   and not self.file_tree.GetChildrenCount(parent, False)
+                   and not os.path.isdir(self.file_tree.GetItemData(parent))):
+                next_parent = self.file_tree.GetItemParent(parent)
+                self.file_tree.Delete(parent)
+                parent = next_parent
+        for f in added:
+            parent = self._find_tree_item(os.path.dirname(f), create_dirs=True)
+            # Pasta ainda não aberta: o arquivo aparece quando ela for expandida
+            if (parent is None or self.file_tree.GetItemData(parent) not in self._tree_loaded
+                    or self._find_tree_child(parent, os.path.basename(f)) is not None):
+                continue
+            self._insert_tree_item_sorted(parent, os.path.basename(f), f, is_dir=False)
+        # Só os nós já inseridos: custa o que está aberto, não o repositório
+        self._update_all_tree_item_images(root)
+
+    def _find_tree_child(self, parent, name):
+        child, cookie = self.file_tree.GetFirstChild(parent)
+        while child.IsOk():
+            if self.file_tree.GetItemText(child) == name:
+                return child
+            child, cookie = self.file_tree.GetNextChild(parent, cookie)
+        return None
+
+    def _find_tree_item(self, path, create_dirs=False):
+        """
+        Localiza o nó de `path` descendo pelos nomes. Com `create_dirs`, cria as
+        pastas que faltam e para na primeira pasta cujos filhos ainda não foram
+        inseridos, devolvendo o nó dela.
+        """
+        source_dir = self.source_dir_picker.GetPath()
+        item = self.file_tree.GetRootItem()
+        try:
+            rel = os.path.relpath(path, source_dir)
+        except ValueError:
+            return None
+        if rel == os.curdir:
+            return item
+        if rel.startswith(os.pardir):
+            return None
+        current_path = source_dir
+        for part in rel.split(os.sep):
+            if create_dirs and self.file_tree.GetItemData(item) not in self._tree_loaded:
+                return item
+            current_path = os.path.join(current_path, part)
+            child = self._find_tree_child(item, part)
+            if child is None:
+                if not create_dirs:
+                    return None
+                child = self._insert_tree_item_sorted(item, part, current_path, is_dir=True)
+                self._update_tree_item_image(child)
+            item = child
+        return item
+
+    def _insert_tree_item_sorted(self, parent, name, os_path, is_dir):
+        sort_key = self.get_sort_key()
+        siblings = []
+        child, cookie = self.file_tree.GetFirstChild(parent)
+        while child.IsOk():
+            siblings.append(self.file_tree.GetItemText(child))
+            child, cookie = self.file_tree.GetNextChild(parent, cookie)
+        pos = _sorted_insert_position(siblings, name, sort_key)
+        item = self.file_tree.InsertItem(parent, pos, name)
+        self.file_tree.SetItemData(item, os_path)
+        if is_dir:
+            self.file_tree.SetItemTextColour(item, wx.BLUE)
+            self.file_tree.SetItemHasChildren(item, True)
+        return item
+
     # -----------------------------------------------------------------------
     # .GITIGNORE — LÓGICA
     # -----------------------------------------------------------------------
@@ -954,16 +1715,10 @@ class MyFrame(wx.Frame):
         """
         gitignore_path = os.path.join(source_dir, ".gitignore")
 
-        if not os.path.isfile(gitignore_path):
-            wx.CallAfter(self.gitignore_status_label.SetLabel,
-                         "⚠ Nenhum arquivo .gitignore encontrado na raiz do diretório.")
-            wx.CallAfter(self.gitignore_active_cb.Disable)
-            wx.CallAfter(self.gitignore_rules_list.Set, [])
-            self._gitignore_parser = None
-            return
-
-        # Evitar re-parsear se o arquivo não mudou e não há regras manuais novas (o parser cuida disso)
-        if self._gitignore_cache_path != gitignore_path:
+        # Mesma pasta: só relê as fontes (os .gitignore aninhados são lidos na varredura)
+        if self._gitignore_cache_path == gitignore_path and self._gitignore_parser is not None:
+            self._gitignore_parser.reload()
+        else:
             self._gitignore_parser = GitignoreParser(
                 gitignore_path, 
                 source_dir, 
@@ -971,14 +1726,34 @@ class MyFrame(wx.Frame):
             )
             self._gitignore_cache_path = gitignore_path
 
+        if not self._gitignore_parser.has_rules:
+            wx.CallAfter(self.gitignore_status_label.SetLabel,
+                         "⚠ Nenhum arquivo .gitignore encontrado na raiz do diretório.")
+            wx.CallAfter(self.gitignore_active_cb.Disable)
+            wx.CallAfter(self.gitignore_rules_list.Set, [])
+            self._gitignore_parser = None
+            self._gitignore_cache_path = None
+            return
+
         # Atualizar lista de regras na UI (o parser já retorna arquivo + manuais)
         all_rules = self._gitignore_parser.get_rules_list()
+        in_repo = self._gitignore_parser.tree.worktree is not None
 
         wx.CallAfter(self.gitignore_status_label.SetLabel,
-                     f"✅ .gitignore encontrado: {len(all_rules)} regra(s).")
+                     f"✅ .gitignore encontrado: {len(all_rules)} regra(s)"
+                     + (" + .gitignore aninhados, .git/info/exclude e core.excludesFile."
+                        if in_repo else " + .gitignore aninhados."))
         wx.CallAfter(self.gitignore_active_cb.Enable)
         wx.CallAfter(self.gitignore_rules_list.Set, all_rules)
 
+    def _on_tracked_only_toggle(self, event):
+        """Alterna entre listar pelo .git/index e percorrer a pasta."""
+        source_dir = self.source_dir_picker.GetPath()
+        if source_dir and os.path.isdir(source_dir):
+            mode = "arquivos rastreados pelo git" if self.tracked_only_cb.GetValue() else "todos os arquivos"
+            self.output_text.AppendText(f"⟳ Listando {mode}. Reiniciando varredura...\n")
+            self._start_scan_thread(source_dir)
+
     def _on_gitignore_toggle(self, event):
         """Ativa/desativa conformidade com .gitignore."""
         self._apply_gitignore = self.gitignore_active_cb.GetValue()
@@ -1112,72 +1887,62 @@ class MyFrame(wx.Frame):
     # -----------------------------------------------------------------------
 
     def populate_file_tree(self):
-        """Popula a árvore de arquivos no painel Explorador."""
+        """
+        Popula a árvore do Explorador a partir da varredura (self.all_files),
+        sem voltar ao disco. Só o primeiro nível é inserido; os filhos de cada
+        pasta entram quando ela é expandida (on_tree_item_expanding).
+        """
         self.file_tree.Freeze()
         try:
             self.file_tree.DeleteAllItems()
+            self._tree_loaded.clear()
             source_dir = self.source_dir_picker.GetPath()
             if not source_dir or not os.path.isdir(source_dir):
+                self._selection_tree.reset(None)
                 return
+            self._selection_tree.reset(source_dir, self.all_files, self.selected_files)
+            root_path = self._selection_tree.root
             invisible_root = self.file_tree.AddRoot("DummyRoot")
-            self._populate_tree_recursive(source_dir, invisible_root, is_top_level=True)
-            self._update_all_tree_item_images(invisible_root)
+            self.file_tree.SetItemData(invisible_root, root_path)
+            self._append_tree_children(invisible_root, root_path)
         finally:
             self.file_tree.Thaw()
 
-    def _populate_tree_recursive(self, parent_os_path, parent_tree_item, is_top_level=False):
-        try:
-            sort_key = self.get_sort_key()
-            items_in_os = sorted(os.listdir(parent_os_path), key=sort_key)
-        except OSError:
+    def _append_tree_children(self, parent_tree_item, folder_path):
+        """Insere sob `parent_tree_item` as pastas e arquivos diretos de `folder_path`."""
+        self._tree_loaded.add(folder_path)
+        folder = self._selection_tree.dir_counts(folder_path)
+        if folder is None:
             return
-        for item_name in items_in_os:
-            # Aplicar filtros de exclusão
-            is_dir = os.path.isdir(os.path.join(parent_os_path, item_name))
-            if self._should_ignore_item(item_name, is_dir):
-                continue
-            current_os_path = os.path.join(parent_os_path, item_name)
-            if self._apply_gitignore and self._gitignore_parser:
-                try:
-                    rel = os.path.relpath(current_os_path,
-                                          self.source_dir_picker.GetPath())
-                    if self._gitignore_parser.is_ignored(rel.replace(os.sep, '/')):
-                        continue
-                except ValueError:
-                    pass
-            current_tree_item = self.file_tree.AppendItem(parent_tree_item, item_name)
-            self.file_tree.SetItemData(current_tree_item, current_os_path)
-            if is_dir:
-                self.file_tree.SetItemTextColour(current_tree_item, wx.BLUE)
-                self._populate_tree_recursive(current_os_path, current_tree_item)
-
-    def _get_all_descendant_files_from_os_path(self, folder_path):
-        desc_files = []
-        if not os.path.isdir(folder_path):
-            return desc_files
-        for r, _, fs in os.walk(folder_path):
-            for f_name in fs:
-                desc_files.append(os.path.join(r, f_name))
-        return desc_files
+        is_dir = {os.path.basename(p): True for p in folder.dirs}
+        is_dir.update((os.path.basename(p), False) for p in folder.files)
+        for item_name in sorted(is_dir, key=self.get_sort_key()):
+            item = self.file_tree.AppendItem(parent_tree_item, item_name)
+            self.file_tree.SetItemData(item, os.path.join(folder_path, item_name))
+            if is_dir[item_name]:
+                self.file_tree.SetItemTextColour(item, wx.BLUE)
+                self.file_tree.SetItemHasChildren(item, True)
+            self._update_tree_item_image(item)
+
+    def on_tree_item_expanding(self, event):
+        """Primeira expansão de uma pasta: insere os filhos dela a partir da varredura."""
+        tree_item = event.GetItem()
+        item_path = self.file_tree.GetItemData(tree_item) if tree_item.IsOk() else None
+        if item_path and item_path not in self._tree_loaded:
+            self.file_tree.Freeze()
+            try:
+                self._append_tree_children(tree_item, item_path)
+            finally:
+                self.file_tree.Thaw()
+            if not self.file_tree.GetChildrenCount(tree_item, False):
+                self.file_tree.SetItemHasChildren(tree_item, False)
+        event.Skip()
 
     def _get_tree_item_state(self, tree_item):
         item_path = self.file_tree.GetItemData(tree_item)
         if not item_path:
             return "unchecked"
-        if os.path.isfile(item_path):
-            return "checked" if item_path in self.selected_files else "unchecked"
-        elif os.path.isdir(item_path):
-            descendant_files = self._get_all_descendant_files_from_os_path(item_path)
-            if not descendant_files:
-                return "unchecked"
-            num_selected = sum(1 for f in descendant_files if f in self.selected_files)
-            if num_selected == 0:
-                return "unchecked"
-            elif num_selected == len(descendant_files):
-                return "checked"
-            else:
-                return "partial"
-        return "unchecked"
+        return self._selection_tree.state(item_path, self.selected_files)
 
     def _update_tree_item_image(self, tree_item):
         if not tree_item.IsOk():
@@ -1226,7 +1991,9 @@ class MyFrame(wx.Frame):
             return
         self.file_tree.Freeze()
         try:
-            if os.path.isfile(item_path):
+            folder = self._selection_tree.dir_counts(item_path)
+            if folder is None and (item_path in self._selection_tree
+                                   or os.path.isfile(item_path)):
                 if item_path in self.selected_files:
                     self.selected_files.discard(item_path)
                     self.output_text.AppendText(
@@ -1237,10 +2004,10 @@ class MyFrame(wx.Frame):
                         f"Marcado: {os.path.basename(item_path)}\n")
                 self._update_tree_item_image(tree_item)
                 self._update_parents_images(tree_item)
-            elif os.path.isdir(item_path):
-                descendant_files = self._get_all_descendant_files_from_os_path(item_path)
-                current_state = self._get_tree_item_state(tree_item)
-                if current_state == "checked":
+            elif folder is not None:
+                # Só os arquivos da varredura: os ignorados não entram na seleção
+                descendant_files = self._selection_tree.files_under(item_path)
+                if folder.state() == CHECKED:
                     for f in descendant_files:
                         self.selected_files.discard(f)
                     self.output_text.AppendText(
@@ -1597,27 +2364,10 @@ class MyFrame(wx.Frame):
             self.output_text.AppendText("Varrendo arquivos válidos (não ignorados)...\n")
             all_valid_files = []
             
-            # Reutiliza lógica de filtragem
-            for root, dirs, files in os.walk(source_directory):
-                if self._use_ignore_patterns():
-                    dirs[:] = [d for d in dirs if not _should_ignore(d, is_dir=True)]
-                
-                # Filtro de diretório no .gitignore
-                filtered_dirs = []
-                for d in dirs:
-                    rel = os.path.relpath(os.path.join(root, d), source_directory)
-                    if not self._gitignore_parser.is_ignored(rel + "/"):
-                        filtered_dirs.append(d)
-                dirs[:] = filtered_dirs
-
-                for f in files:
-                    if self._use_ignore_patterns() and _should_ignore(f):
-                        continue
-                    
-                    filepath = os.path.join(root, f)
-                    rel = os.path.relpath(filepath, source_directory)
-                    if not self._gitignore_parser.is_ignored(rel):
-                        all_valid_files.append(filepath)
+            # Reutiliza o mesmo filtro da varredura (padrões globais + .gitignore)
+            ignore = self._scan_ignore_fn(self._use_ignore_patterns(), True)
+            for entry in walk_files(source_directory, ignore, with_stat=False):
+                all_valid_files.append(entry.abs_path)
             
             if not all_valid_files:
                 wx.MessageBox("Nenhum arquivo '✅ incluído' encontrado para copiar.", "Aviso",
@@ -1630,8 +2380,8 @@ class MyFrame(wx.Frame):
             wx.MessageBox(f"Lógica não implementada para: {page_title}",
                           "Erro", wx.OK | wx.ICON_ERROR)
 
-    def _build_metadata_header(self, source_dir, files_count, rules_applied=None):
-        """Constrói o cabeçalho de metadados para o arquivo de saída."""
+    def _build_metadata_header(self, source_dir, files_count, rules_applied=None, part=None):
+        """Constrói o cabeçalho de metadados para o arquivo de saída (ou para uma parte)."""
         now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         header = (
             f"{'=' * 60}\n"
@@ -1643,26 +2393,123 @@ class MyFrame(wx.Frame):
         )
         if rules_applied:
             header += f"  Filtros ativos: {', '.join(rules_applied)}\n"
+        if part is not None:
+            header += f"  Parte        : {part:02d}\n"
         header += f"{'=' * 60}\n\n"
         return header
 
+    def _shard_budget(self):
+        """
+        Orçamento por parte em bytes, ou None se a divisão em partes está
+        desligada. Os tokens viram bytes pela razão medida na seleção por
+        _confirm_large_output (ou pela estimativa).
+        """
+        if not self.shard_cb.GetValue():
+            return None
+        return budget_bytes(self.shard_tokens_spin.GetValue() * 1000, self._shard_max_bytes,
+                            self._output_bytes_per_token)
+
+    def _compression(self):
+        """"gz", "xz" ou None, conforme a escolha de compressão."""
+        return list(COMPRESSION_CHOICES.values())[self.compression_choice.GetSelection()]
+
+    def _output_format(self):
+        """Formato escolhido para a saída (output_format.OutputFormat)."""
+        return list(FORMATS.values())[self.format_choice.GetSelection()]
+
+    def _output_file_name(self):
+        return "codigo_completo" + self._output_format().extension
+
+    def _open_output(self, output_dir, header_fn, footer_fn):
+        """
+        ShardWriter para codigo_completo.txt (ou .md/.xml/.jsonl, conforme o
+        formato) ou, com a divisão ligada, para as partes. `header_fn` dá o
+        cabeçalho de metadados; o formato o adapta.
+        """
+        fmt = self._output_format()
+        return ShardWriter(output_dir, "codigo_completo", self._shard_budget(),
+                           lambda part: fmt.header(header_fn(part)), footer_fn,
+                           self._compression(),
+                           index=self.bundle_index_cb.GetValue() and fmt.indexable,
+                           dedup=self.dedup_cb.GetValue(), extension=fmt.extension)
+
+    @staticmethod
+    def _tree_from_paths(root_name, rel_paths):
+        """Árvore (TreeNode) só com os caminhos dados, relativos à raiz."""
+        root_node = TreeNode(root_name)
+        for rel in rel_paths:
+            root_node.add_path(rel.split(os.sep))
+        return root_node
+
+    def _report_output(self, writer):
+        """Registra os arquivos gerados; retorna o texto do destino para as mensagens."""
+        paths = writer.paths
+        self._last_output_path = paths[0] if paths else None
+        if len(paths) <= 1:
+            return paths[0] if paths else ""
+        for path in paths:
+            self.output_text.AppendText(f"  • {os.path.basename(path)}\n")
+        return f"{len(paths)} partes em {os.path.dirname(paths[0])}"
+
+    def _render_blocks(self, work):
+        """
+        Lê e formata os blocos de `work` [(caminho, nome, caminho no cabeçalho)],
+        gerando (item, (bloco, moldura)) na ordem da lista. Por padrão threads
+        leem os próximos arquivos adiante; com "jobs" > 1 na configuração,
+        processos leem e formatam lotes e devolvem bytes prontos.
+        """
+        work = [(path, name, rel, self._facts.fresh(path)) for path, name, rel in work]
+        fmt = self._output_format().key
+        jobs = resolve_jobs(self._jobs)
+        if jobs > 1:
+            return ordered_batches(partial(_render_copy_batch, fmt=fmt), work, jobs=jobs)
+        return ordered_map(lambda item: _render_copy_block(*item, fmt=fmt), work,
+                           max_bytes=self._read_ahead_bytes,
+                           size_of=lambda item: file_size(item[0]))
+
+    @staticmethod
+    def _write_block(writer, key, block, frame, item):
+        """
+        Escreve o bloco de `item` (caminho, nome, caminho no cabeçalho, fatos) em
+        `writer`, com `key` na árvore da parte e `frame` (BlockFrame) dando os
+        cabeçalhos. Retorna None, ou o motivo se o arquivo acabou ignorado: um
+        PassthroughBlock cujo arquivo mudou desde a validação é lido de novo.
+        """
+        rel_path = item[2]
+        for _attempt in range(2):
+            if writer.write_block(key, block, frame.head, frame.tail, frame.pieces,
+                                  path=rel_path, ref_head=frame.ref_head):
+                return None
+            block, frame = _render_copy_block(*item[:3], fmt=frame.format)
+            if block is None:
+                return frame
+        return "alterado"
+
     def _confirm_large_output(self, files_list):
-        """Pede confirmação se o output for muito grande. Retorna True para prosseguir."""
-        total_size = sum(os.path.getsize(f) for f in files_list
-                         if os.path.isfile(f))
+        """
+        Pede confirmação se o output for muito grande. Retorna True para prosseguir.
+        Guarda a razão bytes/token da seleção para o orçamento das partes (_open_output).
+        """
+        # Um stat por arquivo: tamanhos e tokens contados pelo tokenizador; arquivos
+        # ainda sem contagem, pela estimativa
+        total = self._tokens.total(files_list)
+        total_size = total.size
         size_mb = total_size / (1024 * 1024)
-        est_tokens = total_size // 4  # ~4 bytes por token
+        est_tokens = total.tokens + total.pending_size // BYTES_PER_TOKEN
+        self._output_bytes_per_token = total.bytes_per_token or BYTES_PER_TOKEN
+        budget = self._shard_budget()
 
-        if size_mb > 20 or est_tokens > 100_000:
+        # Em partes, o limite de tokens já é respeitado por arquivo gerado
+        if size_mb > 20 or (budget is None and est_tokens > 100_000):
+            parts = f" em ~{-(-total_size // budget)} parte(s)" if budget else ""
             result = wx.MessageBox(
-                f"⚠ Output estimado: {size_mb:.1f} MB / ~{est_tokens:,} tokens.\n"
+                f"⚠ Output estimado: {size_mb:.1f} MB / ~{est_tokens:,} tokens{parts}.\n"
                 f"Isso pode ser muito grande. Deseja continuar?",
                 "Confirmação", wx.YES_NO | wx.ICON_WARNING)
             return result == wx.YES
         return True
 
     def copy_by_extensions(self, source_dir, output_dir, sel_extensions):
-        output_file_path = os.path.join(output_dir, "codigo_completo.txt")
         self.output_text.AppendText(
             f"Copiando extensões: {sel_extensions}\n")
         files_copied = 0
@@ -1693,13 +2540,26 @@ class MyFrame(wx.Frame):
         if self._apply_gitignore:
             rules_applied.append(".gitignore")
 
-        with open(output_file_path, "w", encoding="utf-8") as f_out:
-            f_out.write(self._build_metadata_header(
-                source_dir, len(preview_files), rules_applied))
-            root_node = TreeNode(os.path.basename(source_dir) or source_dir)
+        root_name = os.path.basename(source_dir) or source_dir
+        root_node = TreeNode(root_name)
+        fmt = self._output_format()
+
+        def footer(part, keys):
+            # Sem divisão, a árvore completa da travessia; em partes, só o que a parte contém
+            tree = root_node if part is None else self._tree_from_paths(root_name, keys)
+            return fmt.footer("Estrutura de pastas (relativa à Entrada):", tree.iter_lines())
+
+        writer = self._open_output(
+            output_dir,
+            lambda part: self._build_metadata_header(
+                source_dir, len(preview_files), rules_applied, part),
+            footer)
+        with writer:
+            # Arquivos a copiar, na ordem da travessia: (pasta na árvore, nó do arquivo)
+            planned = []
+            work = []
 
             def _process_dir(current_dir, current_treenode):
-                nonlocal files_copied
                 try:
                     items = sorted(os.listdir(current_dir), key=sort_key)
                 except OSError as e:
@@ -1722,43 +2582,42 @@ class MyFrame(wx.Frame):
                             continue
                         if self._is_gitignored(item_path, source_dir):
                             continue
-                        content, enc = _read_file_with_fallback(item_path)
-                        rel_path = os.path.relpath(item_path, source_dir)
-                        if content is None:
-                            self.output_text.AppendText(
-                                f"[{enc.upper()} IGNORADO] {rel_path}\n")
-                            continue
-                        f_out.write("=" * 42 + "\n")
-                        f_out.write(f"Conteúdo de {item} "
-                                    f"(caminho: {rel_path}) [enc: {enc}]:\n")
-                        f_out.write("=" * 42 + "\n")
-                        f_out.write(content + "\n\n")
-                        current_treenode.add_child(TreeNode(item))
-                        files_copied += 1
-                        self.progress_gauge.SetValue(min(files_copied,
-                                                         self.progress_gauge.GetRange()))
-                        wx.YieldIfNeeded()
+                        # O nó entra já na posição da travessia; sai se o arquivo for ignorado
+                        file_node = TreeNode(item)
+                        current_treenode.add_child(file_node)
+                        planned.append((current_treenode, file_node))
+                        work.append((item_path, item, os.path.relpath(item_path, source_dir)))
 
             _process_dir(source_dir, root_node)
-            f_out.write("\n" + "=" * 42 + "\n")
-            f_out.write("Estrutura de pastas (relativa à Entrada):\n")
-            f_out.write("=" * 42 + "\n")
-            f_out.write(root_node.print_tree())
+
+            # Leitura/formatação em paralelo; a escrita segue a ordem da travessia
+            blocks = self._render_blocks(work)
+            for (parent_node, file_node), (item, (block, frame)) in zip(planned, blocks):
+                reason = frame if block is None else self._write_block(
+                    writer, item[2], block, frame, item)
+                if reason is not None:
+                    self.output_text.AppendText(
+                        f"[{reason.upper()} IGNORADO] {item[2]}\n")
+                    parent_node.remove_child(file_node)
+                    continue
+                files_copied += 1
+                self.progress_gauge.SetValue(min(files_copied,
+                                                 self.progress_gauge.GetRange()))
+                wx.YieldIfNeeded()
 
         self.progress_gauge.Hide()
         self.main_sizer.Layout()
-        self._last_output_path = output_file_path
+        destination = self._report_output(writer)
         self.output_text.AppendText(
-            f"\n✓ Cópia concluída: {files_copied} arquivo(s) → {output_file_path}\n")
+            f"\n✓ Cópia concluída: {files_copied} arquivo(s) → {destination}\n")
         if files_copied > 0:
-            wx.MessageBox(f"{files_copied} arquivo(s) copiado(s) para:\n{output_file_path}",
+            wx.MessageBox(f"{files_copied} arquivo(s) copiado(s) para:\n{destination}",
                           "Sucesso", wx.OK | wx.ICON_INFORMATION)
         else:
             wx.MessageBox("Nenhum arquivo encontrado com as extensões selecionadas.",
                           "Aviso", wx.OK | wx.ICON_WARNING)
 
     def copy_by_selected_file_paths(self, source_dir, output_dir, sel_files_paths):
-        output_file_path = os.path.join(output_dir, "codigo_completo.txt")
         self.output_text.AppendText(
             f"Copiando {len(sel_files_paths)} arquivo(s)...\n")
         files_copied = 0
@@ -1787,6 +2646,7 @@ class MyFrame(wx.Frame):
                      if common_prefix.startswith(source_dir)
                      else os.path.basename(common_prefix or "arquivos_selecionados"))
         root_node = TreeNode(root_name or "Raiz")
+        fmt = self._output_format()
 
         rules_applied = []
         if self._use_ignore_patterns():
@@ -1794,65 +2654,59 @@ class MyFrame(wx.Frame):
         if self._apply_gitignore:
             rules_applied.append(".gitignore")
 
-        with open(output_file_path, "w", encoding="utf-8") as f_out:
-            f_out.write(self._build_metadata_header(
-                source_dir, len(sel_files_paths), rules_applied))
-
-            for i, file_path in enumerate(sel_files_paths):
+        def footer(part, keys):
+            tree = root_node if part is None else self._tree_from_paths(root_node.name, keys)
+            return fmt.footer("Estrutura (relativa ao ancestral comum ou Entrada):",
+                              tree.iter_lines())
+
+        writer = self._open_output(
+            output_dir,
+            lambda part: self._build_metadata_header(
+                source_dir, len(sel_files_paths), rules_applied, part),
+            footer)
+        with writer:
+            work = []
+            for file_path in sel_files_paths:
                 try:
-                    rel_tree = os.path.relpath(file_path, common_prefix)
+                    path_header = os.path.relpath(file_path, source_dir)
                 except ValueError:
-                    rel_tree = os.path.basename(file_path)
-                parts = rel_tree.split(os.sep)
-                current_node = root_node
-                for idx_p, part_name in enumerate(parts):
-                    is_last = (idx_p == len(parts) - 1)
-                    found = next((c for c in current_node.children
-                                  if c.name == part_name), None)
-                    if found:
-                        current_node = found
-                    else:
-                        new_node = TreeNode(part_name)
-                        current_node.add_child(new_node)
-                        current_node = new_node
+                    path_header = file_path
+                work.append((file_path, os.path.basename(file_path), path_header))
 
+            # Os próximos arquivos já são lidos em paralelo; a escrita segue a ordem da lista
+            blocks = self._render_blocks(work)
+            for i, (item, (block, frame)) in enumerate(blocks):
+                file_path, _name, path_header, _facts = item
                 try:
-                    path_header = os.path.relpath(file_path, source_dir)
+                    rel_tree = os.path.relpath(file_path, common_prefix)
                 except ValueError:
-                    path_header = file_path
+                    rel_tree = os.path.basename(file_path)
+                root_node.add_path(rel_tree.split(os.sep))
 
-                content, enc = _read_file_with_fallback(file_path)
-                if content is None:
+                reason = frame if block is None else self._write_block(
+                    writer, rel_tree, block, frame, item)
+                if reason is not None:
                     self.output_text.AppendText(
-                        f"[{enc.upper()} IGNORADO] {path_header}\n")
+                        f"[{reason.upper()} IGNORADO] {path_header}\n")
                     self.progress_gauge.SetValue(i + 1)
                     continue
 
-                f_out.write("=" * 42 + "\n")
-                f_out.write(f"Conteúdo de {os.path.basename(file_path)} "
-                            f"(caminho: {path_header}) [enc: {enc}]:\n")
-                f_out.write("=" * 42 + "\n")
-                f_out.write(content + "\n\n")
                 files_copied += 1
                 self.progress_gauge.SetValue(i + 1)
                 if i % 10 == 0:
                     wx.YieldIfNeeded()
 
-            f_out.write("\n" + "=" * 42 + "\n")
-            f_out.write("Estrutura (relativa ao ancestral comum ou Entrada):\n")
-            f_out.write("=" * 42 + "\n")
-            f_out.write(root_node.print_tree())
-
         self.progress_gauge.Hide()
         self.main_sizer.Layout()
-        self._last_output_path = output_file_path
+        destination = self._report_output(writer)
         self.output_text.AppendText(
-            f"\n✓ {files_copied} arquivo(s) copiado(s) → {output_file_path}\n")
-        wx.MessageBox(f"{files_copied} arquivo(s) copiado(s) para:\n{output_file_path}",
+            f"\n✓ {files_copied} arquivo(s) copiado(s) → {destination}\n")
+        wx.MessageBox(f"{files_copied} arquivo(s) copiado(s) para:\n{destination}",
                       "Sucesso", wx.OK | wx.ICON_INFORMATION)
 
     def copy_arbitrary_files(self, output_dir, arbitrary_file_paths):
-        output_file_path = os.path.join(output_dir, "codigo_completo.txt")
+        fmt = self._output_format()
+        output_file_path = os.path.join(output_dir, self._output_file_name())
         self.output_text.AppendText(
             f"Unindo {len(arbitrary_file_paths)} arquivo(s) avulso(s)...\n")
         files_copied = 0
@@ -1870,31 +2724,25 @@ class MyFrame(wx.Frame):
         self.main_sizer.Layout()
 
         with open(output_file_path, "w", encoding="utf-8") as f_out:
-            f_out.write(self._build_metadata_header(
-                "Arquivos Avulsos", len(arbitrary_file_paths)))
+            f_out.write(fmt.header(self._build_metadata_header(
+                "Arquivos Avulsos", len(arbitrary_file_paths))))
 
             for i, file_path in enumerate(arbitrary_file_paths):
-                content, enc = _read_file_with_fallback(file_path)
+                content, enc = _read_file_with_fallback(file_path, self._facts.fresh(file_path))
                 if content is None:
                     self.output_text.AppendText(
                         f"[{enc.upper()} IGNORADO] {file_path}\n")
                     self.progress_gauge.SetValue(i + 1)
                     continue
-                f_out.write("=" * 42 + "\n")
-                f_out.write(f"Conteúdo de {os.path.basename(file_path)} "
-                            f"(caminho original: {file_path}) [enc: {enc}]:\n")
-                f_out.write("=" * 42 + "\n")
-                f_out.write(content + "\n\n")
+                frame = fmt.frame(os.path.basename(file_path), file_path, enc, content)
+                f_out.write(fmt.block(frame, content))
                 files_copied += 1
                 self.progress_gauge.SetValue(i + 1)
                 if i % 10 == 0:
                     wx.YieldIfNeeded()
 
-            f_out.write("\n" + "=" * 42 + "\n")
-            f_out.write("Arquivos Avulsos (Caminhos Originais):\n")
-            f_out.write("=" * 42 + "\n")
-            for fp in arbitrary_file_paths:
-                f_out.write(f"- {fp}\n")
+            f_out.writelines(fmt.footer("Arquivos Avulsos (Caminhos Originais):",
+                                        (f"- {fp}\n" for fp in arbitrary_file_paths)))
 
         self.progress_gauge.Hide()
         self.main_sizer.Layout()
@@ -1912,11 +2760,11 @@ class MyFrame(wx.Frame):
     # -----------------------------------------------------------------------
 
     def _on_copy_to_clipboard(self, event):
-        """Copia o conteúdo do último codigo_completo.txt para a área de transferência."""
+        """Copia o conteúdo da última saída (codigo_completo.*) para a área de transferência."""
         if not self._last_output_path or not os.path.isfile(self._last_output_path):
             # Tentar encontrar no diretório de saída
             output_dir = self.output_dir_picker.GetPath()
-            candidate = os.path.join(output_dir, "codigo_completo.txt") if output_dir else None
+            candidate = os.path.join(output_dir, self._output_file_name()) if output_dir else None
             if candidate and os.path.isfile(candidate):
                 self._last_output_path = candidate
             else:
@@ -1925,7 +2773,14 @@ class MyFrame(wx.Frame):
                     "Aviso", wx.OK | wx.ICON_WARNING)
                 return
 
-        content, enc = _read_file_with_fallback(self._last_output_path)
+        if compression_for(self._last_output_path):
+            try:
+                with open_input(self._last_output_path) as f:
+                    content = io.TextIOWrapper(f, encoding="utf-8").read()
+            except Exception:
+                content = None
+        else:
+            content, enc = _read_file_with_fallback(self._last_output_path)
         if content is None:
             wx.MessageBox("Não foi possível ler o arquivo de saída.", "Erro",
                           wx.OK | wx.ICON_ERROR)
@@ -1950,6 +2805,7 @@ class MyFrame(wx.Frame):
     # -----------------------------------------------------------------------
 
     def on_clear_all(self, event):
+        self._stop_live_watch()
         self.Freeze()
         try:
             self.source_dir_picker.SetPath("")
@@ -1989,6 +2845,7 @@ class MyFrame(wx.Frame):
                 self.file_tree.Freeze()
                 try:
                     self.file_tree.DeleteAllItems()
+                    self._tree_loaded.clear()
                 finally:
                     self.file_tree.Thaw()
 
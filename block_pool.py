@@ -0,0 +1,81 @@
+"""Etapa opcional em processos para montar os blocos da saída (`--jobs`).
+
+Com a leitura já antecipada (read_ahead.py), o que sobra na geração da saída é
+CPU: decodificar (cascata latin-1/cp1252), normalizar quebras de linha e
+montar as strings de cada bloco — tudo preso ao GIL. Aqui os itens são
+agrupados em lotes e enviados a um ProcessPoolExecutor; cada processo lê,
+decodifica e formata o lote inteiro e devolve os blocos prontos (bytes já
+codificados ou str). O processo principal só concatena, na ordem original,
+então a saída é idêntica à do caminho serial.
+
+`fn` recebe uma lista de itens e devolve uma lista de resultados do mesmo
+tamanho; precisa ser uma função de nível de módulo (picklable), assim como
+os itens. Poucos lotes ficam em voo por vez, então a memória não cresce com
+o número de arquivos.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+DEFAULT_BATCH_SIZE = 32
+
+
+def cpu_jobs() -> int:
+    """Valor de `--jobs 0`: um processo por núcleo disponível."""
+    try:
+        return max(1, len(os.sched_getaffinity(0)))
+    except (AttributeError, OSError):
+        return os.cpu_count() or 1
+
+
+def resolve_jobs(jobs: Optional[int]) -> int:
+    """None/1 = serial; 0 = todos os núcleos; N = N processos."""
+    if jobs is None:
+        return 1
+    return cpu_jobs() if jobs <= 0 else jobs
+
+
+def ordered_batches(fn: Callable[[List[T]], List[R]], items: Iterable[T], *, jobs: int,
+                    batch_size: int = DEFAULT_BATCH_SIZE,
+                    cancel_event: Optional[threading.Event] = None) -> Iterator[Tuple[T, R]]:
+    """Aplica `fn` a lotes de `items` em `jobs` processos; gera (item, resultado) em ordem.
+
+    Exceções levantadas nos processos são repassadas ao consumidor.
+    """
+    source = iter(items)
+    window = jobs * 2
+    pending: deque = deque()      # (lote, future)
+
+    def next_batch():
+        batch = []
+        for item in source:
+            batch.append(item)
+            if len(batch) >= batch_size:
+                break
+        return batch
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        try:
+            while True:
+                while len(pending) < window:
+                    if cancel_event is not None and cancel_event.is_set():
+                        break
+                    batch = next_batch()
+                    if not batch:
+                        break
+                    pending.append((batch, pool.submit(fn, batch)))
+                if not pending:
+                    return
+                batch, future = pending.popleft()
+                yield from zip(batch, future.result())
+        finally:
+            for _batch, future in pending:
+                future.cancel()
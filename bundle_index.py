@@ -0,0 +1,167 @@
+"""Índice no fim do bundle (trailer) para acesso direto a cada arquivo.
+
+Para achar os blocos de um codigo_completo.txt é preciso varrer o texto todo
+atrás dos cabeçalhos. Com o índice ligado, os writers acrescentam, depois da
+árvore "Estrutura de pastas", uma seção legível por máquina:
+
+    ==========================================
+    Índice de arquivos (deslocamento, tamanho, crc32, caminho):
+    ==========================================
+    1234\t5678\t89abcdef\t"projeto/src/main.py"
+    ...
+    copiador-index 1 <início do índice> <entradas>
+
+Deslocamento e tamanho são bytes do texto (descompactado) e cobrem só o
+conteúdo do arquivo, sem o cabeçalho e o rodapé do bloco; o crc32 é desses
+bytes. O caminho é o do cabeçalho, em JSON. Um arquivo cortado em trechos
+tem uma linha por trecho, na ordem, e os trechos concatenados dão o conteúdo.
+Um arquivo deduplicado ("[igual a: ...]", ver dedup) aponta para o conteúdo
+da primeira ocorrência.
+
+A última linha é curta: quem lê busca o fim do arquivo, acha o começo do
+índice e vai direto (seek) ao conteúdo de qualquer arquivo. Restauradores que
+não conhecem o índice param no marcador da árvore e não o veem. Em .gz/.xz
+o seek ainda descompacta o texto até a posição pedida.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import zlib
+from typing import BinaryIO, Dict, List, NamedTuple, Optional
+
+from passthrough import PassthroughBlock, write_block as write_passthrough_block
+
+MAGIC = "copiador-index"
+VERSION = 1
+TITLE = "Índice de arquivos (deslocamento, tamanho, crc32, caminho):"
+SEP = "=" * 42
+
+# A última linha ("copiador-index 1 <início> <entradas>\n") cabe nisso com folga
+_TAIL_PROBE = 128
+# Bytes fixos do índice (título e última linha), para orçamentos
+TRAILER_OVERHEAD = len(f"\n{SEP}\n{TITLE}\n{SEP}\n".encode("utf-8")) + 64
+
+
+class IndexEntry(NamedTuple):
+    path: str
+    offset: int     # byte em que o conteúdo começa
+    length: int     # bytes do conteúdo
+    crc32: int
+
+
+def entry_cost(path: str) -> int:
+    """Estimativa (bytes) da linha de `path` no índice, para orçamentos."""
+    return len(path.encode("utf-8")) + 32
+
+
+def position(out) -> int:
+    """Bytes já gravados em `out` (arquivo de texto ou binário, comprimido ou não)."""
+    out.flush()
+    return getattr(out, "buffer", out).tell()
+
+
+class IndexRecorder:
+    """
+    Coleta as entradas de um arquivo de saída enquanto ele é escrito.
+    `newline` é o mesmo passado ao open() da saída (None = os.linesep), para
+    medir o texto como ele fica gravado.
+    """
+
+    def __init__(self, newline: Optional[str] = "\n"):
+        self.entries: List[IndexEntry] = []
+        self._by_path: Dict[str, IndexEntry] = {}
+        self._newline = os.linesep if newline is None else newline
+
+    def encoded(self, text: str) -> bytes:
+        """`text` como a escrita em modo texto o grava."""
+        if self._newline != "\n":
+            text = text.replace("\n", self._newline)
+        return text.encode("utf-8")
+
+    def add(self, path: str, offset: int, data) -> None:
+        """Registra `data` (bytes gravados) como conteúdo de `path` a partir de `offset`."""
+        self._append(IndexEntry(path, offset, len(data), zlib.crc32(data)))
+
+    def _append(self, entry: IndexEntry) -> None:
+        self.entries.append(entry)
+        self._by_path[entry.path] = entry
+
+    def add_alias(self, path: str, original: str) -> None:
+        """`path` tem o mesmo conteúdo de `original`, já registrado: mesma posição."""
+        entry = self._by_path.get(original)
+        if entry is not None:
+            self._append(entry._replace(path=path))
+
+    def write_text(self, out, path: str, block: str, head: str, tail: str) -> None:
+        """Escreve `block` (cabeçalho + conteúdo + rodapé) e registra o conteúdo."""
+        start = position(out) + len(self.encoded(head))
+        out.write(block)
+        self.add(path, start, self.encoded(block[len(head):len(block) - len(tail)]))
+
+    def write_bytes(self, out, path: str, block: bytes, head: str, tail: str) -> None:
+        """Como write_text, para um bloco já codificado (com as quebras de linha gravadas)."""
+        head_size = len(self.encoded(head))
+        start = position(out) + head_size
+        out.buffer.write(block)
+        self.add(path, start, memoryview(block)[head_size:len(block) - len(self.encoded(tail))])
+
+    def write_passthrough(self, out, path: str, block: PassthroughBlock) -> bool:
+        """passthrough.write_block registrando o trecho copiado; False se o arquivo mudou."""
+        start = position(out) + len(self.encoded(block.head))
+        if not write_passthrough_block(out, block):
+            return False
+        span = block.span
+        self._append(IndexEntry(path, start, span.length, span.crc32))
+        return True
+
+    def write_trailer(self, out) -> int:
+        """Acrescenta o índice em `out`, na posição atual (depois da árvore).
+        Retorna os caracteres escritos."""
+        out.write("\n")
+        start = position(out)
+        lines = [SEP, TITLE, SEP]
+        lines.extend(f"{e.offset}\t{e.length}\t{e.crc32:08x}\t{json.dumps(e.path, ensure_ascii=False)}"
+                     for e in self.entries)
+        lines.append(f"{MAGIC} {VERSION} {start} {len(self.entries)}")
+        text = "\n".join(lines) + "\n"
+        out.write(text)
+        return 1 + len(text)
+
+
+def read_index(f: BinaryIO) -> Optional[List[IndexEntry]]:
+    """Entradas do índice no fim de `f` (binário, com seek), ou None se não houver."""
+    try:
+        size = f.seek(0, 2)
+        f.seek(max(0, size - _TAIL_PROBE))
+        tail = f.read().rstrip(b"\r\n")
+        last = tail.rsplit(b"\n", 1)[-1].decode("ascii").split()
+        if len(last) != 4 or last[0] != MAGIC or last[1] != str(VERSION):
+            return None
+        start, count = int(last[2]), int(last[3])
+        f.seek(start)
+        text = f.read(size - start).decode("utf-8").replace("\r\n", "\n")
+        lines = text.rstrip("\n").split("\n")
+    except (OSError, ValueError, UnicodeDecodeError):
+        return None
+    # Separador, título, separador, entradas, linha final
+    if len(lines) != count + 4 or lines[1] != TITLE:
+        return None
+    entries = []
+    try:
+        for line in lines[3:3 + count]:
+            offset, length, crc, path = line.split("\t", 3)
+            entries.append(IndexEntry(json.loads(path), int(offset), int(length), int(crc, 16)))
+    except ValueError:
+        return None
+    return entries
+
+
+def read_entry(f: BinaryIO, entry: IndexEntry) -> bytes:
+    """Conteúdo de `entry` lido direto da posição; ValueError se o crc32 não bate."""
+    f.seek(entry.offset)
+    data = f.read(entry.length)
+    if len(data) != entry.length or zlib.crc32(data) != entry.crc32:
+        raise ValueError(f"Conteúdo não confere com o índice: {entry.path}")
+    return data
@@ -5,21 +5,38 @@ Exemplos:
   python3 compactar_projeto.py ./minha-pasta
   python3 compactar_projeto.py ./minha-pasta -o ./codigo_completo.txt
   python3 compactar_projeto.py ./minha-pasta --sem-filtros
+  python3 compactar_projeto.py ./minha-pasta --somente-rastreados
+  python3 compactar_projeto.py ./minha-pasta --comprimir gz
+  python3 compactar_projeto.py ./minha-pasta --indice
+  python3 compactar_projeto.py ./minha-pasta --deduplicar
+  python3 compactar_projeto.py ./minha-pasta --formato markdown
 
 O arquivo gerado contém apenas arquivos de texto UTF-8. Arquivos binários,
 arquivos em codificação não UTF-8 e itens ignorados são listados no resumo.
-Nenhum conteúdo é enviado à rede.
+Nenhum conteúdo é enviado à rede. Com --formato, a saída pode ser Markdown,
+XML ou JSONL em vez dos blocos de texto (ver output_format); só o formato
+texto, ou um bundle com --indice, é restaurável.
 """
 
 from __future__ import annotations
 
 import argparse
-import fnmatch
 import sys
 from dataclasses import dataclass
+from functools import partial
 from datetime import datetime
 from pathlib import Path
-from typing import Iterable
+
+from block_pool import ordered_batches, resolve_jobs
+from bundle_index import IndexRecorder
+from dedup import ContentDeduper
+from compressed_output import SUFFIXES, compression_for, open_text, suffix_for
+from git_index import tracked_files
+from ignore_matcher import IgnoreMatcher
+from output_format import DEFAULT_FORMAT, FORMATS, OutputFormat, get_format
+from passthrough import PassthroughBlock, utf8_span, write_block
+from read_ahead import ordered_map
+from walker import walk_files
 
 SEP = "=" * 42
 
@@ -50,32 +67,60 @@ DEFAULT_IGNORE_PATTERNS = (
 class Skip:
     path: Path
     reason: str
+    is_dir: bool = False    # pasta cortada pelo filtro: o conteúdo nem foi percorrido
 
 
-def matches_pattern(name: str, pattern: str) -> bool:
-    """Compara o nome de um arquivo/pasta a um padrão simples com * e ?."""
-    return fnmatch.fnmatchcase(name.casefold(), pattern.casefold())
+def render_block(abs_path: str, rel_with_root: str,
+                 fmt: str = DEFAULT_FORMAT) -> tuple[PassthroughBlock | None, str | None]:
+    """Aceita somente texto UTF-8: (bloco, None) ou (None, motivo).
 
+    NUL indica arquivo binário com segurança; um BOM inicial fica fora do
+    bloco (como em utf-8-sig). O arquivo é só validado, não decodificado: o
+    bloco guarda o trecho a copiar e os bytes vão direto para a saída. Nos
+    formatos sem cópia direta (`fmt` markdown/jsonl), o trecho é lido na escrita.
+    """
+    try:
+        span = utf8_span(abs_path, strip_bom=True)
+    except OSError as exc:
+        return None, f"erro de leitura: {exc}"
+    if span is None:
+        return None, "binário ou não UTF-8"
+    frame = get_format(fmt).frame(Path(abs_path).name, rel_with_root, "utf-8")
+    return PassthroughBlock(frame.head, abs_path, span, frame.tail), None
+
+
+def render_batch(batch: list[tuple[str, str]],
+                 fmt: str = DEFAULT_FORMAT) -> list[tuple[PassthroughBlock | None, str | None]]:
+    """Lote de render_block executado em um processo do --jobs."""
+    return [render_block(abs_path, rel, fmt) for abs_path, rel in batch]
+
+
+def span_text(block: PassthroughBlock) -> str:
+    """Conteúdo validado de `block` como texto (formatos que não copiam bytes)."""
+    try:
+        with open(block.path, "rb") as f:
+            f.seek(block.span.offset)
+            data = f.read(block.span.length)
+    except OSError:
+        data = b""
+    return data.decode("utf-8", "replace")
 
-def should_ignore(path: Path, root: Path, patterns: Iterable[str]) -> bool:
-    """Retorna True se qualquer componente relativo corresponder a um padrão."""
-    return any(
-        matches_pattern(part, pattern)
-        for part in path.relative_to(root).parts
-        for pattern in patterns
-    )
 
+def write_changed_block(handle, block: PassthroughBlock, rel_with_root: str,
+                        index: IndexRecorder | None = None) -> None:
+    """Arquivo alterado entre a validação e a escrita: grava o conteúdo atual.
 
-def decode_text(path: Path) -> str | None:
-    """Lê somente texto UTF-8. NUL indica arquivo binário com segurança."""
-    data = path.read_bytes()
-    if b"\0" in data:
-        return None
+    Ele já foi contado no cabeçalho, então entra mesmo que agora falhe.
+    """
     try:
-        # utf-8-sig também remove um BOM, quando houver.
-        return data.decode("utf-8-sig")
-    except UnicodeDecodeError:
-        return None
+        content = Path(block.path).read_bytes().decode("utf-8-sig", "replace")
+    except OSError:
+        content = ""
+    text = block.head + content + block.tail
+    if index is None:
+        handle.write(text)
+    else:
+        index.write_text(handle, rel_with_root, text, block.head, block.tail)
 
 
 def tree_text(relative_paths: list[Path], root_name: str) -> str:
@@ -103,66 +148,145 @@ def tree_text(relative_paths: list[Path], root_name: str) -> str:
     return "\n".join(lines) + "\n"
 
 
-def compact(source: Path, output: Path, patterns: tuple[str, ...]) -> tuple[int, list[Skip]]:
+def write_text_block(handle, output_format: OutputFormat, block: PassthroughBlock,
+                     rel_with_root: str, index: IndexRecorder | None = None,
+                     deduper: ContentDeduper | None = None) -> None:
+    """Bloco de um formato que reescreve o conteúdo (Markdown, JSONL): lido como texto."""
+    content = span_text(block)
+    frame = output_format.frame(Path(block.path).name, rel_with_root, "utf-8", content)
+    text = output_format.block(frame, content)
+    if deduper is not None:
+        body = text[len(frame.head):len(text) - len(frame.tail)].encode("utf-8")
+        first = deduper.find_bytes(body)
+        if first is not None:
+            handle.write(frame.ref_head(first) + frame.tail)
+            if index is not None:
+                index.add_alias(rel_with_root, first)
+            return
+        deduper.add_bytes(rel_with_root, body)
+    if index is None:
+        handle.write(text)
+    else:
+        index.write_text(handle, rel_with_root, text, frame.head, frame.tail)
+
+
+def compact(
+    source: Path,
+    output: Path,
+    patterns: tuple[str, ...],
+    tracked_only: bool = False,
+    jobs: int | None = None,
+    compression: str | None = None,
+    index: bool = False,
+    dedup: bool = False,
+    fmt: str = DEFAULT_FORMAT,
+) -> tuple[int, list[Skip]]:
     source = source.resolve()
     output = output.resolve()
     if not source.is_dir():
         raise ValueError(f"A pasta de origem não existe ou não é uma pasta: {source}")
     if output == source or source in output.parents:
         raise ValueError("O arquivo de saída deve ficar fora da pasta de origem.")
+    output_format = get_format(fmt)
+    if index and not output_format.indexable:
+        raise ValueError(f"O formato {output_format.key} não aceita --indice.")
 
-    included: list[tuple[Path, str]] = []
+    included: list[tuple[str, PassthroughBlock]] = []   # (caminho relativo, bloco)
     skipped: list[Skip] = []
 
-    # rglob é ordenado para que a saída seja repetível e mais fácil de comparar.
-    for path in sorted(source.rglob("*"), key=lambda p: str(p.relative_to(source)).casefold()):
-        if not path.is_file():
-            continue
-        if should_ignore(path, source, patterns):
-            skipped.append(Skip(path, "padrão global"))
+    # Um IgnoreMatcher para todos os padrões (fnmatch sem diferenciar maiúsculas),
+    # compilado uma vez por execução.
+    matcher = IgnoreMatcher.fnmatch(patterns, fold=str.casefold)
+
+    def ignore(name: str, rel: str, is_dir: bool) -> bool:
+        return matcher.matches(name)
+
+    def on_skip(rel: str, is_dir: bool) -> None:
+        # Pastas ignoradas nem chegam a ser lidas: entram como pasta, contadas à parte
+        skipped.append(Skip(source / rel, "padrão global", is_dir))
+
+    # O walker lê as pastas em paralelo; com tracked_only a lista vem do
+    # .git/index, sem percorrer a pasta. A ordenação garante uma saída
+    # repetível e mais fácil de comparar.
+    if tracked_only:
+        found = tracked_files(source, ignore, on_skip=on_skip)
+        if found is None:
+            raise ValueError(f"A pasta não está em um repositório git: {source}")
+    else:
+        found = walk_files(source, ignore, on_skip=on_skip)
+    entries = sorted(found, key=lambda entry: entry.rel_path.casefold())
+    # O nome da pasta raiz é incluído, assim a restauração recria o projeto
+    # dentro da pasta destino, como ocorre no seletor de diretório do HTML.
+    items = [(entry.abs_path, f"{source.name}/{entry.rel_path}") for entry in entries]
+
+    # Os resultados chegam na ordem de `items` nos dois caminhos: com --jobs,
+    # processos validam lotes de arquivos; sem ele, threads validam adiante.
+    # Nada do conteúdo fica em memória: a escrita copia os bytes de cada arquivo.
+    workers = resolve_jobs(jobs)
+    if workers > 1:
+        rendered = ordered_batches(partial(render_batch, fmt=fmt), items, jobs=workers)
+    else:
+        sizes = {entry.abs_path: entry.size or 0 for entry in entries}
+        rendered = ordered_map(lambda item: render_block(*item, fmt), items,
+                               size_of=lambda item: sizes[item[0]])
+    for (abs_path, rel_with_root), (block, reason) in rendered:
+        if block is None:
+            skipped.append(Skip(Path(abs_path), reason))
             continue
-        try:
-            content = decode_text(path)
-        except OSError as exc:
-            skipped.append(Skip(path, f"erro de leitura: {exc}"))
-            continue
-        if content is None:
-            skipped.append(Skip(path, "binário ou não UTF-8"))
-            continue
-        included.append((path, content))
+        included.append((rel_with_root.split("/", 1)[1], block))
 
     output.parent.mkdir(parents=True, exist_ok=True)
     now = datetime.now().astimezone().strftime("%d/%m/%Y %H:%M:%S %z")
 
     # newline='\n' garante o formato esperado pelo restaurador em qualquer SO.
-    with output.open("w", encoding="utf-8", newline="\n") as handle:
-        handle.write("=" * 60 + "\n")
-        handle.write("  COPIADOR DE CÓDIGO v2.1 — Python Edition\n")
-        handle.write("=" * 60 + "\n")
-        handle.write(f"  Data/Hora     : {now}\n")
-        handle.write(f"  Origem        : {source}\n")
-        handle.write(f"  Total arquivos: {len(included)}\n")
-        if patterns:
-            handle.write("  Filtros       : padrões globais\n")
-        handle.write("=" * 60 + "\n\n")
-
-        relative_paths: list[Path] = []
-        for path, content in included:
-            rel = path.relative_to(source)
-            # O nome da pasta raiz é incluído, assim a restauração recria o projeto
-            # dentro da pasta destino, como ocorre no seletor de diretório do HTML.
-            rel_with_root = Path(source.name) / rel
-            relative_paths.append(rel)
-            handle.write(SEP + "\n")
-            handle.write(
-                f"Conteúdo de {path.name} (caminho: {rel_with_root.as_posix()}) [enc: utf-8]:\n"
-            )
-            handle.write(SEP + "\n")
-            handle.write(content)
-            handle.write("\n\n")
-
-        handle.write("\n" + SEP + "\nEstrutura de pastas:\n" + SEP + "\n")
-        handle.write(tree_text(relative_paths, source.name))
+    # Com compressão, blocos do texto são comprimidos em paralelo (membros gzip/xz).
+    with open_text(output, compression, newline="\n") as handle:
+        header = "=" * 60 + "\n"
+        header += "  COPIADOR DE CÓDIGO v2.1 — Python Edition\n"
+        header += "=" * 60 + "\n"
+        header += f"  Data/Hora     : {now}\n"
+        header += f"  Origem        : {source}\n"
+        header += f"  Total arquivos: {len(included)}\n"
+        filters = (["padrões globais"] if patterns else []) + (
+            ["somente rastreados"] if tracked_only else []
+        )
+        if filters:
+            header += f"  Filtros       : {', '.join(filters)}\n"
+        header += "=" * 60 + "\n\n"
+        handle.write(output_format.header(header))
+
+        # O UTF-8 validado já é o formato da saída: os bytes do arquivo são
+        # copiados sem passar por str.
+        recorder = IndexRecorder() if index else None
+        # Com dedup, um conteúdo repetido vira só o cabeçalho "[igual a: ...]"
+        deduper = ContentDeduper() if dedup else None
+        for rel, block in included:
+            rel_with_root = f"{source.name}/{rel}"
+            if not output_format.passthrough:
+                write_text_block(handle, output_format, block, rel_with_root, recorder, deduper)
+                continue
+            first = deduper.find_span(block.path, block.span) if deduper is not None else None
+            if first is not None:
+                frame = output_format.frame(Path(block.path).name, rel_with_root, "utf-8")
+                handle.write(frame.ref_head(first) + block.tail)
+                if recorder is not None:
+                    recorder.add_alias(rel_with_root, first)
+                continue
+            if recorder is not None:
+                written = recorder.write_passthrough(handle, rel_with_root, block)
+            else:
+                written = write_block(handle, block)
+            if not written:
+                write_changed_block(handle, block, rel_with_root, recorder)
+            elif deduper is not None:
+                deduper.add_span(rel_with_root, block.path, block.span)
+        relative_paths = [Path(rel) for rel, _block in included]
+
+        handle.writelines(output_format.footer("Estrutura de pastas:",
+                                               [tree_text(relative_paths, source.name)]))
+        # O índice vem depois da árvore: o restaurador antigo para no marcador dela
+        if recorder is not None:
+            recorder.write_trailer(handle)
 
     return len(included), skipped
 
@@ -180,6 +304,36 @@ def main() -> int:
         "--sem-filtros", action="store_true",
         help="Inclui itens normalmente ignorados; binários continuam excluídos.",
     )
+    parser.add_argument(
+        "--somente-rastreados", action="store_true",
+        help="Lista os arquivos pelo .git/index (só os rastreados pelo git), sem varrer a pasta.",
+    )
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=None, metavar="N",
+        help="Lê e formata os arquivos em N processos (0 = um por núcleo). "
+        "A saída é idêntica à do modo serial.",
+    )
+    parser.add_argument(
+        "--comprimir", choices=sorted(SUFFIXES), default=None,
+        help="Grava a saída comprimida (.txt.gz ou .txt.xz), com compressão em paralelo. "
+        "Também é ativado por um -o terminado em .gz/.xz.",
+    )
+    parser.add_argument(
+        "--indice", action="store_true",
+        help="Acrescenta, depois da árvore, um índice com deslocamento, tamanho e crc32 "
+        "de cada arquivo, para acesso direto sem varrer o texto.",
+    )
+    parser.add_argument(
+        "--deduplicar", action="store_true",
+        help="Arquivos idênticos a outro já incluído entram só com um cabeçalho "
+        "\"[igual a: ...]\"; o restaurador recria o conteúdo.",
+    )
+    parser.add_argument(
+        "--formato", choices=list(FORMATS), default=DEFAULT_FORMAT,
+        help="Layout da saída: texto (blocos restauráveis, padrão), markdown (blocos de "
+        "código com a linguagem), xml (tags <document path=...>) ou jsonl (um objeto por "
+        "arquivo, sem --indice).",
+    )
     parser.add_argument(
         "--mostrar-ignorados", action="store_true",
         help="Mostra todos os arquivos ignorados (o padrão mostra somente o total).",
@@ -187,22 +341,34 @@ def main() -> int:
     args = parser.parse_args()
 
     source = args.pasta.expanduser()
-    default_output = source.resolve().parent / f"{source.name}_codigo_completo.txt"
+    extension = get_format(args.formato).extension
+    default_output = source.resolve().parent / f"{source.name}_codigo_completo{extension}"
     output = (args.saida or default_output).expanduser()
+    compression = args.comprimir or compression_for(output)
+    if compression and compression_for(output) != compression:
+        output = output.with_name(output.name + suffix_for(compression))
     patterns = () if args.sem_filtros else DEFAULT_IGNORE_PATTERNS
 
     try:
-        count, skipped = compact(source, output, patterns)
+        count, skipped = compact(source, output, patterns, args.somente_rastreados, args.jobs,
+                                 compression, args.indice, args.deduplicar, args.formato)
     except (ValueError, OSError) as exc:
         print(f"Erro: {exc}", file=sys.stderr)
         return 1
 
     print(f"Arquivo gerado: {output.resolve()}")
     print(f"Arquivos compactados: {count}")
-    print(f"Arquivos ignorados: {len(skipped)}")
+    skipped_dirs = sum(item.is_dir for item in skipped)
+    print(f"Arquivos ignorados: {len(skipped) - skipped_dirs}")
+    if skipped_dirs:
+        print(f"Pastas ignoradas (não percorridas): {skipped_dirs}")
     if args.mostrar_ignorados:
         for item in skipped:
-            print(f"  [IGNORADO — {item.reason}] {item.path.relative_to(source.resolve())}")
+            rel = item.path.relative_to(source.resolve()).as_posix()
+            if item.is_dir:
+                print(f"  [PASTA IGNORADA — {item.reason}] {rel}/")
+            else:
+                print(f"  [IGNORADO — {item.reason}] {rel}")
     elif skipped:
         print("Use --mostrar-ignorados para ver a lista.")
     return 0
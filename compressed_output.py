@@ -0,0 +1,147 @@
+"""Saída compactada (.gz / .xz) com compressão em paralelo, por blocos.
+
+Os bundles de centenas de MB são arquivados e copiados entre máquinas; um
+gzip/xz de fluxo único roda em uma só thread e vira o gargalo da geração.
+Aqui o texto é cortado em blocos de tamanho fixo e cada bloco é comprimido
+como um membro gzip (ou um stream xz) independente em um pool de threads —
+zlib e lzma liberam o GIL. Os membros são gravados na ordem, concatenados:
+é o mesmo formato do pigz, e gzip/xz/zcat (e os módulos gzip/lzma do Python)
+leem o arquivo inteiro normalmente. Poucos blocos ficam em voo por vez, então
+a memória não cresce com o tamanho da saída.
+
+`open_input` abre para leitura um arquivo comum, .gz ou .xz (pelo conteúdo,
+não pela extensão), descompactando em fluxo.
+"""
+
+from __future__ import annotations
+
+import gzip
+import io
+import lzma
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Optional
+
+from block_pool import cpu_jobs
+
+# Blocos xz maiores: o dicionário do preset 6 é de 8 MiB e blocos pequenos comprimem mal
+BLOCK_SIZES = {"gz": 1 << 20, "xz": 8 << 20}
+DEFAULT_LEVELS = {"gz": 6, "xz": 6}
+SUFFIXES = {"gz": ".gz", "xz": ".xz"}
+
+_GZIP_MAGIC = b"\x1f\x8b"
+_XZ_MAGIC = b"\xfd7zXZ\x00"
+
+
+def suffix_for(compression: Optional[str]) -> str:
+    """Extensão acrescentada ao nome do arquivo ('' sem compressão)."""
+    return SUFFIXES[compression] if compression else ""
+
+
+def compression_for(path) -> Optional[str]:
+    """Compressão indicada pela extensão de `path` (None para texto puro)."""
+    name = os.fspath(path).lower()
+    for compression, suffix in SUFFIXES.items():
+        if name.endswith(suffix):
+            return compression
+    return None
+
+
+def _compress_block(compression, level, data):
+    if compression == "gz":
+        return gzip.compress(data, compresslevel=level, mtime=0)
+    return lzma.compress(data, format=lzma.FORMAT_XZ, preset=level)
+
+
+class ParallelCompressor(io.RawIOBase):
+    """Escrita binária que grava em `raw` blocos comprimidos em paralelo, na ordem."""
+
+    def __init__(self, raw: BinaryIO, compression: str, *, workers: Optional[int] = None,
+                 level: Optional[int] = None, block_size: Optional[int] = None):
+        if compression not in SUFFIXES:
+            raise ValueError(f"Compressão desconhecida: {compression}")
+        self._raw = raw
+        self._compression = compression
+        self._level = DEFAULT_LEVELS[compression] if level is None else level
+        self._block_size = block_size or BLOCK_SIZES[compression]
+        workers = workers or cpu_jobs()
+        self._window = workers * 2
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="compress")
+        self._pending: deque = deque()
+        self._buf = bytearray()
+        self._written = 0
+
+    def writable(self):
+        return True
+
+    def tell(self):
+        # Posição no texto descompactado (o índice do bundle usa esses deslocamentos)
+        return self._written
+
+    def write(self, data):
+        if self.closed:
+            raise ValueError("write em arquivo fechado")
+        self._buf += data
+        self._written += len(data)
+        size = self._block_size
+        if len(self._buf) >= size:
+            view = memoryview(self._buf)
+            start = 0
+            while len(self._buf) - start >= size:
+                self._submit(bytes(view[start:start + size]))
+                start += size
+            view.release()
+            del self._buf[:start]
+        return len(data)
+
+    def _submit(self, block):
+        while len(self._pending) >= self._window:
+            self._raw.write(self._pending.popleft().result())
+        self._pending.append(self._pool.submit(
+            _compress_block, self._compression, self._level, block))
+        # Grava o que já terminou, sem esperar
+        while self._pending and self._pending[0].done():
+            self._raw.write(self._pending.popleft().result())
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            if self._buf:
+                self._submit(bytes(self._buf))
+                self._buf.clear()
+            while self._pending:
+                self._raw.write(self._pending.popleft().result())
+        finally:
+            for future in self._pending:
+                future.cancel()
+            self._pool.shutdown(wait=False)
+            self._raw.close()
+            super().close()
+
+
+def open_binary(path, compression: Optional[str], **kw) -> BinaryIO:
+    """Abre `path` para escrita binária, comprimindo se `compression` for 'gz'/'xz'."""
+    if not compression:
+        return open(path, "wb")
+    return io.BufferedWriter(ParallelCompressor(open(path, "wb"), compression, **kw))
+
+
+def open_text(path, compression: Optional[str], newline=None, **kw):
+    """Como open(path, "w", encoding="utf-8", newline=...), com compressão opcional."""
+    if not compression:
+        return open(path, "w", encoding="utf-8", newline=newline)
+    return io.TextIOWrapper(open_binary(path, compression, **kw), encoding="utf-8",
+                            newline=newline)
+
+
+def open_input(path) -> BinaryIO:
+    """Leitura binária de um arquivo comum, gzip ou xz (detectado pelos primeiros bytes)."""
+    with open(path, "rb") as f:
+        magic = f.read(len(_XZ_MAGIC))
+    if magic.startswith(_GZIP_MAGIC):
+        return gzip.open(path, "rb")   # lê todos os membros concatenados
+    if magic.startswith(_XZ_MAGIC):
+        return lzma.open(path, "rb")   # idem para streams xz
+    return open(path, "rb")
@@ -0,0 +1,186 @@
+"""Análise profunda do conteúdo: uma única leitura por arquivo, em paralelo.
+
+Cada arquivo é lido uma vez, em blocos, e dessa leitura saem todos os fatos
+que as etapas seguintes precisam: tamanho, número exato de linhas, se é
+binário (NUL nos primeiros bytes, como em _read_file_with_fallback), a
+primeira codificação da cascata que decodifica o arquivo inteiro e um hash do
+conteúdo. Os fatos ficam em um FactStore, válidos enquanto tamanho e mtime do
+arquivo não mudarem; contador, filtros e cópia consultam o store em vez de
+abrir o arquivo de novo.
+
+A leitura é limitada por I/O (e o hashlib libera o GIL), então um pool de
+threads basta. Nenhuma dependência externa é necessária.
+"""
+
+from __future__ import annotations
+
+import codecs
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, NamedTuple, Optional
+
+SNIFF_BYTES = 1024
+CHUNK_SIZE = 1 << 20
+DEFAULT_ENCODINGS = ("utf-8", "latin-1", "cp1252")
+DEFAULT_WORKERS = min(16, (os.cpu_count() or 1) * 2)
+
+# Codificações em que qualquer sequência de bytes é válida: nunca falham, então
+# não precisam ser testadas (e as que vêm depois delas na cascata nunca são usadas).
+_TOTAL_ENCODINGS = frozenset({"iso8859-1"})   # nomes normalizados de codecs.lookup
+
+
+class FileFacts(NamedTuple):
+    """Fatos sobre o conteúdo de um arquivo, obtidos em uma leitura."""
+
+    size: int
+    mtime: float
+    lines: int                # 0 para binários
+    is_binary: bool
+    encoding: Optional[str]   # None: binário ou nenhuma codificação da cascata serve
+    digest: str               # blake2b de 128 bits (hex) do conteúdo bruto
+
+
+def probe_file(path, encodings: Iterable[str] = DEFAULT_ENCODINGS) -> FileFacts:
+    """Lê `path` uma vez e devolve os FileFacts. OSError é repassado ao chamador."""
+    candidates = []
+    for enc in encodings:
+        if codecs.lookup(enc).name in _TOTAL_ENCODINGS:
+            candidates.append((enc, None))
+            break
+        candidates.append((enc, codecs.getincrementaldecoder(enc)("strict")))
+
+    digest = hashlib.blake2b(digest_size=16)
+    newlines = 0
+    size = 0
+    last = b""
+    is_binary = False
+    with open(path, "rb") as f:
+        st = os.fstat(f.fileno())
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            if size < SNIFF_BYTES and b"\0" in chunk[:SNIFF_BYTES - size]:
+                is_binary = True
+            size += len(chunk)
+            digest.update(chunk)
+            last = chunk[-1:]
+            if is_binary:
+                continue
+            newlines += chunk.count(b"\n")
+            # Cada decodificador que falha sai da cascata; ASCII puro vale em todas
+            ascii_only = chunk.isascii()
+            alive = []
+            for enc, decoder in candidates:
+                if decoder is not None and not (ascii_only and not decoder.getstate()[0]):
+                    try:
+                        decoder.decode(chunk)
+                    except UnicodeDecodeError:
+                        continue
+                alive.append((enc, decoder))
+            candidates = alive
+
+    encoding = None
+    lines = 0
+    if not is_binary:
+        for enc, decoder in candidates:
+            if decoder is not None:
+                try:
+                    decoder.decode(b"", final=True)
+                except UnicodeDecodeError:
+                    continue
+            encoding = enc
+            break
+        lines = newlines + (1 if size and last != b"\n" else 0)
+    return FileFacts(size, st.st_mtime, lines, is_binary, encoding, digest.hexdigest())
+
+
+class FactStore:
+    """Fatos por caminho absoluto. Seguro para uso por várias threads."""
+
+    def __init__(self):
+        self._facts: dict = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._facts)
+
+    def __contains__(self, path) -> bool:
+        return path in self._facts
+
+    def put(self, path, facts: FileFacts) -> None:
+        with self._lock:
+            self._facts[path] = facts
+
+    def discard(self, path) -> None:
+        with self._lock:
+            self._facts.pop(path, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._facts.clear()
+
+    def get(self, path, size: Optional[int] = None,
+            mtime: Optional[float] = None) -> Optional[FileFacts]:
+        """Fatos gravados, ou None se não há ou se `size`/`mtime` informados diferem."""
+        facts = self._facts.get(path)
+        if facts is None:
+            return None
+        if (size is not None and facts.size != size) or (mtime is not None and facts.mtime != mtime):
+            return None
+        return facts
+
+    def fresh(self, path) -> Optional[FileFacts]:
+        """Como get(), conferindo tamanho e mtime atuais com um stat."""
+        facts = self._facts.get(path)
+        if facts is None:
+            return None
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return self.get(path, st.st_size, st.st_mtime)
+
+
+def deep_scan(paths: Iterable[str], store: FactStore, *,
+              encodings: Iterable[str] = DEFAULT_ENCODINGS, workers: int | None = None,
+              cancel_event: threading.Event | None = None,
+              progress_cb: Callable[[int, int], None] | None = None) -> int:
+    """Analisa `paths` em paralelo e grava os fatos em `store`.
+
+    Arquivos com fatos ainda válidos (mesmo tamanho e mtime) não são relidos;
+    arquivos ilegíveis são descartados do store. `progress_cb(feitos, total)`
+    roda na thread chamadora. Retorna quantos arquivos foram lidos.
+    """
+    encodings = tuple(encodings)
+    pending = [p for p in paths if store.fresh(p) is None]
+    total = len(pending)
+    if not total:
+        if progress_cb:
+            progress_cb(0, 0)
+        return 0
+
+    def work(path):
+        if cancel_event is not None and cancel_event.is_set():
+            return path, None
+        try:
+            return path, probe_file(path, encodings)
+        except (OSError, LookupError):
+            return path, None
+
+    done = 0
+    with ThreadPoolExecutor(max_workers=workers or DEFAULT_WORKERS,
+                            thread_name_prefix="deep-scan") as pool:
+        for path, facts in pool.map(work, pending):
+            if cancel_event is not None and cancel_event.is_set():
+                break
+            if facts is None:
+                store.discard(path)
+            else:
+                store.put(path, facts)
+            done += 1
+            if progress_cb and (done % 50 == 0 or done == total):
+                progress_cb(done, total)
+    return done
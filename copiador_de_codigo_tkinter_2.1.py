@@ -6,7 +6,7 @@ Copiador de Código v2.1 — Python / Tkinter Edition
 Porte monolítico (arquivo único) da versão HTML/JS do "Copiador de Código".
 Todas as funcionalidades da versão original foram preservadas:
 
-  - Seleção de pasta de entrada (via os.walk — rápido mesmo em pastas grandes)
+  - Seleção de pasta de entrada (os.scandir em paralelo — rápido mesmo em pastas grandes)
   - Importação de arquivo ZIP
   - Leitura "lazy" de conteúdo (metadados primeiro, conteúdo só na hora de gerar)
   - Aba Extensões (seleção por extensão, ordenável por nome/tamanho/qtde)
@@ -34,19 +34,41 @@ import io
 import sys
 import json
 import math
+import shutil
+import tempfile
 import zipfile
 import threading
+import time
 import queue
 from datetime import datetime
+from functools import lru_cache, partial
 
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
+from tkinter import ttk, filedialog, messagebox, font as tkfont
+
+from block_pool import ordered_batches, resolve_jobs
+from bundle_index import IndexRecorder, read_index
+from dedup import ContentDeduper
+from compressed_output import compression_for, open_binary, open_text
+from content_probe import FactStore, deep_scan
+from git_index import GitIndexError, tracked_files
+from gitignore_tree import GitignoreTree
+from gitwildmatch import GitignoreSpec
+from passthrough import PassthroughBlock, utf8_span, write_block
+from read_ahead import DEFAULT_MAX_BYTES, ordered_map
+from ignore_matcher import IgnoreMatcher
+from line_index import BlockHeader, LineIndex
+from output_format import DEFAULT_FORMAT, FORMATS, get_format
+from scan_index import ScanIndex
+from token_counter import TokenCounter, load_tokenizer
+from walker import walk_files
 
 # ============================================================
 # CONSTANTES
 # ============================================================
 APP_TITLE = "Copiador de Código v2.1 — Python Edition"
 CONFIG_PATH = os.path.join(os.path.expanduser("~"), ".copiador_de_codigo_config.json")
+TOKEN_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".copiador_de_codigo_tokens.json")
 
 PATTERN_GROUPS = [
     {"id": "vcs", "label": "Controle de versão",
@@ -84,6 +106,10 @@ BINARY_EXTS = {
     ".db", ".sqlite", ".sqlite3",
 }
 
+# Lotes parciais enviados à UI durante a varredura (o que vier primeiro)
+SCAN_BATCH_SIZE = 500
+SCAN_BATCH_INTERVAL = 0.25  # segundos
+
 THEMES = {
     "light": dict(bg="#f1f5f9", surface="#ffffff", surface2="#f8fafc",
                    border="#e2e8f0", text="#1e293b", text2="#64748b",
@@ -140,15 +166,19 @@ def fn_match(name, pat):
     return re.match(regex, name, re.IGNORECASE) is not None
 
 
+@lru_cache(maxsize=8)
+def _ignore_matcher_for(patterns):
+    return IgnoreMatcher.simple_glob(patterns)
+
+
+def ignore_matcher(ignore_patterns):
+    """Matcher compilado (conjunto de literais + uma regex) para a lista ativa.
+    Mesma semântica de should_ignore_global; reaproveitado enquanto a lista não mudar."""
+    return _ignore_matcher_for(tuple(ignore_patterns))
+
+
 def should_ignore_global(name, ignore_patterns):
-    for p in ignore_patterns:
-        if "*" in p:
-            if fn_match(name, p):
-                return True
-        else:
-            if name == p:
-                return True
-    return False
+    return ignore_matcher(ignore_patterns).matches(name)
 
 
 def fmt_size(b):
@@ -166,78 +196,88 @@ def estimate_tokens(chars):
 
 
 # ============================================================
-# MOTOR DE GITIGNORE (equivalente à função JS giMatches)
+# MOTOR DE GITIGNORE (gitwildmatch compilado — ver gitwildmatch.py)
 # ============================================================
-def _gitignore_rule_to_regex(rule):
-    escaped = re.escape(rule)
-    s = escaped.replace(r"\*\*", "\u00a7").replace(r"\*", "[^/]*")
-    s = s.replace(r"\?", "[^/]").replace("\u00a7", ".*")
-    return s
+@lru_cache(maxsize=8)
+def _gitignore_spec_for(rules):
+    return GitignoreSpec(rules)
+
+
+def gitignore_spec(rules):
+    """Regras (arquivo + manuais) compiladas uma vez; reaproveitadas enquanto não mudarem."""
+    if isinstance(rules, GitignoreSpec):
+        return rules
+    return _gitignore_spec_for(tuple(rules))
 
 
 def gi_matches(rel_path, rules, apply_gi):
+    """`rules` é a lista de linhas, um GitignoreSpec já compilado ou, para pastas,
+    o GitignoreTree (.gitignore aninhados, .git/info/exclude, core.excludesFile).
+    O rel_path dos metadados começa pelo nome da raiz, que não faz parte das regras."""
     if not apply_gi:
         return False
-    ignored = False
     norm = rel_path.replace("\\", "/")
-    for raw in rules:
-        raw_stripped = raw.strip()
-        if not raw_stripped or raw_stripped.startswith("#"):
-            continue
-        neg = raw_stripped.startswith("!")
-        rule = raw_stripped[1:].strip() if neg else raw_stripped
-        if not rule:
-            continue
-        if rule.endswith("/"):
-            rule = rule[:-1]
-        reg_str = _gitignore_rule_to_regex(rule)
-        has_slash = "/" in rule.rstrip("/")
-        matched = False
-        if has_slash:
-            matched = re.match(f"^{reg_str}(/.*)?$", norm) is not None
-        else:
-            base = norm.split("/")[-1]
-            matched = (re.match(f"^{reg_str}$", base) is not None or
-                       re.search(f"(^|/){reg_str}(/|$)", norm) is not None)
-        if matched:
-            ignored = not neg
-    return ignored
+    _root, sep, rel = norm.partition("/")
+    if isinstance(rules, GitignoreTree):
+        return rules.is_ignored(rel if sep else norm)
+    return gitignore_spec(rules).match_file(rel if sep else norm)
 
 
 # ============================================================
-# LEITURA DE DIRETÓRIO / ZIP (rápido — via os.walk / zipfile)
+# LEITURA DE DIRETÓRIO / ZIP (rápido — via walker paralelo / zipfile)
 # ============================================================
 def scan_directory(root_dir, ignore_patterns, size_filter_enabled, max_size_kb,
-                    progress_cb=None, cancel_event=None):
+                    progress_cb=None, cancel_event=None, index=None, from_cache=False,
+                    gi_tree=None, tracked_only=False, batch_cb=None):
+    """Varre a pasta. Com `index` (ScanIndex), só relista pastas modificadas;
+    com `from_cache=True`, devolve a listagem gravada sem tocar no disco.
+    Com `gi_tree` (GitignoreTree), pastas ignoradas pelo git nem são listadas.
+    Com `tracked_only=True`, a lista vem do .git/index, sem percorrer a pasta
+    (GitIndexError se a pasta não estiver em um repositório git).
+    `batch_cb(metas)` recebe os arquivos novos em lotes, enquanto a varredura anda."""
     metas = []
+    sent = 0
+    last_batch = time.monotonic()
     root_name = os.path.basename(os.path.normpath(root_dir)) or root_dir
     count = 0
-    for dirpath, dirnames, filenames in os.walk(root_dir, topdown=True):
-        if cancel_event is not None and cancel_event.is_set():
-            break
-        dirnames[:] = [d for d in dirnames if not should_ignore_global(d, ignore_patterns)]
-        rel_dir = os.path.relpath(dirpath, root_dir)
-        for fname in filenames:
-            if should_ignore_global(fname, ignore_patterns):
-                continue
-            abspath = os.path.join(dirpath, fname)
-            try:
-                size = os.path.getsize(abspath)
-            except OSError:
-                continue
-            if size_filter_enabled and size > max_size_kb * 1024:
-                continue
-            rel = fname if rel_dir == "." else f"{rel_dir.replace(os.sep, '/')}/{fname}"
-            rel_path = f"{root_name}/{rel}"
-            ext = get_ext(fname)
-            binf = is_bin_ext(fname)
-            est_lines = 0 if binf else round(size / 45)
-            metas.append({"name": fname, "rel_path": rel_path, "ext": ext, "size": size,
-                          "is_binary": binf, "lines": est_lines, "abs_path": abspath,
-                          "zip_path": None, "zip_member": None})
-            count += 1
-            if progress_cb and count % 150 == 0:
-                progress_cb(count)
+
+    ignored = ignore_matcher(ignore_patterns)
+
+    def ignore(name, rel, is_dir):
+        if ignored(name):
+            return True
+        return gi_tree is not None and gi_tree.is_ignored(rel, is_dir)
+
+    # walk_files lê as pastas em paralelo e já entrega tamanho e caminho relativo
+    if tracked_only:
+        entries = tracked_files(root_dir, ignore)
+        if entries is None:
+            raise GitIndexError("A pasta não está em um repositório git.")
+    elif from_cache:
+        entries = index.cached_files(ignore)
+    else:
+        entries = walk_files(root_dir, ignore, cancel_event=cancel_event,
+                             lister=index.list_directory if index is not None else None)
+    for entry in entries:
+        size = entry.size
+        if size_filter_enabled and size > max_size_kb * 1024:
+            continue
+        fname = entry.name
+        rel_path = f"{root_name}/{entry.rel_path}"
+        ext = get_ext(fname)
+        binf = is_bin_ext(fname)
+        est_lines = 0 if binf else round(size / 45)
+        metas.append({"name": fname, "rel_path": rel_path, "ext": ext, "size": size,
+                      "is_binary": binf, "lines": est_lines, "abs_path": entry.abs_path,
+                      "zip_path": None, "zip_member": None})
+        count += 1
+        if progress_cb and count % 150 == 0:
+            progress_cb(count)
+        if batch_cb and (count - sent >= SCAN_BATCH_SIZE
+                         or time.monotonic() - last_batch >= SCAN_BATCH_INTERVAL):
+            batch_cb(metas[sent:])
+            sent = count
+            last_batch = time.monotonic()
     if progress_cb:
         progress_cb(count)
     return metas, root_name
@@ -247,6 +287,7 @@ def scan_zip(zip_path, ignore_patterns, size_filter_enabled, max_size_kb, progre
     metas = []
     root_name = os.path.splitext(os.path.basename(zip_path))[0] or "zip"
     count = 0
+    ignored = ignore_matcher(ignore_patterns)
     with zipfile.ZipFile(zip_path) as zf:
         for info in zf.infolist():
             if info.is_dir():
@@ -256,7 +297,7 @@ def scan_zip(zip_path, ignore_patterns, size_filter_enabled, max_size_kb, progre
                 continue
             parts = clean.split("/")
             fname = parts[-1]
-            if any(should_ignore_global(p, ignore_patterns) for p in parts):
+            if any(ignored(p) for p in parts):
                 continue
             size = info.file_size
             if size_filter_enabled and size > max_size_kb * 1024:
@@ -285,7 +326,8 @@ def read_file_content(meta):
         else:
             with open(meta["abs_path"], "rb") as f:
                 data = f.read()
-        return data.decode("utf-8", errors="replace")
+        # Encoding detectado pela análise profunda, quando houver
+        return data.decode(meta.get("encoding") or "utf-8", errors="replace")
     except Exception:
         return None
 
@@ -293,27 +335,51 @@ def read_file_content(meta):
 # ============================================================
 # CONSTRUÇÃO DE ÁRVORE / CABEÇALHO / SAÍDA FINAL
 # ============================================================
-def build_tree_txt(metas, root_name):
-    root = {"ch": {}, "files": []}
+class TreeDir:
+    """Pasta da árvore de saída: subpastas por nome e nomes de arquivo na ordem de chegada."""
+
+    __slots__ = ("dirs", "files")
+
+    def __init__(self):
+        self.dirs = {}
+        self.files = []
+
+    def _entries(self):
+        """(nome, subpasta ou None, é o último): pastas em ordem, depois os arquivos."""
+        items = [(k, self.dirs[k]) for k in sorted(self.dirs)] + [(f, None) for f in self.files]
+        last = len(items) - 1
+        return [(name, child, i == last) for i, (name, child) in enumerate(items)]
+
+
+def iter_tree_lines(metas, root_name):
+    """Linhas da árvore de build_tree_txt, geradas sem recursão (para gravar direto na saída)."""
+    root = TreeDir()
     for m in metas:
         parts = m["rel_path"].split("/")
         node = root
         for p in parts[:-1]:
-            node = node["ch"].setdefault(p, {"ch": {}, "files": []})
-        node["files"].append(m)
-
-    def _print(node, prefix):
-        out = ""
-        keys = sorted(node["ch"].keys())
-        items = [("d", k, node["ch"][k]) for k in keys] + [("f", f["name"], None) for f in node["files"]]
-        for i, (t, name, child) in enumerate(items):
-            last = i == len(items) - 1
-            out += prefix + ("`-- " if last else "|-- ") + name + "\n"
-            if t == "d":
-                out += _print(child, prefix + ("  " if last else "| "))
-        return out
+            child = node.dirs.get(p)
+            if child is None:
+                child = node.dirs[p] = TreeDir()
+            node = child
+        node.files.append(m["name"])
+
+    yield root_name + "\n"
+    stack = [("", iter(root._entries()))]
+    while stack:
+        prefix, entries = stack[-1]
+        entry = next(entries, None)
+        if entry is None:
+            stack.pop()
+            continue
+        name, child, last = entry
+        yield prefix + ("`-- " if last else "|-- ") + name + "\n"
+        if child is not None:
+            stack.append((prefix + ("  " if last else "| "), iter(child._entries())))
+
 
-    return root_name + "\n" + _print(root, "")
+def build_tree_txt(metas, root_name):
+    return "".join(iter_tree_lines(metas, root_name))
 
 
 def build_header(src, count, filters):
@@ -326,42 +392,287 @@ def build_header(src, count, filters):
     return h
 
 
-def generate_output(metas, src_dir, filters, progress_cb=None, cancel_event=None):
-    out_parts = [build_header(src_dir, len(metas), filters)]
+class OutputSpill:
+    """
+    Saída gerada, gravada em um arquivo temporário em vez de ficar em uma str.
+    O arquivo guarda o texto exato (UTF-8, sem conversão de quebras de linha);
+    modal, área de transferência e download leem dele. `chars` acompanha o
+    total de caracteres escritos, índice incluído, para as estatísticas. Com
+    `index`, os blocos com caminho entram no índice de bundle_index, gravado
+    por write_index; com `dedup`, um conteúdo já escrito vira só um cabeçalho
+    de referência.
+    """
+
+    def __init__(self, name, index=False, dedup=False):
+        self.name = name
+        fd, self.path = tempfile.mkstemp(prefix="copiador_", suffix=".txt")
+        self._f = os.fdopen(fd, "w", encoding="utf-8", newline="\n")
+        self.chars = 0
+        self.tokens = None      # contagem do tokenizador, quando todos os arquivos foram contados
+        self.index = IndexRecorder() if index else None
+        self.dedup = ContentDeduper() if dedup else None
+
+    def write(self, text):
+        self._f.write(text)
+        self.chars += len(text)
+
+    def write_block(self, block, path=None, head="", ref_head=None, tail="\n\n"):
+        """
+        Escreve um bloco (str ou PassthroughBlock); False se o arquivo mudou antes
+        da cópia. `path` é o caminho no índice; `head`/`tail`, o cabeçalho e o
+        rodapé de um bloco str; `ref_head(primeiro)`, o cabeçalho de referência
+        para a deduplicação.
+        """
+        index = self.index if path is not None else None
+        dedup = self.dedup if path is not None and ref_head is not None else None
+        if isinstance(block, PassthroughBlock):
+            if dedup is not None:
+                first = dedup.find_span(block.path, block.span)
+                if first is not None:
+                    self._write_reference(path, first, ref_head(first) + block.tail)
+                    return True
+            if index is not None:
+                written = index.write_passthrough(self._f, path, block)
+            else:
+                written = write_block(self._f, block)
+            if not written:
+                return False
+            if dedup is not None:
+                dedup.add_span(path, block.path, block.span)
+            self.chars += len(block.head) + block.span.chars + len(block.tail)
+            return True
+        if dedup is not None:
+            body = block[len(head):len(block) - len(tail)].encode("utf-8")
+            first = dedup.find_bytes(body)
+            if first is not None:
+                self._write_reference(path, first, ref_head(first) + tail)
+                return True
+            dedup.add_bytes(path, body)
+        if index is not None:
+            index.write_text(self._f, path, block, head, tail)
+            self.chars += len(block)
+        else:
+            self.write(block)
+        return True
+
+    def _write_reference(self, path, first, text):
+        self.write(text)
+        if self.index is not None:
+            self.index.add_alias(path, first)
+
+    def write_index(self):
+        """Grava o índice (se ligado) depois do que já foi escrito."""
+        if self.index is not None:
+            self.chars += self.index.write_trailer(self._f)
+
+    def close(self):
+        self._f.close()
+
+    def read_text(self):
+        with open(self.path, encoding="utf-8", newline="") as f:
+            return f.read()
+
+    def save_as(self, path):
+        """
+        Copia para `path` como a antiga escrita em modo texto (quebras de linha do
+        SO). Com índice, a cópia é byte a byte: deslocamentos e crc32 foram
+        medidos no texto com "\n". Terminado em .gz/.xz, o arquivo é comprimido
+        em paralelo no caminho.
+        """
+        compression = compression_for(path)
+        if os.linesep == "\n" or self.index is not None:
+            if not compression:
+                shutil.copyfile(self.path, path)
+                return
+            with open(self.path, "rb") as src, open_binary(path, compression) as dst:
+                shutil.copyfileobj(src, dst, 1 << 20)
+            return
+        with open(self.path, encoding="utf-8", newline="") as src, \
+                open_text(path, compression) as dst:
+            shutil.copyfileobj(src, dst, 1 << 20)
+
+    def discard(self):
+        if not self._f.closed:
+            self._f.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+def _output_span(m):
+    """Arquivo em disco já em UTF-8 válido: trecho para cópia direta (passthrough), ou None."""
+    if m.get("zip_path") or m.get("encoding") not in (None, "utf-8"):
+        return None
+    try:
+        return utf8_span(m["abs_path"], nul_window=0)
+    except OSError:
+        return None
+
+
+def render_output_block(m, passthrough=True, fmt=DEFAULT_FORMAT):
+    """
+    (bloco, moldura) de um arquivo no formato `fmt` (output_format), ou
+    (None, None) se for binário/ilegível. Arquivos já em UTF-8 válido viram um
+    PassthroughBlock, se o formato permite: os bytes são copiados do disco
+    para a saída sem passar por str.
+    """
+    if m["is_binary"]:
+        return None, None
+    output_format = get_format(fmt)
+    span = _output_span(m) if passthrough and output_format.passthrough else None
+    if span is not None:
+        frame = output_format.frame(m["name"], m["rel_path"], "utf-8")
+        return PassthroughBlock(frame.head, m["abs_path"], span, frame.tail), frame
+    content = read_file_content(m)
+    if content is None:
+        return None, None
+    frame = output_format.frame(m["name"], m["rel_path"], "utf-8", content)
+    return output_format.block(frame, content), frame
+
+
+def render_output_batch(metas, fmt=DEFAULT_FORMAT):
+    """Lote de render_output_block executado em um processo (opção jobs)."""
+    return [render_output_block(m, fmt=fmt) for m in metas]
+
+
+def generate_output(metas, src_dir, filters, out, progress_cb=None, cancel_event=None,
+                    max_bytes=DEFAULT_MAX_BYTES, jobs=None, fmt=DEFAULT_FORMAT):
+    """Grava a saída em `out` (OutputSpill), bloco a bloco; retorna (copiados, ignorados).
+    Os próximos arquivos são lidos em paralelo (até `max_bytes` em memória)
+    enquanto os blocos são escritos na ordem de `metas`. Com `jobs` > 1 (0 =
+    um por núcleo), leitura e formatação rodam em processos; a saída é a mesma.
+    `fmt` é a chave do formato da saída (output_format)."""
+    output_format = get_format(fmt)
+    out.write(output_format.header(build_header(src_dir, len(metas), filters)))
     copied = 0
     skipped = 0
     total = len(metas)
-    for i, m in enumerate(metas):
+    workers = resolve_jobs(jobs)
+    if workers > 1:
+        blocks = ordered_batches(partial(render_output_batch, fmt=fmt), metas, jobs=workers,
+                                 cancel_event=cancel_event)
+    else:
+        blocks = ordered_map(partial(render_output_block, fmt=fmt), metas, max_bytes=max_bytes,
+                             size_of=lambda m: m["size"] or 0, cancel_event=cancel_event)
+    for i, (m, (block, frame)) in enumerate(blocks):
         if cancel_event is not None and cancel_event.is_set():
             break
-        content = None if m["is_binary"] else read_file_content(m)
-        if content is None:
+        if block is not None and not out.write_block(block, m["rel_path"], frame.head,
+                                                     frame.ref_head, frame.tail):
+            # Mudou desde a validação: lê de novo pelo caminho com decodificação
+            block, frame = render_output_block(m, passthrough=False, fmt=fmt)
+            if block is not None:
+                out.write_block(block, m["rel_path"], frame.head, frame.ref_head, frame.tail)
+        if block is None:
             skipped += 1
         else:
-            sep = "=" * 42 + "\n"
-            out_parts.append(sep + f"Conteúdo de {m['name']} (caminho: {m['rel_path']}) [enc: utf-8]:\n" +
-                              sep + content + "\n\n")
             copied += 1
         if progress_cb and (i % 25 == 0 or i == total - 1):
             progress_cb(i + 1, total)
-    out_parts.append("\n" + "=" * 42 + "\nEstrutura de pastas:\n" + "=" * 42 + "\n")
-    out_parts.append(build_tree_txt(metas, src_dir))
-    return "".join(out_parts), copied, skipped
+    for line in output_format.footer("Estrutura de pastas:", iter_tree_lines(metas, src_dir)):
+        out.write(line)
+    out.write_index()
+    out.close()
+    return copied, skipped
 
 
-def generate_arbitrary_output(files):
-    out_parts = [build_header("Arquivos Avulsos", len(files), [])]
+def generate_arbitrary_output(files, out, fmt=DEFAULT_FORMAT):
+    output_format = get_format(fmt)
+    out.write(output_format.header(build_header("Arquivos Avulsos", len(files), [])))
     n = 0
     for f in files:
         if not f["content"]:
             continue
-        out_parts.append("=" * 42 + "\n" + f"Conteúdo de {f['name']}:\n" + "=" * 42 + "\n" +
-                          f["content"] + "\n\n")
+        frame = output_format.frame(f["name"], None, None, f["content"])
+        out.write(output_format.block(frame, f["content"]))
         n += 1
-    out_parts.append("\n" + "=" * 42 + "\nArquivos:\n" + "=" * 42 + "\n")
-    for f in files:
-        out_parts.append(f"- {f['name']}\n")
-    return "".join(out_parts), n
+    for line in output_format.footer("Arquivos:", (f"- {f['name']}\n" for f in files)):
+        out.write(line)
+    out.close()
+    return n
+
+
+# ============================================================
+# VISUALIZADOR DE SAÍDA (paginado a partir do arquivo, via mmap)
+# ============================================================
+class OutputViewer(ttk.Frame):
+    """
+    Texto somente leitura de um arquivo de saída de qualquer tamanho. Só as
+    linhas visíveis ficam no tk.Text; a barra vertical é mapeada para números
+    de linha do LineIndex, não para a altura do widget.
+    """
+
+    def __init__(self, master, path, **kw):
+        super().__init__(master, **kw)
+        self.index = LineIndex(path)
+        self.top = 0
+        self.rows = 1
+        self.text = tk.Text(self, wrap="none", height=1)
+        self._linespace = tkfont.Font(font=self.text.cget("font")).metrics("linespace")
+        self.vsb = ttk.Scrollbar(self, orient="vertical", command=self._on_vscroll)
+        hsb = ttk.Scrollbar(self, orient="horizontal", command=self.text.xview)
+        self.text.configure(xscrollcommand=hsb.set, state="disabled")
+        self.text.grid(row=0, column=0, sticky="nsew")
+        self.vsb.grid(row=0, column=1, sticky="ns")
+        hsb.grid(row=1, column=0, sticky="ew")
+        self.rowconfigure(0, weight=1)
+        self.columnconfigure(0, weight=1)
+
+        self.text.bind("<Configure>", self._on_resize)
+        self.text.bind("<MouseWheel>", lambda e: self._scroll_by(-3 if e.delta > 0 else 3))
+        self.text.bind("<Button-4>", lambda e: self._scroll_by(-3))
+        self.text.bind("<Button-5>", lambda e: self._scroll_by(3))
+        self.text.bind("<Up>", lambda e: self._scroll_by(-1))
+        self.text.bind("<Down>", lambda e: self._scroll_by(1))
+        self.text.bind("<Prior>", lambda e: self._scroll_by(-max(1, self.rows - 1)))
+        self.text.bind("<Next>", lambda e: self._scroll_by(max(1, self.rows - 1)))
+        self.text.bind("<Control-Home>", lambda e: self.goto(0))
+        self.text.bind("<Control-End>", lambda e: self.goto(self.index.line_count))
+        self.text.bind("<Button-1>", lambda e: self.text.focus_set())
+        self.bind("<Destroy>", self._on_destroy)
+        self._render()
+
+    def goto(self, line):
+        """Rola para que `line` (0-based) fique no topo (ou o mais perto possível)."""
+        top = max(0, min(line, self.index.line_count - self.rows))
+        if top != self.top:
+            self.top = top
+            self._render()
+        return "break"
+
+    def _scroll_by(self, n):
+        return self.goto(self.top + n)
+
+    def _on_vscroll(self, *args):
+        if args[0] == "moveto":
+            self.goto(int(float(args[1]) * self.index.line_count))
+        elif args[0] == "scroll":
+            step = int(args[1])
+            if args[2] == "pages":
+                step *= max(1, self.rows - 1)
+            self._scroll_by(step)
+
+    def _on_resize(self, event):
+        rows = max(1, event.height // max(1, self._linespace))
+        if rows != self.rows:
+            self.rows = rows
+            self.top = max(0, min(self.top, self.index.line_count - rows))
+            self._render()
+
+    def _render(self):
+        x = self.text.xview()[0]
+        self.text.config(state="normal")
+        self.text.delete("1.0", "end")
+        self.text.insert("1.0", "\n".join(self.index.lines(self.top, self.rows)))
+        self.text.config(state="disabled")
+        self.text.xview_moveto(x)
+        total = max(1, self.index.line_count)
+        self.vsb.set(self.top / total, min(1.0, (self.top + self.rows) / total))
+
+    def _on_destroy(self, event):
+        if event.widget is self:
+            self.index.close()
 
 
 # ============================================================
@@ -369,7 +680,8 @@ def generate_arbitrary_output(files):
 # ============================================================
 class State:
     def __init__(self):
-        self.all_meta = []          # [{name, rel_path, ext, size, is_binary, lines, abs_path/zip...}]
+        self.all_meta = []          # [{name, rel_path, ext, size, is_binary, lines, abs_path/zip...,
+                                    #   encoding/digest após a análise profunda}]
         self.all_exts = []          # list[str]
         self.selected_files = set() # rel_path
         self.selected_exts = set()
@@ -378,9 +690,10 @@ class State:
         self.gi_manual_rules = []
         self.gi_sel_index = -1
         self.apply_gi = False
+        self.gi_tree = None         # GitignoreTree da pasta carregada (None para ZIP)
+        self.gi_pruned = False      # a última varredura já podou o que o git ignora
         self.ignore_patterns = list(ALL_IGNORE_PATTERNS)
-        self.last_output = ""
-        self.last_output_name = "codigo_completo.txt"
+        self.last_output = None     # OutputSpill da última saída gerada
         self.active_tab = "ext"
         self.search_results = []
         self.log_count = 0
@@ -404,15 +717,26 @@ class CopiadorApp(tk.Tk):
         self.minsize(760, 560)
 
         self.natural_var = tk.StringVar(value="natural")
-        self.out_name_var = tk.StringVar(value="codigo_completo.txt")
+        self.out_name_var = tk.StringVar(value="codigo_completo" + get_format(self.output_format).extension)
         self.src_label_var = tk.StringVar(value="")
         self.size_filter_var = tk.BooleanVar(value=False)
         self.max_kb_var = tk.StringVar(value="500")
+        self.tracked_only_var = tk.BooleanVar(value=False)
+        self.deep_scan_var = tk.BooleanVar(value=False)
+        self.bundle_index_var = tk.BooleanVar(value=self.bundle_index)
+        self.dedup_var = tk.BooleanVar(value=self.dedup)
+        self.format_var = tk.StringVar(value=get_format(self.output_format).label)
         self.gi_apply_var = tk.BooleanVar(value=False)
         self.ext_search_var = tk.StringVar()
         self.file_search_var = tk.StringVar()
 
         self.queue = queue.Queue()
+        self._scan_gen = 0          # mensagens "scan_*" de varreduras substituídas são descartadas
+        self._scan_cancel = threading.Event()
+        self._scan_streamed = None  # linhas já mostradas em lotes parciais (None: nenhum lote)
+        self._facts = FactStore()   # análise profunda, por caminho absoluto
+        self.tokens = TokenCounter()  # estimativa até o tokenizador da config ser carregado
+        self._token_cancel = threading.Event()
         self.explorer_dir_files = {}
 
         self.style = ttk.Style(self)
@@ -426,6 +750,7 @@ class CopiadorApp(tk.Tk):
         self._update_ignore_summary()
         self.log("Bem-vindo ao Copiador de Código v2.1 — Python Edition.", "info")
         self.log("Selecione uma pasta de entrada para começar.", "info")
+        self._init_tokens()
         self.update_counter()
 
         self.protocol("WM_DELETE_WINDOW", self._on_close)
@@ -442,19 +767,42 @@ class CopiadorApp(tk.Tk):
             if isinstance(stored, list):
                 self.S.ignore_patterns = [p for p in ALL_IGNORE_PATTERNS if p in stored]
             self.S.theme = data.get("theme", "light")
+            read_ahead_mb = data.get("readAheadMB", DEFAULT_MAX_BYTES // (1024 * 1024))
+            self.read_ahead_bytes = max(1, int(read_ahead_mb)) * 1024 * 1024
+            self.jobs = int(data.get("jobs", 1))
+            self.bundle_index = bool(data.get("bundleIndex", False))
+            self.dedup = bool(data.get("dedupIdentical", False))
+            self.output_format = get_format(data.get("outputFormat")).key
+            self.tokenizer_path = data.get("tokenizerPath")
         except Exception:
             self.S.ignore_patterns = list(ALL_IGNORE_PATTERNS)
             self.S.theme = "light"
+            self.read_ahead_bytes = DEFAULT_MAX_BYTES
+            self.jobs = 1
+            self.bundle_index = False
+            self.dedup = False
+            self.output_format = DEFAULT_FORMAT
+            self.tokenizer_path = None
 
     def _save_config(self):
         try:
             with open(CONFIG_PATH, "w", encoding="utf-8") as f:
-                json.dump({"ignorePatterns": self.S.ignore_patterns, "theme": self.S.theme}, f)
+                json.dump({"ignorePatterns": self.S.ignore_patterns, "theme": self.S.theme,
+                           "readAheadMB": self.read_ahead_bytes // (1024 * 1024),
+                           "jobs": self.jobs,
+                           "bundleIndex": self.bundle_index_var.get(),
+                           "dedupIdentical": self.dedup_var.get(),
+                           "outputFormat": self._output_format().key,
+                           "tokenizerPath": self.tokenizer_path}, f)
         except Exception:
             pass
 
     def _on_close(self):
+        self._token_cancel.set()
         self._save_config()
+        self.tokens.save(TOKEN_CACHE_PATH)
+        if self.S.last_output is not None:
+            self.S.last_output.discard()
         self.destroy()
 
     # --------------------------------------------------------
@@ -522,6 +870,33 @@ class CopiadorApp(tk.Tk):
         ttk.Checkbutton(row3, text="Ignorar >", variable=self.size_filter_var).pack(side="left", padx=(14, 2))
         ttk.Entry(row3, textvariable=self.max_kb_var, width=6).pack(side="left")
         ttk.Label(row3, text="KB").pack(side="left", padx=(2, 0))
+        ttk.Checkbutton(row3, text="Só rastreados (git)",
+                        variable=self.tracked_only_var).pack(side="left", padx=(14, 0))
+        ttk.Checkbutton(row3, text="Análise profunda", variable=self.deep_scan_var,
+                        command=self._on_deep_scan_toggle).pack(side="left", padx=(14, 0))
+        ttk.Checkbutton(row3, text="Índice no fim",
+                        variable=self.bundle_index_var).pack(side="left", padx=(14, 0))
+        ttk.Checkbutton(row3, text="Deduplicar iguais",
+                        variable=self.dedup_var).pack(side="left", padx=(14, 0))
+        ttk.Label(row3, text="Formato:").pack(side="left", padx=(14, 2))
+        fmt_combo = ttk.Combobox(row3, textvariable=self.format_var, state="readonly", width=16,
+                                 values=[fmt.label for fmt in FORMATS.values()])
+        fmt_combo.pack(side="left")
+        fmt_combo.bind("<<ComboboxSelected>>", lambda e: self._on_format_change())
+
+    def _output_format(self):
+        """Formato escolhido (output_format.OutputFormat)."""
+        label = self.format_var.get()
+        return next((fmt for fmt in FORMATS.values() if fmt.label == label), get_format(None))
+
+    def _on_format_change(self):
+        """Troca a extensão do nome da saída quando ela é a de outro formato."""
+        name = self.out_name_var.get().strip()
+        extension = self._output_format().extension
+        for fmt in FORMATS.values():
+            if name.endswith(fmt.extension) and fmt.extension != extension:
+                self.out_name_var.set(name[:-len(fmt.extension)] + extension)
+                break
 
     def _build_tabs(self, parent):
         self.notebook = ttk.Notebook(parent)
@@ -899,19 +1274,59 @@ class CopiadorApp(tk.Tk):
     # --------------------------------------------------------
     # COUNTER
     # --------------------------------------------------------
+    def _init_tokens(self):
+        """Tokenizador BPE de "tokenizerPath" (se houver) e contagens salvas de sessões anteriores."""
+        if self.tokenizer_path:
+            try:
+                self.tokens = TokenCounter(load_tokenizer(self.tokenizer_path))
+            except (OSError, ValueError, KeyError) as exc:
+                self.log(f"[AVISO] Tokenizador não carregado ({self.tokenizer_path}): {exc}", "warn")
+        self.tokens.load(TOKEN_CACHE_PATH)
+
+    def _selected_tokens(self, metas):
+        """(tokens, exato): contagens em cache; o que falta entra pela estimativa e é
+        contado em segundo plano (o contador é refeito ao terminar)."""
+        paths = []
+        estimated = 0
+        for m in metas:
+            if m.get("zip_path") or m["is_binary"]:
+                estimated += 0 if m["is_binary"] else m["size"] or 0
+            else:
+                paths.append(m["abs_path"])
+        total = self.tokens.total(paths)
+        tokens = total.tokens
+        if total.pending:
+            estimated += total.pending_size
+            self._start_token_count(total.pending)
+        return tokens + estimate_tokens(estimated), not estimated
+
+    def _start_token_count(self, paths):
+        self._token_cancel.set()
+        cancel_event = self._token_cancel = threading.Event()
+        counter = self.tokens
+
+        def digest_of(path):
+            facts = self._facts.fresh(path)
+            return facts.digest if facts is not None else None
+
+        def worker():
+            # Só avisa se algo foi contado: arquivos ilegíveis não disparam outra rodada
+            if counter.count_files(paths, cancel_event, digest_of) and not cancel_event.is_set():
+                self.queue.put(("tokens_done",))
+
+        threading.Thread(target=worker, daemon=True).start()
+
     def update_counter(self):
         count = len(self.S.selected_files)
         lines = 0
-        chars = 0
         meta_by_rp = {m["rel_path"]: m for m in self.S.all_meta}
-        for rp in self.S.selected_files:
-            m = meta_by_rp.get(rp)
-            if m:
-                lines += m["lines"] or 0
-                chars += m["size"] or 0
-        tokens = estimate_tokens(chars)
+        selected = [meta_by_rp[rp] for rp in self.S.selected_files if rp in meta_by_rp]
+        for m in selected:
+            lines += m["lines"] or 0
+        tokens, exact = self._selected_tokens(selected)
+        label = f"{tokens:,} tokens ({self.tokens.tokenizer.name})" if exact else f"~{tokens:,} tokens est."
         self.counter_text_lbl.config(text=f"{count} arquivo(s) selecionado(s) | ~{lines:,} linhas".replace(",", "."))
-        self.token_estimate_lbl.config(text=f"~{tokens:,} tokens est.".replace(",", "."))
+        self.token_estimate_lbl.config(text=label.replace(",", "."))
         self.file_count_badge.config(text=f"{len(self.S.all_meta)} arq.")
         self.st_right_lbl.config(text=f"{count} sel. | {len(self.S.all_meta)} total")
 
@@ -942,6 +1357,12 @@ class CopiadorApp(tk.Tk):
 
     def _start_load(self, kind, path):
         self.S.cancel_event = threading.Event()
+        # Uma varredura em andamento é substituída: o walker para na próxima pasta
+        self._scan_cancel.set()
+        self._scan_cancel = threading.Event()
+        self._scan_gen += 1
+        self._scan_streamed = None
+        gen = self._scan_gen
         self.btn_start.config(state="disabled")
         self.set_progress("pulse", 100, "Analisando arquivos…")
         self.log("⟳ Iniciando varredura (apenas metadados)…", "info")
@@ -953,37 +1374,91 @@ class CopiadorApp(tk.Tk):
         except ValueError:
             max_kb = 500
         ignore_patterns = list(self.S.ignore_patterns)
-        cancel_event = self.S.cancel_event
+        cancel_event = self._scan_cancel
+        tracked_only = self.tracked_only_var.get()
+        # Regras do git da pasta; com o .gitignore ativo, a varredura já poda o que ele ignora
+        gi_tree = GitignoreTree(path, self.S.gi_manual_rules) if kind == "dir" else None
+        prune_tree = gi_tree if gi_tree is not None and self.S.apply_gi and gi_tree.has_rules else None
+        self.S.gi_tree = gi_tree
+        self.S.gi_pruned = prune_tree is not None
 
         def progress_cb(count, total=None):
-            self.queue.put(("scan_progress", count))
+            self.queue.put(("scan_progress", gen, count))
+
+        def batch_cb(metas):
+            self.queue.put(("scan_batch", gen, metas))
 
         def worker():
             try:
+                if kind == "dir" and tracked_only:
+                    # Lista direto do .git/index: nada da árvore é percorrido
+                    try:
+                        metas, root_name = scan_directory(path, ignore_patterns, size_filter, max_kb,
+                                                            progress_cb, tracked_only=True)
+                        self.queue.put(("scan_done", gen, metas, root_name))
+                        return
+                    except GitIndexError as exc:
+                        self.queue.put(("log", f"⚠ {exc} Varrendo todos os arquivos.", "warn"))
                 if kind == "dir":
+                    # Índice salvo: mostra a listagem anterior na hora e revalida depois.
+                    index = ScanIndex.load(path)
+                    cached = None
+                    if index.has_data:
+                        cached, root_name = scan_directory(path, ignore_patterns, size_filter, max_kb,
+                                                           index=index, from_cache=True,
+                                                           gi_tree=prune_tree)
+                        self.queue.put(("scan_done", gen, cached, root_name, "cache"))
+                    # Sem cache na tela, os arquivos aparecem em lotes durante a varredura
                     metas, root_name = scan_directory(path, ignore_patterns, size_filter, max_kb,
-                                                        progress_cb, cancel_event)
+                                                        progress_cb, cancel_event, index=index,
+                                                        gi_tree=prune_tree,
+                                                        batch_cb=batch_cb if cached is None else None)
+                    if cancel_event.is_set():
+                        # Substituída: o índice só tem parte das pastas, não é salvo
+                        return
+                    index.save()
+                    if cached is not None:
+                        if metas == cached:
+                            self.queue.put(("scan_revalidated", gen, len(metas)))
+                            return
+                        self.queue.put(("scan_done", gen, metas, root_name, "refresh"))
+                        return
                 else:
                     metas, root_name = scan_zip(path, ignore_patterns, size_filter, max_kb, progress_cb)
-                self.queue.put(("scan_done", metas, root_name))
+                self.queue.put(("scan_done", gen, metas, root_name))
             except Exception as exc:
-                self.queue.put(("scan_error", str(exc)))
+                self.queue.put(("scan_error", gen, str(exc)))
 
         threading.Thread(target=worker, daemon=True).start()
 
-    def _on_scan_done(self, metas, root_name):
+    def _on_scan_done(self, metas, root_name, phase=None):
+        """phase: None (varredura completa), "cache" (listagem do índice, ainda
+        revalidando) ou "refresh" (revalidação encontrou mudanças)."""
         metas = sort_by(metas, lambda m: m["rel_path"], self.natural())
         self.S.all_meta = metas
-        self.S.selected_files = set()
-        self.S.selected_exts = set()
+        if phase == "refresh":
+            # Mantém o que o usuário marcou enquanto a listagem em cache estava visível
+            self.S.selected_files &= {m["rel_path"] for m in metas}
+            self.S.selected_exts &= {m["ext"] for m in metas}
+        else:
+            self.S.selected_files = set()
+            self.S.selected_exts = set()
         self.S.root_dir_label = root_name
         self.src_label_var.set(root_name)
 
         ext_set = sorted(set(m["ext"] for m in metas))
         self.S.all_exts = sort_strings(ext_set, self.natural())
 
-        gi_meta = next((m for m in metas if m["name"] == ".gitignore"), None)
-        if gi_meta:
+        tree = self.S.gi_tree
+        gi_meta = None if tree is not None else next(
+            (m for m in metas if m["name"] == ".gitignore"), None)
+        if tree is not None and tree.has_rules:
+            # Pasta: o .gitignore da raiz é listado; os aninhados e os do git valem no filtro
+            self.S.gi_file_rules = list(tree.root_lines)
+            extra = " + aninhados/.git" if tree.worktree is not None else " + aninhados"
+            self.gi_status_lbl.config(
+                text=f"✅ .gitignore: {len(self.S.gi_file_rules)} linha(s){extra}.")
+        elif gi_meta:
             content = read_file_content(gi_meta)
             self.S.gi_file_rules = content.splitlines() if content else []
             self.gi_status_lbl.config(text=f"✅ .gitignore: {len(self.S.gi_file_rules)} linha(s).")
@@ -997,11 +1472,99 @@ class CopiadorApp(tk.Tk):
         self.render_ext_list()
         self.render_file_list()
         self.build_explorer_tree()
+        if phase == "cache":
+            self.set_progress("pulse", 100, "Revalidando cache…")
+            self.set_status(f"Cache: {len(metas)} arquivo(s) — revalidando…")
+            self.log(f"⟳ Lista em cache: {len(metas)} arquivo(s). Revalidando…", "info")
+        else:
+            self._on_scan_finished(len(metas))
+        self.update_counter()
+
+    def _on_scan_batch(self, metas):
+        """Lote parcial da varredura: entra no fim da lista de arquivos, sem
+        reordenar. A ordenação, o .gitignore e o explorador chegam no scan_done."""
+        if self._scan_streamed is None:
+            # Primeiro lote: sai a listagem da pasta anterior
+            self._scan_streamed = 0
+            self.S.all_meta = []
+            self.S.all_exts = []
+            self.S.selected_files = set()
+            self.S.selected_exts = set()
+            self.file_tree.delete(*self.file_tree.get_children())
+        self.S.all_meta.extend(metas)
+        new_exts = {m["ext"] for m in metas} - set(self.S.all_exts)
+        if new_exts:
+            self.S.all_exts = sort_strings(set(self.S.all_exts) | new_exts, self.natural())
+            self.render_ext_list()
+        q = self.file_search_var.get().lower()
+        for m in metas:
+            if not q or q in m["rel_path"].lower():
+                self._insert_file_row(m)
+                self._scan_streamed += 1
+        self.file_counter_lbl.config(text=f"{self._scan_streamed} vis. / 0 sel.")
+        self.set_progress("pulse", 100, f"Analisando {len(self.S.all_meta)} arquivo(s)…")
+
+    def _on_scan_finished(self, count, note=""):
         self.set_progress(None)
         self.btn_start.config(state="normal")
-        self.set_status(f"✓ {len(metas)} arquivo(s) prontos")
-        self.log(f"✓ {len(metas)} arquivo(s), {len(self.S.all_exts)} extensão(ões).", "ok")
+        self.set_status(f"✓ {count} arquivo(s) prontos")
+        self.log(f"✓ {count} arquivo(s), {len(self.S.all_exts)} extensão(ões).{note}", "ok")
+        if self.deep_scan_var.get():
+            self._start_deep_scan()
+
+    # --------------------------------------------------------
+    # ANÁLISE PROFUNDA (linhas exatas, binário, encoding, hash)
+    # --------------------------------------------------------
+    def _on_deep_scan_toggle(self):
+        if self.deep_scan_var.get() and self.S.all_meta and str(self.btn_start["state"]) == "normal":
+            self._start_deep_scan()
+
+    def _start_deep_scan(self):
+        """Lê cada arquivo da pasta uma vez em segundo plano; ZIPs ficam com a estimativa."""
+        metas = [m for m in self.S.all_meta if m.get("abs_path")]
+        if not metas:
+            return
+        gen = self._scan_gen
+        cancel_event = self._scan_cancel
+        paths = [m["abs_path"] for m in metas]
+        self.log(f"⟳ Análise profunda de {len(paths)} arquivo(s)…", "info")
+
+        def progress_cb(done, total):
+            self.queue.put(("scan_deep_progress", gen, done, total))
+
+        def worker():
+            try:
+                probed = deep_scan(paths, self._facts, cancel_event=cancel_event,
+                                   progress_cb=progress_cb)
+                if cancel_event.is_set():
+                    return
+                facts = {}
+                for m in metas:
+                    found = self._facts.get(m["abs_path"], m["size"])
+                    if found is not None:
+                        facts[m["rel_path"]] = found
+                self.queue.put(("scan_deep_done", gen, facts, probed))
+            except Exception as exc:
+                self.queue.put(("log", f"[ERRO] Análise profunda: {exc}", "err"))
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _on_deep_scan_done(self, facts_by_rp, probed):
+        binaries = 0
+        for m in self.S.all_meta:
+            facts = facts_by_rp.get(m["rel_path"])
+            if facts is None:
+                continue
+            m["lines"] = facts.lines
+            m["is_binary"] = m["is_binary"] or facts.is_binary
+            m["encoding"] = facts.encoding
+            m["digest"] = facts.digest
+            binaries += m["is_binary"]
+        self.set_progress(None)
+        self.render_file_list()
         self.update_counter()
+        self.log(f"✓ Análise profunda: {probed} lido(s), {len(facts_by_rp) - probed} do cache; "
+                 f"{binaries} binário(s).", "ok")
 
     # --------------------------------------------------------
     # FILA DE EVENTOS DA THREAD DE FUNDO
@@ -1011,11 +1574,26 @@ class CopiadorApp(tk.Tk):
             while True:
                 item = self.queue.get_nowait()
                 kind = item[0]
+                if kind.startswith("scan_"):
+                    if item[1] != self._scan_gen:
+                        continue  # varredura já substituída por outra
+                    item = (kind,) + item[2:]
                 if kind == "scan_progress":
                     count = item[1]
                     self.set_progress("pulse", 100, f"Analisando {count} arquivo(s)…")
+                elif kind == "scan_batch":
+                    self._on_scan_batch(item[1])
                 elif kind == "scan_done":
-                    self._on_scan_done(item[1], item[2])
+                    self._on_scan_done(*item[1:])
+                elif kind == "log":
+                    self.log(item[1], item[2])
+                elif kind == "scan_deep_progress":
+                    done, total = item[1], item[2]
+                    self.set_progress(done, total, f"Análise profunda {done}/{total}…")
+                elif kind == "scan_deep_done":
+                    self._on_deep_scan_done(item[1], item[2])
+                elif kind == "scan_revalidated":
+                    self._on_scan_finished(item[1], " (sem alterações desde o cache)")
                 elif kind == "scan_error":
                     self.set_progress(None)
                     self.btn_start.config(state="normal")
@@ -1025,7 +1603,9 @@ class CopiadorApp(tk.Tk):
                     done, total = item[1], item[2]
                     self.set_progress(done, total, f"Lendo {done}/{total}…")
                 elif kind == "gen_done":
-                    self._on_gen_done(item[1], item[2], item[3], item[4])
+                    self._on_gen_done(item[1], item[2], item[3])
+                elif kind == "tokens_done":
+                    self.update_counter()
                 elif kind == "gen_error":
                     self.set_progress(None)
                     self.btn_start.config(state="normal")
@@ -1115,16 +1695,17 @@ class CopiadorApp(tk.Tk):
         filtered = [m for m in metas if q in m["rel_path"].lower()] if q else metas
         self.file_tree.delete(*self.file_tree.get_children())
         for m in filtered:
-            sel = m["rel_path"] in self.S.selected_files
-            mark = "☑" if sel else "☐"
-            parts = m["rel_path"].split("/")
-            dirpart = "/".join(parts[:-1])
-            name_label = m["name"] + (" (binário)" if m["is_binary"] else "")
-            tags = ("binfile",) if m["is_binary"] else ()
-            self.file_tree.insert("", "end", iid=m["rel_path"],
-                                   values=(mark, name_label, dirpart, f"{m['size']/1024:.0f}KB"), tags=tags)
+            self._insert_file_row(m)
         self.file_counter_lbl.config(text=f"{len(filtered)} vis. / {len(self.S.selected_files)} sel.")
 
+    def _insert_file_row(self, m):
+        mark = "☑" if m["rel_path"] in self.S.selected_files else "☐"
+        dirpart = m["rel_path"].rpartition("/")[0]
+        name_label = m["name"] + (" (binário)" if m["is_binary"] else "")
+        tags = ("binfile",) if m["is_binary"] else ()
+        self.file_tree.insert("", "end", iid=m["rel_path"],
+                               values=(mark, name_label, dirpart, f"{m['size']/1024:.0f}KB"), tags=tags)
+
     def _on_file_click(self, event):
         iid = self.file_tree.identify_row(event.y)
         if not iid:
@@ -1252,8 +1833,9 @@ class CopiadorApp(tk.Tk):
 
     def _insert_tree_node(self, parent_iid, node, path_prefix, natural):
         dirs = sort_strings(list(node["ch"].keys()), natural)
+        ignored = ignore_matcher(self.S.ignore_patterns)
         for dk in dirs:
-            if should_ignore_global(dk, self.S.ignore_patterns):
+            if ignored(dk):
                 continue
             child = node["ch"][dk]
             dir_path = path_prefix + [dk]
@@ -1268,7 +1850,7 @@ class CopiadorApp(tk.Tk):
             self._insert_tree_node(dir_iid, child, dir_path, natural)
         files_sorted = sort_by(node["files"], lambda m: m["name"], natural)
         for m in files_sorted:
-            if should_ignore_global(m["name"], self.S.ignore_patterns):
+            if ignored(m["name"]):
                 continue
             checked = m["rel_path"] in self.S.selected_files
             icon = "☑" if checked else "☐"
@@ -1391,6 +1973,19 @@ class CopiadorApp(tk.Tk):
     def toggle_gi(self):
         self.S.apply_gi = self.gi_apply_var.get()
         self.log(f"Gitignore {'ativado' if self.S.apply_gi else 'desativado'}.", "info")
+        if not self.S.apply_gi and self.S.gi_pruned and self.S.gi_tree is not None:
+            # A listagem atual não tem o que o git ignora: varre de novo sem podar
+            self._start_load(kind="dir", path=self.S.gi_tree.root)
+
+    def _gi_rules(self):
+        """Regras efetivas: todas as fontes do git para pastas, arquivo + manuais para ZIP."""
+        if self.S.gi_tree is not None:
+            return self.S.gi_tree
+        return gitignore_spec(self.S.gi_file_rules + self.S.gi_manual_rules)
+
+    def _gi_rules_changed(self):
+        if self.S.gi_tree is not None:
+            self.S.gi_tree.reload(self.S.gi_manual_rules)
 
     def render_gi_rules(self):
         self.gi_listbox.delete(0, "end")
@@ -1412,6 +2007,7 @@ class CopiadorApp(tk.Tk):
             self.toast("Regra já existe ou vazia.", "warn")
             return
         self.S.gi_manual_rules.append(v)
+        self._gi_rules_changed()
         self.gi_input_var.set("")
         self.render_gi_rules()
         self.log(f"Regra adicionada: {v}", "ok")
@@ -1426,6 +2022,7 @@ class CopiadorApp(tk.Tk):
             self.toast("Apenas regras manuais podem ser removidas.", "warn")
             return
         r = self.S.gi_manual_rules.pop(idx - fl)
+        self._gi_rules_changed()
         self.S.gi_sel_index = -1
         self.render_gi_rules()
         self.log(f"Regra removida: {r}", "ok")
@@ -1436,7 +2033,7 @@ class CopiadorApp(tk.Tk):
         if not self.S.all_meta:
             self.toast("Carregue os arquivos primeiro.", "warn")
             return
-        rules = self.S.gi_file_rules + self.S.gi_manual_rules
+        rules = self._gi_rules()
         preview = self.S.all_meta[:400]
         for m in preview:
             ign = gi_matches(m["rel_path"], rules, True)  # preview sempre mostra o efeito das regras
@@ -1453,8 +2050,8 @@ class CopiadorApp(tk.Tk):
     def start_copy(self):
         tab = self.S.active_tab
         src = self.src_label_var.get() or "Entrada"
-        out_name = self.out_name_var.get().strip() or "codigo_completo.txt"
-        rules = self.S.gi_file_rules + self.S.gi_manual_rules
+        out_name = self.out_name_var.get().strip() or "codigo_completo" + self._output_format().extension
+        rules = self._gi_rules()
 
         metas = []
         if tab == "ext":
@@ -1477,9 +2074,10 @@ class CopiadorApp(tk.Tk):
             if not self.S.all_meta:
                 self.toast("Carregue os arquivos primeiro.", "warn")
                 return
+            ignored = ignore_matcher(self.S.ignore_patterns)
             metas = [m for m in self.S.all_meta
                       if not gi_matches(m["rel_path"], rules, self.S.apply_gi)
-                      and not should_ignore_global(m["name"], self.S.ignore_patterns)
+                      and not ignored(m["name"])
                       and not m["is_binary"]]
 
         if not metas:
@@ -1506,41 +2104,70 @@ class CopiadorApp(tk.Tk):
         if self.S.apply_gi:
             filters.append(".gitignore")
         cancel_event = self.S.cancel_event
+        max_bytes = self.read_ahead_bytes
+        jobs = self.jobs
+        fmt = self._output_format()
+        index = self.bundle_index_var.get() and fmt.indexable
+        dedup = self.dedup_var.get()
+        counter = self.tokens
 
         def progress_cb(done, total):
             self.queue.put(("gen_progress", done, total))
 
         def worker():
+            out = None
             try:
-                out, copied, skipped = generate_output(metas, src_dir, filters, progress_cb, cancel_event)
-                self.queue.put(("gen_done", out, copied, skipped, out_name))
+                out = OutputSpill(out_name, index=index, dedup=dedup)
+                copied, skipped = generate_output(metas, src_dir, filters, out, progress_cb,
+                                                  cancel_event, max_bytes, jobs, fmt.key)
+                if not any(m.get("zip_path") for m in metas):
+                    tokens, pending = counter.total(
+                        m["abs_path"] for m in metas if not m["is_binary"])[:2]
+                    if not pending:
+                        # Cabeçalhos, rodapés e árvore pela estimativa
+                        content = sum(m["size"] or 0 for m in metas if not m["is_binary"])
+                        out.tokens = tokens + estimate_tokens(max(0, out.chars - content))
+                self.queue.put(("gen_done", out, copied, skipped))
             except Exception as exc:
+                if out is not None:
+                    out.discard()
                 self.queue.put(("gen_error", str(exc)))
 
         threading.Thread(target=worker, daemon=True).start()
 
     def _gen_arbitrary_output(self, files, out_name):
         self.log(f"Unindo {len(files)} avulso(s)…", "info")
-        out, n = generate_arbitrary_output(files)
-        self.S.last_output = out
-        self.S.last_output_name = out_name
+        out = OutputSpill(out_name)
+        try:
+            n = generate_arbitrary_output(files, out, self._output_format().key)
+        except Exception:
+            out.discard()
+            raise
+        self._set_last_output(out)
         self.toast(f"✓ {n} avulso(s) prontos!", "ok")
-        self.show_output_modal(out, out_name, n, len(out))
+        self.show_output_modal(out, n)
 
-    def _on_gen_done(self, out, copied, skipped, out_name):
+    def _set_last_output(self, out):
+        """Troca a saída atual; o arquivo temporário da anterior é apagado."""
+        if self.S.last_output is not None and self.S.last_output is not out:
+            self.S.last_output.discard()
         self.S.last_output = out
-        self.S.last_output_name = out_name
+
+    def _on_gen_done(self, out, copied, skipped):
+        self._set_last_output(out)
         self.set_progress(None)
         self.btn_start.config(state="normal")
         self.log(f"✓ {copied} arquivo(s) gerado(s). {skipped} ignorado(s).", "ok")
         self.toast(f"✓ {copied} arquivo(s) prontos!", "ok")
-        self.show_output_modal(out, out_name, copied, len(out))
+        self.show_output_modal(out, copied)
         self.update_counter()
 
     # --------------------------------------------------------
     # MODAL DE SAÍDA
     # --------------------------------------------------------
-    def show_output_modal(self, content, filename, count, chars):
+    def show_output_modal(self, out, count):
+        filename, chars = out.name, out.chars
+        tokens = out.tokens if out.tokens is not None else estimate_tokens(chars)
         top = tk.Toplevel(self)
         top.title(f"📄 {filename}")
         top.geometry("800x600")
@@ -1549,35 +2176,68 @@ class CopiadorApp(tk.Tk):
         head = ttk.Frame(top)
         head.pack(fill="x", padx=8, pady=6)
         ttk.Label(head, text=f"📄 {filename}", font=("Segoe UI", 11, "bold")).pack(side="left")
-        stats = ttk.Label(head, text=f"{count} arq. | {chars:,} chars | ~{estimate_tokens(chars):,} tokens"
+        stats = ttk.Label(head, text=f"{count} arq. | {chars:,} chars | ~{tokens:,} tokens"
                            .replace(",", "."))
         stats.pack(side="right")
 
-        body = tk.Text(top, wrap="none")
-        body.insert("1.0", content)
-        body.config(state="disabled")
-        vsb = ttk.Scrollbar(top, orient="vertical", command=body.yview)
-        hsb = ttk.Scrollbar(top, orient="horizontal", command=body.xview)
-        body.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
-        body.pack(side="top", fill="both", expand=True, padx=(8, 0))
-        vsb.pack(side="right", fill="y")
-        hsb.pack(fill="x", padx=8)
+        # Só as linhas visíveis são lidas do arquivo: abre na hora mesmo com centenas de MB
+        try:
+            body = OutputViewer(top, out.path)
+        except OSError as exc:
+            top.destroy()
+            self.toast("A saída não está mais disponível.", "err")
+            self.log(f"[ERRO] {exc}", "err")
+            return
+        nav = ttk.Frame(top)
+        nav.pack(fill="x", padx=8)
+        ttk.Label(nav, text="Ir para arquivo:").pack(side="left")
+        jump = ttk.Combobox(nav, state="readonly")
+        jump.pack(side="left", fill="x", expand=True, padx=(4, 0))
+        body.pack(side="top", fill="both", expand=True, padx=8)
+
+        def load_headers():
+            # Lista de cabeçalhos montada depois que a janela já apareceu
+            if not body.winfo_exists():
+                return
+            headers = self._indexed_headers(out.path, body.index) or body.index.find_blocks()
+            jump.configure(values=[h.path for h in headers])
+            jump.bind("<<ComboboxSelected>>",
+                      lambda e: body.goto(headers[jump.current()].line))
+
+        top.after_idle(load_headers)
 
         foot = ttk.Frame(top)
         foot.pack(fill="x", padx=8, pady=6)
-        ttk.Button(foot, text="📋 Copiar tudo", command=lambda: self.copy_text(content)).pack(side="left", padx=2)
+        ttk.Button(foot, text="📋 Copiar tudo", command=lambda: self.copy_output(out)).pack(side="left", padx=2)
         ttk.Button(foot, text="⬇ Baixar .txt",
-                   command=lambda: self._download_output(content, filename)).pack(side="left", padx=2)
+                   command=lambda: self._download_output(out)).pack(side="left", padx=2)
         ttk.Button(foot, text="Fechar", command=top.destroy).pack(side="right", padx=2)
 
-    def _download_output(self, content, filename):
-        path = filedialog.asksaveasfilename(initialfile=filename, defaultextension=".txt",
-                                             filetypes=[("Texto", "*.txt"), ("Todos", "*.*")])
+    @staticmethod
+    def _indexed_headers(path, lines):
+        """Cabeçalhos pelo índice do fim da saída, sem varrer o texto; None sem índice."""
+        try:
+            with open(path, "rb") as f:
+                entries = read_index(f)
+        except OSError:
+            return None
+        if not entries:
+            return None
+        # O conteúdo começa 3 linhas depois do separador que abre o bloco
+        return [BlockHeader(lines.line_of(e.offset) - 3, os.path.basename(e.path), e.path)
+                for e in entries]
+
+    def _download_output(self, out):
+        path = filedialog.asksaveasfilename(initialfile=out.name,
+                                             defaultextension=os.path.splitext(out.name)[1] or ".txt",
+                                             filetypes=[("Texto", "*.txt"),
+                                                        ("Texto compactado (gzip)", "*.txt.gz"),
+                                                        ("Texto compactado (xz)", "*.txt.xz"),
+                                                        ("Todos", "*.*")])
         if not path:
             return
         try:
-            with open(path, "w", encoding="utf-8") as f:
-                f.write(content)
+            out.save_as(path)
             self.toast("Download concluído!", "ok")
             self.log(f"Download: {path}", "ok")
         except Exception as exc:
@@ -1588,10 +2248,20 @@ class CopiadorApp(tk.Tk):
     # ÁREA DE TRANSFERÊNCIA
     # --------------------------------------------------------
     def clipboard_copy(self):
-        if not self.S.last_output:
+        if self.S.last_output is None:
             self.toast("Execute a cópia primeiro.", "warn")
             return
-        self.copy_text(self.S.last_output)
+        self.copy_output(self.S.last_output)
+
+    def copy_output(self, out):
+        # O Tk só aceita str na área de transferência: o texto é lido do arquivo agora
+        try:
+            txt = out.read_text()
+        except OSError as exc:
+            self.toast("A saída não está mais disponível.", "err")
+            self.log(f"[ERRO] {exc}", "err")
+            return
+        self.copy_text(txt)
 
     def copy_text(self, txt):
         try:
@@ -1609,10 +2279,14 @@ class CopiadorApp(tk.Tk):
     # --------------------------------------------------------
     def clear_all(self):
         self.S.cancel_event.set()
+        self._scan_cancel.set()
+        self._scan_gen += 1
+        if self.S.last_output is not None:
+            self.S.last_output.discard()
         self.S = State()
         self.S.theme = THEMES and self.S.theme  # mantém padrão
         self.src_label_var.set("")
-        self.out_name_var.set("codigo_completo.txt")
+        self.out_name_var.set("codigo_completo" + self._output_format().extension)
         self.ext_search_var.set("")
         self.file_search_var.set("")
         self.search_text.delete("1.0", "end")
@@ -1735,9 +2409,9 @@ class CopiadorApp(tk.Tk):
         ttk.Button(foot, text="Concluído", command=top.destroy).pack(side="right")
 
     def _apply_after_pattern_change(self):
+        ignored = ignore_matcher(self.S.ignore_patterns)
         self.S.selected_files = {rp for rp in self.S.selected_files
-                                  if not any(should_ignore_global(part, self.S.ignore_patterns)
-                                             for part in rp.split("/"))}
+                                  if not any(ignored(part) for part in rp.split("/"))}
         self.render_ext_list()
         self.render_file_list()
         self.render_search_list()
@@ -0,0 +1,111 @@
+"""Arquivos de conteúdo idêntico dentro de um mesmo bundle.
+
+Cópias vendorizadas, stubs gerados, LICENSE e __init__.py repetidos viram
+blocos iguais no codigo_completo.txt. Com a deduplicação ligada, a partir da
+segunda ocorrência o writer grava só o cabeçalho, marcado com
+"[igual a: <caminho da primeira>]"; restore_codefilecopier recria o arquivo
+com o conteúdo da primeira ocorrência.
+
+A comparação usa o que a escrita já tem em mãos: o crc32 e o tamanho do
+trecho validado (passthrough.Utf8Span) ou dos bytes do bloco. Só quando os
+dois coincidem com um conteúdo já escrito é calculado um blake2b de ambos
+para confirmar — o arquivo da primeira ocorrência é relido nesse momento, e
+descartado se mudou desde a validação.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+from passthrough import CHUNK_SIZE, Utf8Span
+
+# Abaixo disso o cabeçalho de referência não economiza nada
+DEDUP_MIN_BYTES = 64
+
+
+def _digest(data) -> bytes:
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def _span_digest(path, span: Utf8Span) -> Optional[bytes]:
+    """blake2b do trecho de `path`; None se o arquivo mudou desde a validação."""
+    h = hashlib.blake2b(digest_size=16)
+    try:
+        with open(path, "rb") as f:
+            st = os.fstat(f.fileno())
+            if st.st_size != span.size or st.st_mtime_ns != span.mtime_ns:
+                return None
+            f.seek(span.offset)
+            remaining = span.length
+            while remaining > 0:
+                data = f.read(min(CHUNK_SIZE, remaining))
+                if not data:
+                    return None
+                h.update(data)
+                remaining -= len(data)
+    except OSError:
+        return None
+    return h.digest()
+
+
+class _Seen:
+    """Primeira ocorrência de um conteúdo; o blake2b de um trecho é calculado sob demanda."""
+
+    __slots__ = ("path", "_digest", "_source")
+
+    def __init__(self, path, digest=None, source=None):
+        self.path = path
+        self._digest = digest
+        self._source = source   # (arquivo, Utf8Span) enquanto o digest não foi calculado
+
+    def digest(self) -> Optional[bytes]:
+        if self._digest is None and self._source is not None:
+            self._digest = _span_digest(*self._source)
+            self._source = None
+        return self._digest
+
+
+class ContentDeduper:
+    """
+    Conteúdos já escritos em uma saída. `find_*` devolve o caminho da primeira
+    ocorrência de um conteúdo igual (ou None); `add_*` registra um conteúdo
+    depois que ele foi de fato escrito.
+    """
+
+    def __init__(self):
+        self._seen: Dict[Tuple[int, int], List[_Seen]] = {}
+
+    def _find(self, key, digest_fn) -> Optional[str]:
+        candidates = self._seen.get(key)
+        if not candidates:
+            return None
+        digest = digest_fn()
+        if digest is None:
+            return None
+        for seen in candidates:
+            if seen.digest() == digest:
+                return seen.path
+        return None
+
+    def find_span(self, source, span: Utf8Span) -> Optional[str]:
+        if span.length < DEDUP_MIN_BYTES:
+            return None
+        return self._find((span.length, span.crc32), lambda: _span_digest(source, span))
+
+    def find_bytes(self, data) -> Optional[str]:
+        if len(data) < DEDUP_MIN_BYTES:
+            return None
+        return self._find((len(data), zlib.crc32(data)), lambda: _digest(data))
+
+    def add_span(self, path: str, source, span: Utf8Span) -> None:
+        if span.length >= DEDUP_MIN_BYTES:
+            self._seen.setdefault((span.length, span.crc32), []).append(
+                _Seen(path, source=(source, span)))
+
+    def add_bytes(self, path: str, data) -> None:
+        if len(data) >= DEDUP_MIN_BYTES:
+            self._seen.setdefault((len(data), zlib.crc32(data)), []).append(
+                _Seen(path, digest=_digest(data)))
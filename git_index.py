@@ -0,0 +1,178 @@
+"""Leitor do arquivo .git/index (versões 2, 3 e 4) em Python puro.
+
+Usado como fonte de varredura "somente arquivos rastreados": em vez de
+percorrer a árvore inteira (node_modules, build, .venv...) e descartar quase
+tudo, a lista vem direto do index do git, já com o tamanho e o mtime que o
+git gravou no último `git add`/`git status`. Nenhum arquivo da árvore é
+aberto ou consultado com stat.
+
+Formato (Documentation/gitformat-index.txt): cabeçalho "DIRC" + versão +
+número de entradas; cada entrada tem 10 campos de stat de 32 bits, o SHA-1,
+16 bits de flags (mais 16 de flags estendidas na v3+) e o caminho. Nas
+versões 2 e 3 o caminho termina em NUL e a entrada é alinhada em 8 bytes; na
+versão 4 o caminho é comprimido em relação ao anterior (varint com quantos
+bytes remover do fim do caminho anterior + sufixo terminado em NUL).
+"""
+
+from __future__ import annotations
+
+import os
+import struct
+from typing import Callable, NamedTuple, Optional
+
+from gitignore_tree import find_worktree
+from walker import FileEntry, IgnoreFn
+
+_HEADER = struct.Struct(">4sLL")
+# ctime s/ns, mtime s/ns, dev, ino, mode, uid, gid, size, sha1, flags
+_ENTRY = struct.Struct(">LLLLLLLLLL20sH")
+_EXT_FLAGS = struct.Struct(">H")
+
+FLAG_EXTENDED = 0x4000
+FLAG_STAGE_MASK = 0x3000
+FLAG_NAME_MASK = 0x0FFF
+EXT_SKIP_WORKTREE = 0x4000
+EXT_INTENT_TO_ADD = 0x2000
+
+MODE_TYPE_MASK = 0o170000
+MODE_REGULAR = 0o100000
+
+
+class GitIndexError(ValueError):
+    """Arquivo de index ausente do formato esperado."""
+
+
+class IndexEntry(NamedTuple):
+    path: str                # relativo à raiz do repositório, com '/'
+    mode: int
+    size: int
+    mtime: float
+    inode: int
+    stage: int
+    skip_worktree: bool
+
+
+def _varint(data, pos):
+    """Inteiro de tamanho variável da v4 (mesma codificação do offset de ofs-delta)."""
+    byte = data[pos]
+    pos += 1
+    value = byte & 0x7F
+    while byte & 0x80:
+        byte = data[pos]
+        pos += 1
+        value = ((value + 1) << 7) | (byte & 0x7F)
+    return value, pos
+
+
+def read_index(path) -> list:
+    """Lê todas as entradas do index em `path`, na ordem gravada (por caminho)."""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError as exc:
+        raise GitIndexError(f"Index do git ilegível: {exc}") from exc
+    if len(data) < _HEADER.size:
+        raise GitIndexError("Index do git truncado.")
+    signature, version, count = _HEADER.unpack_from(data, 0)
+    if signature != b"DIRC" or version not in (2, 3, 4):
+        raise GitIndexError(f"Formato de index não suportado (versão {version}).")
+
+    entries = []
+    pos = _HEADER.size
+    prev = b""
+    entry_size = _ENTRY.size
+    unpack = _ENTRY.unpack_from
+    find = data.find
+    try:
+        for _ in range(count):
+            start = pos
+            (_cs, _cn, mtime_s, mtime_ns, _dev, ino, mode, _uid, _gid, size,
+             _sha, flags) = unpack(data, pos)
+            pos += entry_size
+            ext = 0
+            if flags & FLAG_EXTENDED:
+                if version < 3:
+                    raise GitIndexError("Flag estendida em index versão 2.")
+                (ext,) = _EXT_FLAGS.unpack_from(data, pos)
+                pos += 2
+            if version == 4:
+                strip, pos = _varint(data, pos)
+                end = find(b"\0", pos)
+                if end < 0 or strip > len(prev):
+                    raise GitIndexError("Entrada de index corrompida.")
+                name = prev[:len(prev) - strip] + data[pos:end]
+                pos = end + 1
+            else:
+                length = flags & FLAG_NAME_MASK
+                end = pos + length if length < FLAG_NAME_MASK else find(b"\0", pos)
+                if end < 0 or end > len(data):
+                    raise GitIndexError("Entrada de index corrompida.")
+                name = data[pos:end]
+                # Entrada alinhada em 8 bytes, com 1 a 8 NULs após o caminho
+                pos = start + ((end - start + 8) & ~7)
+            prev = name
+            entries.append(IndexEntry(
+                name.decode("utf-8", "surrogateescape"), mode, size,
+                mtime_s + mtime_ns / 1e9, ino, (flags & FLAG_STAGE_MASK) >> 12,
+                bool(ext & EXT_SKIP_WORKTREE)))
+    except struct.error as exc:
+        raise GitIndexError("Index do git truncado.") from exc
+    return entries
+
+
+def tracked_files(root, ignore: IgnoreFn | None = None,
+                  on_skip: Callable[[str, bool], None] | None = None) -> Optional[list]:
+    """Arquivos rastreados sob `root` como walker.FileEntry, ou None se não for um checkout git.
+
+    O filtro é aplicado como no walker: cada pasta do caminho é testada uma vez
+    (recusada = tudo abaixo dela é descartado) e depois o próprio arquivo.
+    Ficam de fora links simbólicos, submódulos, entradas fora do checkout
+    esparso e conflitos repetidos. Tamanho/mtime são os do index (sem stat).
+    """
+    root = os.path.abspath(os.fspath(root))
+    worktree, git_dir = find_worktree(root)
+    if worktree is None:
+        return None
+    index_path = os.path.join(git_dir, "index")
+    if not os.path.isfile(index_path):
+        return None
+    entries = read_index(index_path)
+
+    rel_root = os.path.relpath(root, worktree)
+    prefix = "" if rel_root == "." else rel_root.replace(os.sep, "/") + "/"
+    cut = len(prefix)
+    dir_ok: dict = {"": True}
+
+    def accepted_dir(rel_dir):
+        ok = dir_ok.get(rel_dir)
+        if ok is None:
+            parent, _, name = rel_dir.rpartition("/")
+            ok = accepted_dir(parent)
+            if ok and ignore is not None and ignore(name, rel_dir, True):
+                ok = False
+                if on_skip is not None:
+                    on_skip(rel_dir, True)
+            dir_ok[rel_dir] = ok
+        return ok
+
+    files = []
+    last_path = None
+    base = root if root.endswith(os.sep) else root + os.sep
+    for entry in entries:
+        path = entry.path
+        if path == last_path or (cut and not path.startswith(prefix)):
+            continue
+        last_path = path
+        if (entry.mode & MODE_TYPE_MASK) != MODE_REGULAR or entry.skip_worktree:
+            continue
+        rel = path[cut:]
+        rel_dir, _, name = rel.rpartition("/")
+        if not accepted_dir(rel_dir):
+            continue
+        if ignore is not None and ignore(name, rel, False):
+            if on_skip is not None:
+                on_skip(rel, False)
+            continue
+        abs_path = base + (rel if os.sep == "/" else rel.replace("/", os.sep))
+        files.append(FileEntry(name, rel, abs_path, entry.size, entry.mtime, entry.inode))
+    return files
@@ -0,0 +1,230 @@
+"""Regras de exclusão do git aplicadas a uma árvore inteira, como o próprio git faz.
+
+Fontes, da maior para a menor prioridade:
+
+  1. .gitignore de cada pasta — a regra vale só abaixo da pasta em que está,
+     e o arquivo mais profundo decide primeiro;
+  2. .gitignore das pastas acima da raiz escolhida, até a raiz do repositório;
+  3. .git/info/exclude;
+  4. core.excludesFile (ou ~/.config/git/ignore, o padrão do git).
+
+Os .gitignore aninhados são lidos sob demanda, quando a varredura entra na
+pasta, então pastas podadas nunca são lidas. Como no git, um arquivo dentro de
+uma pasta excluída não pode ser reincluído: `is_ignored(rel, is_dir=True)`
+verdadeiro significa que a subárvore inteira pode ser podada. Seguro para uso
+pelas threads do walker.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Iterable, Optional
+
+from gitwildmatch import GitignoreSpec, normalize_path
+
+_MISSING = object()
+
+
+def read_lines(path) -> list:
+    try:
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            return f.read().splitlines()
+    except OSError:
+        return []
+
+
+def find_worktree(start):
+    """(raiz do working tree, pasta git dessa worktree) que contém `start`, ou (None, None).
+
+    Entende `.git` como arquivo ("gitdir: ...") usado por worktrees e submódulos;
+    nesse caso a pasta retornada é a privada da worktree (onde fica o index).
+    """
+    current = os.path.abspath(start)
+    while True:
+        dot_git = os.path.join(current, ".git")
+        if os.path.isdir(dot_git):
+            return current, dot_git
+        if os.path.isfile(dot_git):
+            for line in read_lines(dot_git):
+                if line.startswith("gitdir:"):
+                    git_dir = line[len("gitdir:"):].strip()
+                    return current, os.path.normpath(os.path.join(current, git_dir))
+        parent = os.path.dirname(current)
+        if parent == current:
+            return None, None
+        current = parent
+
+
+def common_git_dir(git_dir):
+    """Pasta comum (config, info/exclude) de uma worktree; a própria pasta se não houver."""
+    common = read_lines(os.path.join(git_dir, "commondir"))
+    if common:
+        return os.path.normpath(os.path.join(git_dir, common[0].strip()))
+    return git_dir
+
+
+def find_git_dir(start):
+    """(raiz do working tree, pasta .git comum) que contém `start`, ou (None, None)."""
+    worktree, git_dir = find_worktree(start)
+    if worktree is None:
+        return None, None
+    return worktree, common_git_dir(git_dir)
+
+
+def _config_value(path, section, key):
+    """Último valor de `section.key` em um arquivo de configuração do git (sem includes)."""
+    value = None
+    in_section = False
+    for raw in read_lines(path):
+        line = raw.strip()
+        if not line or line[0] in "#;":
+            continue
+        if line.startswith("["):
+            name = line[1:line.find("]")].strip() if "]" in line else ""
+            in_section = name.lower() == section
+            line = line[line.find("]") + 1:].strip() if "]" in line else ""
+            if not line:
+                continue
+        if not in_section or "=" not in line:
+            continue
+        k, v = line.split("=", 1)
+        if k.strip().lower() != key:
+            continue
+        v = v.strip()
+        if v.startswith('"'):
+            end = v.find('"', 1)
+            v = v[1:end] if end > 0 else v[1:]
+        else:
+            for marker in (" #", " ;", "\t#", "\t;"):
+                cut = v.find(marker)
+                if cut >= 0:
+                    v = v[:cut].rstrip()
+        value = v
+    return value
+
+
+def global_excludes_file(git_dir=None) -> Optional[str]:
+    """Caminho de core.excludesFile (repositório > global > XDG > sistema)."""
+    xdg = os.environ.get("XDG_CONFIG_HOME") or os.path.join(os.path.expanduser("~"), ".config")
+    configs = ["/etc/gitconfig", os.path.join(xdg, "git", "config"),
+               os.path.join(os.path.expanduser("~"), ".gitconfig")]
+    if git_dir:
+        configs.append(os.path.join(git_dir, "config"))
+    value = None
+    for path in configs:
+        found = _config_value(path, "core", "excludesfile")
+        if found is not None:
+            value = found
+    if value is None:
+        return os.path.join(xdg, "git", "ignore")
+    return os.path.expanduser(value) if value else None
+
+
+class GitignoreTree:
+    """Todas as fontes de exclusão do git para a árvore em `root`.
+
+    `extra_lines` são regras manuais, tratadas como linhas finais do
+    .gitignore da raiz.
+    """
+
+    def __init__(self, root, extra_lines: Iterable[str] = (), use_git_sources: bool = True):
+        self.root = os.path.abspath(os.fspath(root))
+        self.use_git_sources = use_git_sources
+        self.reload(extra_lines)
+
+    def reload(self, extra_lines: Optional[Iterable[str]] = None) -> None:
+        """Descarta as regras lidas (arquivos podem ter mudado) e relê as fontes fixas."""
+        if extra_lines is not None:
+            self.extra_lines = tuple(extra_lines)
+        self.root_lines = read_lines(os.path.join(self.root, ".gitignore"))
+        self._specs: dict = {}       # pasta relativa -> GitignoreSpec ou None
+        self._chains: dict = {}      # pasta relativa -> [(prefixo da pasta, spec)], mais profunda primeiro
+        self._dir_state: dict = {}   # pasta relativa -> excluída (ela ou um ancestral)
+        # Fontes acima da raiz: [(prefixo até a raiz, spec)]
+        self._outer: list = []
+        self.worktree = self.git_dir = None
+        if self.use_git_sources:
+            self.worktree, self.git_dir = find_git_dir(self.root)
+        if self.worktree is not None:
+            rel_root = os.path.relpath(self.root, self.worktree)
+            parts = [] if rel_root == "." else rel_root.replace(os.sep, "/").split("/")
+            # .gitignore dos ancestrais, do mais próximo para a raiz do repositório
+            for depth in range(len(parts) - 1, -1, -1):
+                base = os.path.join(self.worktree, *parts[:depth])
+                lines = read_lines(os.path.join(base, ".gitignore"))
+                if lines:
+                    prefix = "/".join(parts[depth:]) + "/"
+                    self._outer.append((prefix, GitignoreSpec(lines)))
+            repo_prefix = "/".join(parts) + "/" if parts else ""
+            for source in (os.path.join(self.git_dir, "info", "exclude"),
+                           global_excludes_file(self.git_dir)):
+                lines = read_lines(source) if source else []
+                if lines:
+                    self._outer.append((repo_prefix, GitignoreSpec(lines)))
+        root_spec = GitignoreSpec(list(self.root_lines) + list(self.extra_lines))
+        self._specs[""] = root_spec if root_spec else None
+
+    @property
+    def has_rules(self) -> bool:
+        """True se há alguma fonte de regras (ou se a raiz está em um repositório git)."""
+        return bool(self.root_lines or self.extra_lines or self._outer or self.worktree)
+
+    # ------------------------------------------------------------------
+
+    def _spec_for(self, rel_dir):
+        spec = self._specs.get(rel_dir, _MISSING)
+        if spec is _MISSING:
+            lines = read_lines(os.path.join(self.root, *rel_dir.split("/"), ".gitignore"))
+            spec = GitignoreSpec(lines) if lines else None
+            spec = self._specs.setdefault(rel_dir, spec if spec else None)
+        return spec
+
+    def _chain_for(self, rel_dir):
+        chain = self._chains.get(rel_dir)
+        if chain is None:
+            parent = rel_dir.rpartition("/")[0] if rel_dir else None
+            chain = list(self._chain_for(parent)) if parent is not None else []
+            spec = self._spec_for(rel_dir)
+            if spec is not None:
+                chain.insert(0, (rel_dir + "/" if rel_dir else "", spec))
+            self._chains[rel_dir] = chain
+        return chain
+
+    def _check(self, rel_path, parent):
+        """Resultado da regra de maior prioridade que casa com `rel_path` (None se nenhuma)."""
+        for prefix, spec in self._chain_for(parent):
+            result = spec.check(rel_path[len(prefix):])
+            if result is not None:
+                return result
+        for prefix, spec in self._outer:
+            result = spec.check(prefix + rel_path)
+            if result is not None:
+                return result
+        return None
+
+    def _dir_excluded(self, rel_dir):
+        state = self._dir_state.get(rel_dir)
+        if state is None:
+            parent = rel_dir.rpartition("/")[0]
+            state = bool(parent and self._dir_excluded(parent)) or (
+                rel_dir.rpartition("/")[2] == ".git" or self._check(rel_dir + "/", parent) is True)
+            self._dir_state[rel_dir] = state
+        return state
+
+    def is_ignored(self, rel_path: str, is_dir: bool = False) -> bool:
+        """`rel_path` é relativo à raiz, com '/' (como walker.FileEntry.rel_path)."""
+        rel_path = normalize_path(rel_path).rstrip("/")
+        if not rel_path:
+            return False
+        if is_dir:
+            return self._dir_excluded(rel_path)
+        parent = rel_path.rpartition("/")[0]
+        if parent and self._dir_excluded(parent):
+            return True
+        return self._check(rel_path, parent) is True
+
+    @property
+    def loaded_files(self) -> int:
+        """Quantos .gitignore da árvore foram lidos até agora (aninhados só após a varredura)."""
+        count = sum(1 for rel, spec in list(self._specs.items()) if rel and spec is not None)
+        return count + (1 if self.root_lines else 0)
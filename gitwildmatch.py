@@ -0,0 +1,348 @@
+"""Compilador nativo de regras .gitignore (sintaxe gitwildmatch), sem dependências.
+
+Produz o mesmo resultado de pathspec.PathSpec.from_lines("gitwildmatch", ...)
+— a última regra que casa decide, negações (!) reincluem — mas compila todas
+as regras de uma vez, agrupadas por tipo:
+
+  - regras de nome (sem '/', ex.: "*.log", "node_modules/"): testadas contra
+    cada componente do caminho. Nomes literais ficam em um dict e os curingas
+    em uma única regex; o resultado por componente é memorizado, então nomes
+    de pasta repetidos custam uma consulta a dict;
+  - regras de caminho (ancoradas, ex.: "/build", "docs/**/*.md"): uma única
+    regex com uma alternativa por regra, da última para a primeira, de modo
+    que a primeira alternativa que casa é a regra de maior prioridade.
+
+Como no git, uma pasta excluída não é percorrida: `is_ignored(rel, is_dir=True)`
+responde com uma única consulta se a subárvore inteira pode ser podada.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from typing import Iterable, Optional
+
+# Tipos de regra após a normalização
+_NAME = 0          # "**/X": algum componente do caminho casa com X
+_NAME_DIR = 1      # "**/X/**": algum componente seguido de '/' casa com X
+_PATH = 2          # regex ancorada no início do caminho
+_NONEMPTY = 3      # "*" e "**": qualquer caminho
+_HAS_SLASH = 4     # "*/" e "**/": qualquer caminho fora da raiz
+
+_GLOB_CHARS = frozenset("*?[\\")
+_MEMO_LIMIT = 65536
+
+
+class GitWildMatchError(ValueError):
+    """Padrão inválido (ex.: barra invertida no fim)."""
+
+
+def translate_segment(pattern: str) -> str:
+    """Traduz o glob de um único segmento (sem '/') para regex."""
+    escape = False
+    regex = ""
+    i, end = 0, len(pattern)
+    while i < end:
+        char = pattern[i]
+        i += 1
+        if escape:
+            escape = False
+            regex += re.escape(char)
+        elif char == "\\":
+            escape = True
+        elif char == "*":
+            regex += "[^/]*"
+        elif char == "?":
+            regex += "[^/]"
+        elif char == "[":
+            j = i
+            if j < end and pattern[j] in "!^":
+                j += 1
+            if j < end and pattern[j] == "]":
+                j += 1
+            while j < end and pattern[j] != "]":
+                j += 1
+            if j >= end:
+                # Como o git: regra com colchete sem fechamento é descartada.
+                raise _RangeError(pattern)
+            j += 1
+            expr = "["
+            if pattern[i] in "!^":
+                expr += "^"
+                i += 1
+            expr += pattern[i:j].replace("\\", "\\\\")
+            regex += expr
+            i = j
+        else:
+            regex += re.escape(char)
+    if escape:
+        raise GitWildMatchError(f"Barra invertida sem caractere a escapar: {pattern!r}")
+    return regex
+
+
+class _RangeError(GitWildMatchError):
+    pass
+
+
+def parse_rule(line: str):
+    """Normaliza uma linha do .gitignore.
+
+    Retorna None para linhas sem efeito (vazias, comentários, inválidas) ou
+    (include, tipo, dado), onde include=True exclui o caminho e False reinclui;
+    `dado` é o glob do nome (_NAME/_NAME_DIR) ou, para _PATH, o par
+    (primeiro segmento literal ou None, regex do caminho).
+    """
+    if not line.endswith("\\ "):
+        line = line.rstrip()
+    if not line or line.startswith("#") or line == "/":
+        return None
+    include = True
+    if line.startswith("!"):
+        include = False
+        line = line[1:]
+
+    segs = line.split("/")
+    is_dir_pattern = not segs[-1]
+    if not segs[0]:
+        del segs[0]
+    elif len(segs) == 1 or (len(segs) == 2 and not segs[1]):
+        if segs[0] != "**":
+            segs.insert(0, "**")
+    if not segs:
+        return None
+    if not segs[-1]:
+        segs[-1] = "**"
+    for i in range(len(segs) - 1, 0, -1):
+        if segs[i - 1] == "**" and segs[i] == "**":
+            del segs[i]
+
+    n = len(segs)
+    if n == 1 and segs[0] == "**":
+        return (include, _HAS_SLASH if is_dir_pattern else _NONEMPTY, None)
+    if n == 2 and segs == ["**", "*"]:
+        return (include, _NONEMPTY, None)
+    if n == 3 and segs == ["**", "*", "**"]:
+        return (include, _HAS_SLASH, None)
+
+    try:
+        if segs[0] == "**" and segs[1] != "**" and "[" not in segs[1] and (
+                n == 2 or (n == 3 and segs[2] == "**")):
+            name = segs[1]
+            translate_segment(name)  # valida
+            return (include, _NAME if n == 2 else _NAME_DIR, name)
+        first = segs[0] if segs[0] != "**" and _GLOB_CHARS.isdisjoint(segs[0]) else None
+        return (include, _PATH, (first, _translate_path(segs)))
+    except _RangeError:
+        return None
+    except GitWildMatchError:
+        return None
+
+
+def _translate_path(segs):
+    parts = []
+    need_slash = False
+    end = len(segs) - 1
+    for i, seg in enumerate(segs):
+        if seg == "**":
+            if i == 0:
+                parts.append("(?:.+/)?")
+            elif i < end:
+                parts.append("(?:/.+)?")
+                need_slash = True
+            else:
+                parts.append("/")
+        else:
+            if need_slash:
+                parts.append("/")
+            parts.append("[^/]+" if seg == "*" else translate_segment(seg))
+            if i == end:
+                parts.append("(?:/|$)")
+            need_slash = True
+    return "".join(parts)
+
+
+class GitignoreSpec:
+    """Conjunto compilado de regras de um .gitignore (mais regras manuais)."""
+
+    def __init__(self, lines: Iterable[str] = ()):
+        self.lines = tuple(lines)
+        self._include: list = []        # índice da regra -> exclui (True) / reinclui (False)
+        # Regras de nome, por tipo: [literais, sufixos "*.ext", globs gerais]
+        self._name_tables = _NameTables()
+        self._dir_tables = _NameTables()
+        by_first: dict = {}             # primeiro segmento literal -> [(índice, regex)]
+        path_regexes: list = []         # regras de caminho que começam com curinga
+        self._nonempty = -1
+        self._has_slash = -1
+
+        for line in self.lines:
+            parsed = parse_rule(line)
+            if parsed is None:
+                continue
+            include, kind, data = parsed
+            index = len(self._include)
+            self._include.append(include)
+            if kind == _NAME:
+                self._name_tables.add(index, data)
+            elif kind == _NAME_DIR:
+                self._dir_tables.add(index, data)
+            elif kind == _PATH:
+                first, regex = data
+                if first is None:
+                    path_regexes.append((index, regex))
+                else:
+                    by_first.setdefault(first, []).append((index, regex))
+            elif kind == _NONEMPTY:
+                self._nonempty = index
+            else:
+                self._has_slash = index
+
+        self._name_tables.compile()
+        self._dir_tables.compile()
+        self._has_names = bool(self._name_tables or self._dir_tables)
+        # Regras ancoradas só são testadas quando o 1º componente do caminho bate.
+        self._path_by_first = {first: _combine(items) for first, items in by_first.items()}
+        self._path_re, self._path_groups = _combine(path_regexes)
+        self._memo: dict = {}
+
+    @classmethod
+    def from_file(cls, path, extra_lines: Iterable[str] = ()) -> "GitignoreSpec":
+        try:
+            with open(path, "r", encoding="utf-8", errors="ignore") as f:
+                lines = f.read().splitlines()
+        except OSError:
+            lines = []
+        return cls(lines + list(extra_lines))
+
+    def __bool__(self) -> bool:
+        return bool(self._include)
+
+    def __len__(self) -> int:
+        return len(self._include)
+
+    # ------------------------------------------------------------------
+
+    def _component(self, name):
+        """(maior índice de regra de nome, maior índice de regra de pasta) para um componente."""
+        hit = self._memo.get(name)
+        if hit is None:
+            hit = (self._name_tables.best(name), self._dir_tables.best(name))
+            if len(self._memo) >= _MEMO_LIMIT:
+                self._memo.clear()
+            self._memo[name] = hit
+        return hit
+
+    def check(self, rel_path: str) -> Optional[bool]:
+        """True = excluído, False = reincluído por negação, None = nenhuma regra casou."""
+        if not self._include or not rel_path:
+            return None
+        best = -1
+        comps = rel_path.split("/")
+        if self._path_by_first:
+            bucket = self._path_by_first.get(comps[0])
+            if bucket is not None:
+                m = bucket[0].match(rel_path)
+                if m is not None:
+                    best = bucket[1][m.lastindex]
+        if self._path_re is not None:
+            m = self._path_re.match(rel_path)
+            if m is not None:
+                best = max(best, self._path_groups[m.lastindex])
+        if self._nonempty > best and rel_path.strip("\n"):
+            best = self._nonempty
+        if self._has_slash > best and "/" in rel_path:
+            best = self._has_slash
+        if self._has_names:
+            last = len(comps) - 1
+            component = self._component
+            for i, name in enumerate(comps):
+                any_idx, dir_idx = component(name)
+                if any_idx > best:
+                    best = any_idx
+                if i < last and dir_idx > best:
+                    best = dir_idx
+        return self._include[best] if best >= 0 else None
+
+    def match_file(self, rel_path: str) -> bool:
+        """Mesmo contrato de pathspec.PathSpec.match_file."""
+        return self.check(normalize_path(rel_path)) is True
+
+    def is_ignored(self, rel_path: str, is_dir: bool = False) -> bool:
+        """Pastas são testadas com '/' no fim; se excluídas, a subárvore inteira é podada."""
+        rel_path = normalize_path(rel_path)
+        if is_dir and not rel_path.endswith("/"):
+            rel_path += "/"
+        return self.check(rel_path) is True
+
+
+def normalize_path(path: str) -> str:
+    if os.sep != "/":
+        path = path.replace(os.sep, "/")
+    if path.startswith("/"):
+        return path[1:]
+    if path.startswith("./"):
+        return path[2:]
+    return path
+
+
+class _NameTables:
+    """Regras de nome de um tipo, separadas pela forma mais barata de testar."""
+
+    __slots__ = ("literals", "suffixes", "suffix_lengths", "globs", "regex", "groups")
+
+    def __init__(self):
+        self.literals: dict = {}     # "node_modules" -> índice
+        self.suffixes: dict = {}     # ".log" (de "*.log") -> índice
+        self.suffix_lengths: tuple = ()
+        self.globs: list = []        # [(índice, regex)]
+        self.regex = None
+        self.groups = None
+
+    def __bool__(self):
+        return bool(self.literals or self.suffixes or self.globs)
+
+    def add(self, index, name):
+        if _GLOB_CHARS.isdisjoint(name):
+            self.literals[name] = index
+        elif name.startswith("*") and _GLOB_CHARS.isdisjoint(name[1:]) and len(name) > 1:
+            self.suffixes[name[1:]] = index
+        else:
+            self.globs.append((index, translate_segment(name)))
+
+    def compile(self):
+        self.suffix_lengths = tuple(sorted({len(s) for s in self.suffixes}))
+        self.regex, self.groups = _combine(self.globs)
+
+    def best(self, name):
+        best = self.literals.get(name, -1)
+        if self.suffix_lengths:
+            suffixes = self.suffixes
+            size = len(name)
+            for length in self.suffix_lengths:
+                if length > size:
+                    break
+                idx = suffixes.get(name[size - length:], -1)
+                if idx > best:
+                    best = idx
+        if self.regex is not None:
+            m = self.regex.fullmatch(name)
+            if m is not None:
+                idx = self.groups[m.lastindex]
+                if idx > best:
+                    best = idx
+        return best
+
+
+def _combine(indexed):
+    """Une as regex em uma alternação da última regra para a primeira.
+
+    Cada alternativa é um grupo de captura; `m.lastindex` aponta a regra.
+    """
+    if not indexed:
+        return None, None
+    groups = [0]
+    alternatives = []
+    for index, regex in reversed(indexed):
+        groups.append(index)
+        alternatives.append(f"({regex})")
+    return re.compile("|".join(alternatives)), groups
@@ -0,0 +1,88 @@
+"""Matcher compilado para os padrões globais de exclusão (IGNORE_PATTERNS).
+
+Construído uma única vez a partir da lista ativa de padrões: nomes literais
+vão para um conjunto (busca O(1)) e os padrões com curinga viram uma única
+regex compilada com todas as alternativas. Cada módulo preserva a própria
+semântica de comparação:
+
+  - CodeFileCopier.py:   fnmatch.fnmatch (normcase; [seq] suportado)
+    -> IgnoreMatcher.fnmatch(padroes, fold=os.path.normcase)
+  - compactar_projeto.py: fnmatchcase sobre casefold
+    -> IgnoreMatcher.fnmatch(padroes, fold=str.casefold)
+  - Edição Tkinter:       só '*' ativa curinga (* e ?, sem distinguir
+    maiúsculas); demais padrões exigem nome idêntico
+    -> IgnoreMatcher.simple_glob(padroes)
+"""
+
+from __future__ import annotations
+
+import fnmatch
+import re
+from typing import Callable, Iterable, Optional
+
+FoldFn = Optional[Callable[[str], str]]
+
+
+class IgnoreMatcher:
+    """Responde se um nome de arquivo/pasta casa com algum padrão."""
+
+    __slots__ = ("patterns", "_literals", "_literal_fold", "_regex", "_regex_fold")
+
+    def __init__(self, patterns, literals, literal_fold: FoldFn, regex, regex_fold: FoldFn):
+        self.patterns = tuple(patterns)
+        self._literals = frozenset(literals)
+        self._literal_fold = literal_fold
+        self._regex = regex
+        self._regex_fold = regex_fold
+
+    @classmethod
+    def fnmatch(cls, patterns: Iterable[str], fold: FoldFn = None) -> "IgnoreMatcher":
+        """Semântica de fnmatch: '*', '?' e '[seq]'; `fold` normaliza nome e padrão."""
+        patterns = tuple(patterns)
+        literals = []
+        wildcards = []
+        for pattern in patterns:
+            folded = fold(pattern) if fold else pattern
+            if any(c in folded for c in "*?["):
+                wildcards.append(fnmatch.translate(folded))
+            else:
+                literals.append(folded)
+        return cls(patterns, literals, fold, _combine(wildcards, 0), fold)
+
+    @classmethod
+    def simple_glob(cls, patterns: Iterable[str]) -> "IgnoreMatcher":
+        """Semântica do fnMatch do JS: curinga apenas se houver '*'."""
+        patterns = tuple(patterns)
+        literals = []
+        wildcards = []
+        for pattern in patterns:
+            if "*" in pattern:
+                esc = re.escape(pattern)
+                wildcards.append(esc.replace(r"\*", ".*").replace(r"\?", "."))
+            else:
+                literals.append(pattern)
+        return cls(patterns, literals, None, _combine(wildcards, re.IGNORECASE), None)
+
+    def matches(self, name: str) -> bool:
+        key = self._literal_fold(name) if self._literal_fold else name
+        if key in self._literals:
+            return True
+        if self._regex is None:
+            return False
+        if self._regex_fold is not self._literal_fold:
+            key = self._regex_fold(name) if self._regex_fold else name
+        return self._regex.fullmatch(key) is not None
+
+    __call__ = matches
+
+    def __bool__(self) -> bool:
+        return bool(self.patterns)
+
+    def __repr__(self) -> str:
+        return f"IgnoreMatcher({list(self.patterns)!r})"
+
+
+def _combine(regexes, flags):
+    if not regexes:
+        return None
+    return re.compile("|".join(f"(?:{r})" for r in regexes), flags)
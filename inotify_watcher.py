@@ -0,0 +1,311 @@
+"""Observador inotify (Linux, via ctypes sobre a libc) para manter a lista viva.
+
+Depois da varredura, a árvore é observada recursivamente e cada criação,
+remoção ou renomeação vira um delta aplicado ao índice em memória, sem nova
+varredura. Rajadas de eventos (git checkout, build) são agrupadas: o callback
+só é chamado quando a árvore fica quieta por `quiet` segundos ou quando o lote
+pendente atinge `max_delay` segundos.
+
+Em outras plataformas (ou sem inotify na libc) `InotifyWatcher.available()`
+retorna False e nada é observado. Nenhuma dependência externa é necessária.
+"""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Callable
+
+from walker import IgnoreFn, join_rel
+
+IN_MODIFY = 0x00000002
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO
+              | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+
+_EVENT = struct.Struct("iIII")
+
+# on_changes(arquivos_adicionados, arquivos_removidos, pastas_removidas)
+# Todos são conjuntos de caminhos absolutos (como os de walker.FileEntry.abs_path).
+ChangesFn = Callable[[set, set, set], None]
+
+_libc = None
+
+
+def _load_libc():
+    global _libc
+    if _libc is None:
+        lib = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        lib.inotify_init1.argtypes = [ctypes.c_int]
+        lib.inotify_init1.restype = ctypes.c_int
+        lib.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        lib.inotify_add_watch.restype = ctypes.c_int
+        lib.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        lib.inotify_rm_watch.restype = ctypes.c_int
+        _libc = lib
+    return _libc
+
+
+class InotifyWatcher:
+    """Observa `root` recursivamente e entrega deltas agrupados em `on_changes`.
+
+    `ignore` é o mesmo filtro do walker: pastas recusadas não são observadas e
+    itens recusados não geram eventos. `on_overflow()` é chamado quando o
+    kernel descarta eventos (fila cheia) ou a raiz some — o chamador deve
+    fazer uma varredura completa. Os callbacks rodam na thread do observador.
+    """
+
+    def __init__(self, root, on_changes: ChangesFn, ignore: IgnoreFn | None = None,
+                 on_overflow: Callable[[], None] | None = None,
+                 quiet: float = 0.2, max_delay: float = 1.0):
+        self.root = os.path.abspath(os.fspath(root))
+        self.on_changes = on_changes
+        self.ignore = ignore
+        self.on_overflow = on_overflow
+        self.quiet = quiet
+        self.max_delay = max_delay
+        self.watch_limit_reached = False
+        self._fd = -1
+        self._wd_to_rel: dict = {}
+        self._rel_to_wd: dict = {}
+        self._stop = threading.Event()
+        self._thread = None
+        self._reset_batch()
+
+    @staticmethod
+    def available() -> bool:
+        if not sys.platform.startswith("linux"):
+            return False
+        try:
+            return hasattr(_load_libc(), "inotify_init1")
+        except OSError:
+            return False
+
+    # ------------------------------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        libc = _load_libc()
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self._fd = fd
+        self._thread = threading.Thread(target=self._run, name="inotify-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Pede o fim do observador sem esperar: a thread fecha o descritor ao sair
+        (no máximo um intervalo de poll depois) e não chama mais os callbacks."""
+        self._stop.set()
+        if self._thread is None and self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    # ------------------------------------------------------------------
+    # Watches
+    # ------------------------------------------------------------------
+
+    def _abs(self, rel):
+        return os.path.join(self.root, *rel.split("/")) if rel else self.root
+
+    def _add_watch(self, rel):
+        if self.watch_limit_reached:
+            return False
+        wd = _load_libc().inotify_add_watch(self._fd, os.fsencode(self._abs(rel)), WATCH_MASK)
+        if wd < 0:
+            if ctypes.get_errno() == errno.ENOSPC:
+                # fs.inotify.max_user_watches esgotado: o resto da árvore fica sem observação
+                self.watch_limit_reached = True
+            return False
+        old = self._wd_to_rel.get(wd)
+        if old is not None and old != rel:
+            self._rel_to_wd.pop(old, None)
+        self._wd_to_rel[wd] = rel
+        self._rel_to_wd[rel] = wd
+        return True
+
+    def _watch_tree(self, rel_dir, collect=None):
+        """Observa `rel_dir` e todas as subpastas aceitas pelo filtro.
+
+        Com `collect`, os arquivos já existentes são adicionados ao lote
+        (pasta criada ou movida para dentro da árvore depois da varredura).
+        """
+        stack = [rel_dir]
+        while stack and not self._stop.is_set():
+            rel = stack.pop()
+            if not self._add_watch(rel):
+                continue
+            try:
+                it = os.scandir(self._abs(rel))
+            except OSError:
+                continue
+            with it:
+                for entry in it:
+                    child = join_rel(rel, entry.name)
+                    try:
+                        is_dir = entry.is_dir()
+                        if self.ignore is not None and self.ignore(entry.name, child, is_dir):
+                            continue
+                        if is_dir:
+                            # Mesma regra do walker: links para pastas não são seguidos
+                            if not entry.is_symlink():
+                                stack.append(child)
+                        elif collect is not None and entry.is_file():
+                            collect(entry.path)
+                    except OSError:
+                        continue
+
+    def _forget_tree(self, rel_dir):
+        prefix = rel_dir + "/"
+        for rel in [r for r in self._rel_to_wd if r == rel_dir or r.startswith(prefix)]:
+            wd = self._rel_to_wd.pop(rel)
+            self._wd_to_rel.pop(wd, None)
+            _load_libc().inotify_rm_watch(self._fd, wd)
+
+    # ------------------------------------------------------------------
+    # Lote de mudanças
+    # ------------------------------------------------------------------
+
+    def _reset_batch(self):
+        self._added = set()
+        self._removed = set()
+        self._removed_dirs = set()
+        self._batch_started = None
+        self._last_event = None
+
+    def _mark_added(self, path):
+        self._removed.discard(path)
+        self._added.add(path)
+
+    def _mark_removed(self, path):
+        if path in self._added:
+            self._added.discard(path)
+        self._removed.add(path)
+
+    def _mark_dir_removed(self, path):
+        prefix = path + os.sep
+        self._added = {p for p in self._added if not p.startswith(prefix)}
+        self._removed = {p for p in self._removed if not p.startswith(prefix)}
+        self._removed_dirs.add(path)
+
+    def _flush(self):
+        if self._stop.is_set():
+            self._reset_batch()
+        elif self._added or self._removed or self._removed_dirs:
+            added, removed, removed_dirs = self._added, self._removed, self._removed_dirs
+            self._reset_batch()
+            self.on_changes(added, removed, removed_dirs)
+        else:
+            self._reset_batch()
+
+    # ------------------------------------------------------------------
+    # Laço de eventos
+    # ------------------------------------------------------------------
+
+    def _run(self):
+        try:
+            self._loop()
+        finally:
+            # Só esta thread usa o descritor: fechá-lo em stop() enquanto ela ainda
+            # lê ou observa pastas abriria espaço para o número ser reutilizado
+            os.close(self._fd)
+            self._fd = -1
+
+    def _loop(self):
+        self._watch_tree("")
+        poller = select.poll()
+        poller.register(self._fd, select.POLLIN)
+        while not self._stop.is_set():
+            pending = self._batch_started is not None
+            timeout = self.quiet if pending else 0.25
+            ready = poller.poll(timeout * 1000)
+            if self._stop.is_set():
+                break
+            if ready:
+                try:
+                    data = os.read(self._fd, 64 * 1024)
+                except BlockingIOError:
+                    data = b""
+                except OSError:
+                    break
+                now = time.monotonic()
+                if data and self._handle_events(data) is False:
+                    break
+                if self._batch_started is None and (self._added or self._removed or self._removed_dirs):
+                    self._batch_started = now
+                self._last_event = now
+            if self._batch_started is not None:
+                now = time.monotonic()
+                if (now - self._last_event >= self.quiet
+                        or now - self._batch_started >= self.max_delay):
+                    self._flush()
+
+    def _handle_events(self, data):
+        offset = 0
+        size = len(data)
+        while offset + _EVENT.size <= size:
+            wd, mask, _cookie, length = _EVENT.unpack_from(data, offset)
+            raw_name = data[offset + _EVENT.size: offset + _EVENT.size + length]
+            offset += _EVENT.size + length
+
+            if mask & IN_Q_OVERFLOW:
+                self._reset_batch()
+                if self.on_overflow is not None and not self._stop.is_set():
+                    self.on_overflow()
+                continue
+            rel_dir = self._wd_to_rel.get(wd)
+            if mask & IN_IGNORED:
+                if rel_dir is not None and self._rel_to_wd.get(rel_dir) == wd:
+                    del self._rel_to_wd[rel_dir]
+                self._wd_to_rel.pop(wd, None)
+                continue
+            if rel_dir is None:
+                continue
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                if rel_dir == "":
+                    # A própria raiz foi removida/movida: só uma nova varredura resolve.
+                    self._reset_batch()
+                    if self.on_overflow is not None and not self._stop.is_set():
+                        self.on_overflow()
+                    return False
+                continue
+
+            name = os.fsdecode(raw_name.rstrip(b"\0"))
+            rel = join_rel(rel_dir, name)
+            is_dir = bool(mask & IN_ISDIR)
+            if self.ignore is not None and self.ignore(name, rel, is_dir):
+                continue
+            path = os.path.join(self._abs(rel_dir), name)
+            if is_dir:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    self._watch_tree(rel, collect=self._mark_added)
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    self._forget_tree(rel)
+                    self._mark_dir_removed(path)
+            elif mask & (IN_CREATE | IN_MOVED_TO):
+                if os.path.isfile(path):
+                    self._mark_added(path)
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                self._mark_removed(path)
+        return True
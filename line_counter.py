@@ -0,0 +1,115 @@
+"""Contagem de linhas em segundo plano, em cache por (caminho, mtime, tamanho).
+
+O contador da seleção mostra o total de linhas dos arquivos marcados e é
+refeito a cada clique. Abrir e ler os arquivos nesse momento trava a janela
+com milhares de arquivos; aqui a interface só consulta o cache em memória
+(`get`, sem tocar no disco) e pede (`request`) a contagem do que falta a uma
+thread de fundo, que confere cada arquivo com um stat, conta só o que é novo
+ou mudou e avisa (`on_counted`) quais caminhos mudaram.
+
+A contagem lê blocos grandes em bytes e usa bytes.count(b"\\n"), sem
+decodificar; uma última linha sem quebra também conta.
+"""
+
+from __future__ import annotations
+
+import os
+import queue
+import threading
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional
+
+CHUNK_SIZE = 1 << 20
+
+
+def count_lines(path, chunk_size: int = CHUNK_SIZE) -> int:
+    """Linhas de `path` (quebras "\\n", mais a última linha sem quebra). OSError se ilegível."""
+    lines = 0
+    last = b"\n"
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            lines += chunk.count(b"\n")
+            last = chunk[-1:]
+    return lines + (last != b"\n")
+
+
+class LineCount(NamedTuple):
+    lines: int
+    size: int
+    mtime_ns: int
+
+
+class LineCounter:
+    """
+    Cache de linhas por arquivo com uma thread de fundo (criada sob demanda).
+    `known_lines(caminho, stat)` pode dar a contagem já conhecida (ex.: a
+    análise profunda) e evitar a leitura; `on_counted(caminhos)` é chamado da
+    thread de fundo, ao esvaziar a fila, com os caminhos cuja contagem mudou.
+    """
+
+    def __init__(self, on_counted: Optional[Callable[[List[str]], None]] = None,
+                 known_lines: Optional[Callable[[str, os.stat_result], Optional[int]]] = None):
+        self.on_counted = on_counted
+        self.known_lines = known_lines
+        self._counts: Dict[str, LineCount] = {}
+        self._queue: "queue.Queue[List[str]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def get(self, path) -> Optional[LineCount]:
+        """Última contagem de `path` (pode estar desatualizada até a revalidação), sem disco."""
+        return self._counts.get(path)
+
+    def request(self, paths: Iterable[str]) -> None:
+        """Revalida `paths` em segundo plano: conta os novos e os que mudaram."""
+        paths = list(paths)
+        if not paths:
+            return
+        self._queue.put(paths)
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        changed = []
+        while True:
+            try:
+                paths = self._queue.get_nowait()
+            except queue.Empty:
+                # Fila vazia: avisa o que mudou e espera um pouco por novos pedidos
+                if changed and self.on_counted is not None:
+                    self.on_counted(changed)
+                changed = []
+                try:
+                    paths = self._queue.get(timeout=1.0)
+                except queue.Empty:
+                    with self._lock:
+                        # Sem nada novo: a thread termina (request cria outra)
+                        if self._queue.empty():
+                            self._thread = None
+                            return
+                    continue
+            for path in paths:
+                if self._count(path):
+                    changed.append(path)
+
+    def _count(self, path) -> bool:
+        """Atualiza a contagem de `path`; True se ela mudou."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return self._counts.pop(path, None) is not None
+        old = self._counts.get(path)
+        if old is not None and old.size == st.st_size and old.mtime_ns == st.st_mtime_ns:
+            return False
+        lines = self.known_lines(path, st) if self.known_lines is not None else None
+        if lines is None:
+            try:
+                lines = count_lines(path)
+            except OSError:
+                return self._counts.pop(path, None) is not None
+        self._counts[path] = LineCount(lines, st.st_size, st.st_mtime_ns)
+        return old is None or old.lines != lines
@@ -0,0 +1,113 @@
+"""Índice de linhas sobre um arquivo de saída mapeado em memória (mmap).
+
+Usado pelo visualizador da saída: em vez de carregar dezenas de MB em um
+widget de texto, só as linhas visíveis são decodificadas. O índice é esparso:
+para cada bloco de CHUNK_SIZE bytes guarda quantas quebras de linha vêm antes
+dele (uma contagem em C, sem laço por linha). Achar o início de uma linha é
+uma busca binária nesses blocos mais algumas buscas por '\\n' dentro de um só
+bloco; o custo não depende do tamanho do arquivo.
+
+`find_blocks` localiza os cabeçalhos "Conteúdo de ..." dos arquivos, para a
+navegação direto ao início de cada arquivo.
+"""
+
+from __future__ import annotations
+
+import mmap
+import re
+from bisect import bisect_left
+from typing import List, NamedTuple
+
+CHUNK_SIZE = 64 * 1024
+
+_SEP = b"=" * 42 + b"\n"
+# Depois do encoding podem vir marcas como "[trecho 2]" ou "[igual a: ...]"
+_HEADER_RE = re.compile(r"Conteúdo de (.*?)(?: \(caminho: (.*)\) \[enc: [^\]]*\](?: \[[^\]]*\])*)?:$")
+
+
+class BlockHeader(NamedTuple):
+    line: int       # linha (0-based) do separador que abre o bloco
+    name: str
+    path: str       # caminho do cabeçalho, ou o nome quando não há caminho
+
+
+class LineIndex:
+    """Linhas de um arquivo UTF-8, lidas sob demanda via mmap. Só leitura."""
+
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        size = self._file.seek(0, 2)
+        # mmap não aceita arquivo vazio
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self.size = size
+        # _before[k]: quebras de linha antes do byte k * CHUNK_SIZE
+        before = [0]
+        total = 0
+        mm = self._mm
+        for start in range(0, size, CHUNK_SIZE):
+            total += mm[start:start + CHUNK_SIZE].count(b"\n")
+            before.append(total)
+        self._before = before
+        self.newlines = total
+        ends_open = size and mm[size - 1:size] != b"\n"
+        self.line_count = total + (1 if ends_open else 0)
+
+    def close(self):
+        if isinstance(self._mm, mmap.mmap):
+            self._mm.close()
+        self._file.close()
+
+    def line_offset(self, line: int) -> int:
+        """Byte em que a linha `line` (0-based) começa; `size` além da última."""
+        if line <= 0:
+            return 0
+        if line > self.newlines:
+            return self.size
+        # Bloco que contém a `line`-ésima quebra de linha
+        k = bisect_left(self._before, line) - 1
+        pos = k * CHUNK_SIZE
+        find = self._mm.find
+        for _ in range(line - self._before[k]):
+            pos = find(b"\n", pos) + 1
+        return pos
+
+    def line_of(self, offset: int) -> int:
+        """Linha (0-based) que contém o byte `offset`."""
+        k = min(offset // CHUNK_SIZE, len(self._before) - 1)
+        start = k * CHUNK_SIZE
+        return self._before[k] + self._mm[start:offset].count(b"\n")
+
+    def lines(self, start: int, count: int) -> List[str]:
+        """Até `count` linhas a partir de `start`, decodificadas, sem o '\\n'."""
+        end_line = min(start + count, self.line_count)
+        if start >= end_line:
+            return []
+        begin = self.line_offset(start)
+        end = self.line_offset(end_line)
+        text = self._mm[begin:end].decode("utf-8", errors="replace")
+        if text.endswith("\n"):
+            text = text[:-1]
+        return text.split("\n")
+
+    def find_blocks(self) -> List[BlockHeader]:
+        """Cabeçalhos dos blocos de arquivo ("=" * 42, "Conteúdo de ...", "=" * 42)."""
+        headers = []
+        mm = self._mm
+        marker = _SEP + "Conteúdo de ".encode("utf-8")
+        pos = mm.find(marker)
+        while pos >= 0:
+            line_start = pos + len(_SEP)
+            line_end = mm.find(b"\n", line_start)
+            at_line_start = pos == 0 or mm[pos - 1:pos] == b"\n"
+            if (at_line_start and line_end >= 0
+                    and mm[line_end + 1:line_end + 1 + len(_SEP)] == _SEP):
+                text = mm[line_start:line_end].decode("utf-8", errors="replace")
+                match = _HEADER_RE.match(text)
+                if match:
+                    name, path = match.group(1), match.group(2)
+                    headers.append(BlockHeader(self.line_of(pos), name, path or name))
+                pos = line_end
+            else:
+                pos = line_start
+            pos = mm.find(marker, pos)
+        return headers
@@ -0,0 +1,237 @@
+"""Formatos da saída: texto (blocos "=" * 42), Markdown, XML e JSONL.
+
+Cada formato diz só o que vai em volta do conteúdo de um arquivo (cabeçalho
+e rodapé do bloco), o que vai no começo e no fim da saída e, no JSONL, como
+o conteúdo é escapado. Leitura, escrita, partes, índice e deduplicação são os
+mesmos para todos: os writers recebem cabeçalho e rodapé prontos.
+
+- texto: o formato de sempre, restaurável por restore_codefilecopier;
+- markdown: "### caminho" e um bloco cercado com a linguagem da extensão; a
+  cerca é maior que qualquer sequência de crases do conteúdo, por isso o
+  arquivo é lido (não há cópia direta de bytes);
+- xml: <document path="..." encoding="...">, com o conteúdo como está (sem
+  escapar, como nos prompts com documentos), dentro de <documents>;
+- jsonl: um objeto por linha {"path", "name", "encoding", "content"}; o
+  conteúdo é escapado, então não há cópia direta, trechos nem índice.
+
+Os deslocamentos do índice (bundle_index) apontam para o conteúdo cru dentro
+de cada bloco, então bundles em Markdown e XML com índice também restauram.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+from typing import Dict, Iterable, Iterator, NamedTuple, Optional
+from xml.sax.saxutils import escape
+
+SEP = "=" * 42
+DEFAULT_FORMAT = "texto"
+
+# Linguagem do bloco Markdown pela extensão; as demais usam a própria extensão
+LANGUAGES = {
+    ".py": "python", ".pyw": "python", ".pyi": "python", ".js": "javascript",
+    ".mjs": "javascript", ".cjs": "javascript", ".ts": "typescript", ".tsx": "tsx",
+    ".jsx": "jsx", ".json": "json", ".md": "markdown", ".html": "html", ".htm": "html",
+    ".css": "css", ".scss": "scss", ".sh": "bash", ".bash": "bash", ".zsh": "zsh",
+    ".yml": "yaml", ".yaml": "yaml", ".toml": "toml", ".ini": "ini", ".cfg": "ini",
+    ".c": "c", ".h": "c", ".cc": "cpp", ".cpp": "cpp", ".hpp": "cpp", ".cs": "csharp",
+    ".java": "java", ".kt": "kotlin", ".go": "go", ".rs": "rust", ".rb": "ruby",
+    ".php": "php", ".sql": "sql", ".xml": "xml", ".swift": "swift", ".lua": "lua",
+    ".ps1": "powershell", ".bat": "batch", ".vue": "vue", ".txt": "text",
+}
+
+_FENCE_RE = re.compile(r"`{3,}")
+
+
+def language_for(name: str) -> str:
+    """Linguagem do bloco Markdown para o arquivo `name` ("" se não há extensão)."""
+    stem, ext = os.path.splitext(name)
+    if not ext:
+        return stem.lower() if stem in ("Makefile", "Dockerfile") else ""
+    return LANGUAGES.get(ext.lower(), ext[1:].lower())
+
+
+class BlockFrame(NamedTuple):
+    """
+    Moldura do bloco de um arquivo no formato `format`. É uma tupla simples
+    para atravessar processos (opção jobs) junto com o bloco.
+    """
+
+    format: str
+    name: str
+    rel_path: Optional[str]
+    enc: Optional[str]
+    fence: str = ""     # Markdown: cerca escolhida para o conteúdo
+
+    @property
+    def output_format(self) -> "OutputFormat":
+        return FORMATS[self.format]
+
+    @property
+    def head(self) -> str:
+        return self.output_format.head(self)
+
+    @property
+    def tail(self) -> str:
+        return self.output_format.tail(self)
+
+    def piece_head(self, piece: int) -> str:
+        return self.output_format.head(self, piece=piece)
+
+    def ref_head(self, ref: str) -> str:
+        return self.output_format.head(self, ref=ref)
+
+    @property
+    def pieces(self):
+        """piece_head para os writers, ou None se o formato não corta arquivos."""
+        return self.piece_head if self.output_format.splittable else None
+
+
+class OutputFormat:
+    """Formato texto; os outros sobrescrevem cabeçalho, rodapé e começo/fim da saída."""
+
+    key = DEFAULT_FORMAT
+    label = "Texto"
+    extension = ".txt"
+    passthrough = True      # o conteúdo vai como está: bytes copiados direto do arquivo
+    splittable = True       # arquivo maior que uma parte pode ser cortado em trechos
+    indexable = True        # aceita o índice de bundle_index no fim
+
+    def frame(self, name: str, rel_path: Optional[str], enc: Optional[str],
+              content: Optional[str] = None) -> BlockFrame:
+        """Moldura do bloco; `content` só é preciso nos formatos sem passthrough."""
+        return BlockFrame(self.key, name, rel_path, enc)
+
+    def head(self, frame: BlockFrame, piece: Optional[int] = None,
+             ref: Optional[str] = None) -> str:
+        where = f" (caminho: {frame.rel_path})" if frame.rel_path is not None else ""
+        label = f" [enc: {frame.enc}]" if frame.enc is not None else ""
+        if piece is not None:
+            label += f" [trecho {piece}]"
+        if ref is not None:
+            label += f" [igual a: {ref}]"
+        return f"{SEP}\nConteúdo de {frame.name}{where}{label}:\n{SEP}\n"
+
+    def tail(self, frame: BlockFrame) -> str:
+        # Começa com "\n": nos trechos, a quebra de linha do corte fica no rodapé
+        return "\n\n"
+
+    def body(self, content: str) -> str:
+        return content
+
+    def block(self, frame: BlockFrame, content: str) -> str:
+        return self.head(frame) + self.body(content) + self.tail(frame)
+
+    def header(self, text: str) -> str:
+        """O que vai no começo da saída, a partir do cabeçalho de metadados `text`."""
+        return text
+
+    def footer(self, title: str, lines: Iterable[str]) -> Iterator[str]:
+        """Fim da saída: seção `title` (ex.: "Estrutura de pastas:") com `lines`."""
+        yield f"\n{SEP}\n{title}\n{SEP}\n"
+        yield from lines
+
+
+class MarkdownFormat(OutputFormat):
+    key = "markdown"
+    label = "Markdown"
+    extension = ".md"
+    passthrough = False
+
+    def frame(self, name, rel_path, enc, content=None):
+        fence = "```"
+        if content is not None and fence in content:
+            fence = "`" * (max(len(run) for run in _FENCE_RE.findall(content)) + 1)
+        return BlockFrame(self.key, name, rel_path, enc, fence)
+
+    def head(self, frame, piece=None, ref=None):
+        title = frame.rel_path if frame.rel_path is not None else frame.name
+        if piece is not None:
+            title += f" (trecho {piece})"
+        fence = frame.fence or "```"
+        if ref is not None:
+            return f"### {title}\n\n{fence}\n(igual a {ref})"
+        return f"### {title}\n\n{fence}{language_for(frame.name)}\n"
+
+    def tail(self, frame):
+        return f"\n{frame.fence or '```'}\n\n"
+
+    def footer(self, title, lines):
+        yield f"\n## {title.rstrip(':')}\n\n```text\n"
+        yield from lines
+        yield "```\n"
+
+
+def _attr(value: str) -> str:
+    return escape(value, {'"': "&quot;"})
+
+
+class XmlFormat(OutputFormat):
+    key = "xml"
+    label = "XML (<document>)"
+    extension = ".xml"
+
+    def head(self, frame, piece=None, ref=None):
+        attrs = f' path="{_attr(frame.rel_path if frame.rel_path is not None else frame.name)}"'
+        if frame.enc is not None:
+            attrs += f' encoding="{_attr(frame.enc)}"'
+        if piece is not None:
+            attrs += f' piece="{piece}"'
+        if ref is not None:
+            attrs += f' same_as="{_attr(ref)}"'
+        return f"<document{attrs}>\n"
+
+    def tail(self, frame):
+        return "\n</document>\n"
+
+    def header(self, text):
+        return text + "<documents>\n"
+
+    def footer(self, title, lines):
+        yield f'</documents>\n\n<folder_tree title="{_attr(title.rstrip(":"))}">\n'
+        yield from lines
+        yield "</folder_tree>\n"
+
+
+class JsonlFormat(OutputFormat):
+    key = "jsonl"
+    label = "JSONL"
+    extension = ".jsonl"
+    passthrough = False
+    splittable = False
+    indexable = False
+
+    def head(self, frame, piece=None, ref=None):
+        fields = {"path": frame.rel_path if frame.rel_path is not None else frame.name,
+                  "name": frame.name}
+        if frame.enc is not None:
+            fields["encoding"] = frame.enc
+        obj = json.dumps(fields, ensure_ascii=False)[:-1]
+        if ref is not None:
+            return f'{obj}, "same_as": {json.dumps(ref, ensure_ascii=False)}'
+        return f'{obj}, "content": '
+
+    def tail(self, frame):
+        return "}\n"
+
+    def body(self, content):
+        return json.dumps(content, ensure_ascii=False)
+
+    def header(self, text):
+        # Cada linha da saída é um objeto: sem cabeçalho de metadados nem árvore
+        return ""
+
+    def footer(self, title, lines):
+        return iter(())
+
+
+FORMATS: Dict[str, OutputFormat] = {
+    fmt.key: fmt for fmt in (OutputFormat(), MarkdownFormat(), XmlFormat(), JsonlFormat())
+}
+
+
+def get_format(key: Optional[str]) -> OutputFormat:
+    """Formato pela chave (config/CLI); desconhecido ou None = texto."""
+    return FORMATS.get(key or DEFAULT_FORMAT, FORMATS[DEFAULT_FORMAT])
@@ -0,0 +1,180 @@
+"""Cópia direta de arquivos UTF-8 para a saída, sem decodificar para str.
+
+A maior parte dos arquivos de código já está em UTF-8, exatamente como será
+gravada no codigo_completo.txt. Para esses, decodificar para str, concatenar
+com o cabeçalho e codificar de novo só gasta CPU e memória. Aqui o arquivo é
+validado em blocos (sem montar o texto inteiro) e, se servir, os bytes são
+copiados pelo kernel com os.copy_file_range/os.sendfile direto para o arquivo
+de saída; o cabeçalho e o rodapé do bloco são escritos em volta. Saídas sem
+descritor próprio (compactadas) recebem os mesmos bytes pelo buffer.
+
+Só arquivos que precisam de conversão (outro encoding, quebras de linha a
+normalizar) passam pelo caminho de decodificação de cada módulo.
+"""
+
+from __future__ import annotations
+
+import codecs
+import os
+import zlib
+from typing import NamedTuple, Optional
+
+CHUNK_SIZE = 1 << 20
+BOM = codecs.BOM_UTF8
+
+
+class Utf8Span(NamedTuple):
+    """Trecho de um arquivo que pode ser copiado sem conversão."""
+
+    offset: int     # 3 quando o BOM é descartado
+    length: int
+    size: int       # tamanho do arquivo na validação
+    mtime_ns: int
+    chars: int      # caracteres do trecho (o que len() daria no texto)
+    crc32: int = 0  # dos bytes do trecho (índice do bundle, bundle_index)
+
+
+class PassthroughBlock(NamedTuple):
+    """Bloco de saída cujo conteúdo é copiado direto do arquivo de origem."""
+
+    head: str
+    path: str
+    span: Utf8Span
+    tail: str
+
+
+def utf8_span(path, *, strip_bom: bool = False, reject_cr: bool = False,
+              nul_window: Optional[int] = None) -> Optional[Utf8Span]:
+    """Valida `path` como UTF-8 em blocos; None se precisar de decodificação.
+
+    `strip_bom`: o BOM inicial fica fora do trecho (semântica de utf-8-sig).
+    `reject_cr`: recusa arquivos com '\\r' (quem normaliza quebras de linha).
+    `nul_window`: recusa NUL nos primeiros N bytes (None = em qualquer posição,
+    0 = aceita NUL).
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")("strict")
+    offset = 0
+    seen = 0
+    chars = 0
+    crc = 0
+    with open(path, "rb") as f:
+        st = os.fstat(f.fileno())
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            if seen == 0 and strip_bom and chunk.startswith(BOM):
+                offset = len(BOM)
+                crc = zlib.crc32(memoryview(chunk)[offset:])
+            else:
+                crc = zlib.crc32(chunk, crc)
+            if nul_window is None:
+                if b"\0" in chunk:
+                    return None
+            elif seen < nul_window and b"\0" in chunk[:nul_window - seen]:
+                return None
+            if reject_cr and b"\r" in chunk:
+                return None
+            seen += len(chunk)
+            # ASCII puro é UTF-8 válido; só decodifica (e descarta) o resto
+            if chunk.isascii() and not decoder.getstate()[0]:
+                chars += len(chunk)
+            else:
+                try:
+                    chars += len(decoder.decode(chunk))
+                except UnicodeDecodeError:
+                    return None
+    try:
+        decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        return None
+    if offset:
+        chars -= 1  # o BOM
+    return Utf8Span(offset, seen - offset, seen, st.st_mtime_ns, chars, crc)
+
+
+def write_block(out, block: PassthroughBlock) -> bool:
+    """Escreve cabeçalho, bytes do arquivo e rodapé em `out` (arquivo aberto para escrita).
+
+    Retorna False, sem escrever nada, se o arquivo mudou ou sumiu desde a
+    validação — o chamador volta ao caminho com decodificação.
+    """
+    span = block.span
+    try:
+        src = open(block.path, "rb")
+    except OSError:
+        return False
+    with src:
+        st = os.fstat(src.fileno())
+        if st.st_size != span.size or st.st_mtime_ns != span.mtime_ns:
+            return False
+        out.write(block.head)
+        out.flush()
+        try:
+            out_fd = out.fileno()
+        except (OSError, ValueError):
+            out_fd = None   # saída sem descritor próprio (ex.: compactada): cópia pelo buffer
+        if out_fd is None:
+            _copy_to_buffer(src, out.buffer, span.offset, span.length)
+        else:
+            _copy(src, out_fd, span.offset, span.length)
+    out.write(block.tail)
+    return True
+
+
+def _copy(src, out_fd, offset, remaining):
+    """Copia `remaining` bytes de `src` a partir de `offset` para a posição atual de `out_fd`."""
+    src_fd = src.fileno()
+    for copy in (_copy_file_range, _sendfile):
+        if remaining > 0:
+            offset, remaining = copy(src_fd, out_fd, offset, remaining)
+    src.seek(offset)
+    while remaining > 0:
+        data = src.read(min(CHUNK_SIZE, remaining))
+        if not data:
+            break
+        view = memoryview(data)
+        while view:
+            view = view[os.write(out_fd, view):]
+        remaining -= len(data)
+
+
+def _copy_to_buffer(src, buffer, offset, remaining):
+    src.seek(offset)
+    while remaining > 0:
+        data = src.read(min(CHUNK_SIZE, remaining))
+        if not data:
+            break
+        buffer.write(data)
+        remaining -= len(data)
+
+
+# Cada cópia pelo kernel para no primeiro erro (kernel ou sistema de arquivos
+# sem suporte, EXDEV...) e devolve o progresso; o resto segue pelo próximo meio.
+
+def _copy_file_range(src_fd, out_fd, offset, remaining):
+    copy_file_range = getattr(os, "copy_file_range", None)
+    try:
+        while copy_file_range is not None and remaining > 0:
+            copied = copy_file_range(src_fd, out_fd, remaining, offset)
+            if copied == 0:
+                break
+            offset += copied
+            remaining -= copied
+    except OSError:
+        pass
+    return offset, remaining
+
+
+def _sendfile(src_fd, out_fd, offset, remaining):
+    sendfile = getattr(os, "sendfile", None)
+    try:
+        while sendfile is not None and remaining > 0:
+            sent = sendfile(out_fd, src_fd, offset, remaining)
+            if sent == 0:
+                break
+            offset += sent
+            remaining -= sent
+    except OSError:
+        pass
+    return offset, remaining
@@ -0,0 +1,82 @@
+"""Leitura antecipada em paralelo, entregue na ordem original.
+
+A geração da saída lê e decodifica os arquivos um a um; com o cache frio cada
+leitura espera o disco. Aqui um pool de threads já busca os próximos arquivos
+enquanto o escritor consome o atual, e os resultados saem exatamente na ordem
+da lista de entrada — a saída é idêntica à da leitura sequencial.
+
+A memória fica limitada por um orçamento de bytes em voo: um item só é
+enviado ao pool se a soma dos tamanhos (estimados por `size_of`) dos itens
+ainda não consumidos couber em `max_bytes`. Um item maior que o orçamento
+inteiro é lido sozinho, para nunca travar.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Quem espera é o disco, não a CPU: o número de threads não depende dos núcleos.
+DEFAULT_WORKERS = 16
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+_MISSING = object()
+
+
+def file_size(path) -> int:
+    """`size_of` padrão para caminhos: tamanho em disco (0 se o stat falhar)."""
+    try:
+        return os.stat(path).st_size
+    except OSError:
+        return 0
+
+
+def ordered_map(fn: Callable[[T], R], items: Iterable[T], *,
+                workers: Optional[int] = None, max_bytes: int = DEFAULT_MAX_BYTES,
+                size_of: Optional[Callable[[T], int]] = None,
+                cancel_event: Optional[threading.Event] = None) -> Iterator[Tuple[T, R]]:
+    """Aplica `fn` aos itens em paralelo e gera (item, resultado) na ordem de `items`.
+
+    Exceções de `fn` são repassadas ao consumidor quando o item é alcançado.
+    Interromper a iteração (ou sinalizar `cancel_event`) descarta o que está
+    na fila e não envia mais nada ao pool.
+    """
+    workers = workers or DEFAULT_WORKERS
+    max_items = workers * 4
+    source = iter(items)
+    pending: deque = deque()     # (item, future, custo reservado)
+    in_flight = 0
+    nxt = _MISSING
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="read-ahead")
+    try:
+        while True:
+            # Completa a janela enquanto houver orçamento (ou nada em voo)
+            while len(pending) < max_items:
+                if cancel_event is not None and cancel_event.is_set():
+                    break
+                if nxt is _MISSING:
+                    nxt = next(source, _MISSING)
+                    if nxt is _MISSING:
+                        break
+                cost = size_of(nxt) if size_of is not None else 0
+                if pending and in_flight + cost > max_bytes:
+                    break
+                pending.append((nxt, pool.submit(fn, nxt), cost))
+                in_flight += cost
+                nxt = _MISSING
+            if not pending:
+                return
+            item, future, cost = pending.popleft()
+            result = future.result()
+            in_flight -= cost
+            yield item, result
+    finally:
+        for _item, future, _cost in pending:
+            future.cancel()
+        pool.shutdown(wait=False)
@@ -1,26 +1,96 @@
+import io
+import os
 import re
 import sys
 from pathlib import Path
 
+from bundle_index import read_entry, read_index
+from compressed_output import open_input
+
 SEP = '=' * 42
 
 # Casa cada bloco de arquivo procurando diretamente pelo próximo cabeçalho real
 # (ou pelo marcador de fim "Estrutura de pastas:") em vez de usar lookahead
 # não-guloso sobre [\s\S], que falha (corta no 1º \n) quando o conteúdo do
-# arquivo tem múltiplas linhas.
+# arquivo tem múltiplas linhas. "[trecho N]" marca um pedaço de um arquivo
+# maior que uma parte (saída dividida, ver shard_writer): os trechos vêm em
+# ordem e são juntados. "[igual a: X]" marca um arquivo deduplicado: o bloco
+# não tem conteúdo e o arquivo recebe o da primeira ocorrência, X.
 HEADER_RE = re.compile(
     re.escape(SEP) + r'\n'
-    r'Conteúdo de (?P<name>.+?) \(caminho: (?P<rel>.+?)\) \[enc: utf-8\]:\n'
+    r'Conteúdo de (?P<name>.+?) \(caminho: (?P<rel>.+?)\) \[enc: utf-8\]'
+    r'(?: \[trecho (?P<piece>\d+)\])?'
+    r'(?: \[igual a: (?P<ref>.+?)\])?:\n'
     + re.escape(SEP) + r'\n'
 )
 
 FOOTER_MARKER = '\n' + SEP + '\nEstrutura de pastas:\n'
 
+# <stem>.partNN<extensão>[.gz|.xz], como shard_writer nomeia as partes
+PART_RE = re.compile(r'(?P<stem>.+)\.part(?P<n>\d+)(?P<ext>\.[^.]+(?:\.gz|\.xz)?)')
 
-def restore_codefilecopier(txt_path, out_dir, verbose=True):
-    raw = Path(txt_path).read_bytes()
-    text = raw.decode('utf-8').replace('\r\n', '\n')
 
+def part_paths(path):
+    """Todas as partes do conjunto de `path`, em ordem; só [path] se não é uma parte."""
+    path = Path(path)
+    m = PART_RE.fullmatch(path.name)
+    if not m:
+        return [path]
+    parts = []
+    for sibling in path.parent.iterdir():
+        s = PART_RE.fullmatch(sibling.name)
+        if s and s.group('stem') == m.group('stem') and s.group('ext') == m.group('ext'):
+            parts.append((int(s.group('n')), sibling))
+    return [p for _n, p in sorted(parts)]
+
+
+class _Block:
+    """Um bloco lido da saída. `piece`: número do trecho (cabeçalho), None se é o
+    arquivo inteiro, 0 se veio do índice (trechos do índice são entradas seguidas
+    do mesmo caminho). `cut`: falta a quebra de linha do corte no fim do conteúdo."""
+
+    __slots__ = ('rel', 'content', 'piece', 'ref', 'cut')
+
+    def __init__(self, rel, content, piece=None, ref=None, cut=False):
+        self.rel = rel
+        self.content = content
+        self.piece = piece
+        self.ref = ref
+        self.cut = cut
+
+    def continues(self, prev):
+        """Este bloco é o próximo trecho do arquivo de `prev`."""
+        if prev is None or prev.rel != self.rel or prev.ref or self.ref:
+            return False
+        return bool(self.piece and self.piece > 1) or (self.piece == 0 and prev.piece is not None)
+
+
+def _write_restored(out, rel, content, warnings, seen_paths):
+    """Grava um arquivo restaurado; False se o caminho foi recusado."""
+    # Sanidade: caminho relativo não pode escapar da pasta de destino
+    target = (out / rel).resolve()
+    if not str(target).startswith(str(out.resolve())):
+        warnings.append(f"[IGNORADO - caminho suspeito] {rel}")
+        return False
+
+    if rel in seen_paths:
+        warnings.append(f"[AVISO - caminho duplicado, sobrescrito] {rel}")
+    seen_paths.add(rel)
+
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.write_text(content, encoding='utf-8', newline='\n')
+    return True
+
+
+def _blocks_from_index(f, entries):
+    """Blocos pelo índice do fim do arquivo (bundle_index): vai direto a cada
+    conteúdo, sem procurar cabeçalhos. ValueError se algum crc32 não bate."""
+    return [_Block(e.path, read_entry(f, e).decode('utf-8').replace('\r\n', '\n'), piece=0)
+            for e in entries]
+
+
+def _blocks_from_headers(text, source, warnings):
+    """Blocos pelos cabeçalhos; ValueError se não há nenhum."""
     # Delimita o fim da seção de conteúdo de arquivos (antes da árvore final),
     # se o marcador existir. Se não existir, processa o texto inteiro.
     footer_idx = text.find(FOOTER_MARKER)
@@ -29,21 +99,14 @@ def restore_codefilecopier(txt_path, out_dir, verbose=True):
     matches = list(HEADER_RE.finditer(body))
     if not matches:
         raise ValueError(
-            "Nenhum cabeçalho de arquivo encontrado. O .txt não está no "
-            "formato esperado do Copiador de Código v2.0."
+            f"Nenhum cabeçalho de arquivo encontrado em {source}. O .txt não está "
+            "no formato esperado do Copiador de Código v2.0."
         )
+    if footer_idx == -1:
+        warnings.append(f"[AVISO] Marcador 'Estrutura de pastas:' não encontrado em {source}.")
 
-    out = Path(out_dir)
-    out.mkdir(parents=True, exist_ok=True)
-
-    n = 0
-    warnings = []
-    seen_paths = set()
-
+    blocks = []
     for i, m in enumerate(matches):
-        rel = m.group('rel')
-        name = m.group('name')
-
         content_start = m.end()
         content_end = matches[i + 1].start() if i + 1 < len(matches) else len(body)
         content = body[content_start:content_end]
@@ -58,24 +121,86 @@ def restore_codefilecopier(txt_path, out_dir, verbose=True):
         elif content.endswith('\n'):
             content = content[:-1]
 
-        # Sanidade: caminho relativo não pode escapar da pasta de destino
-        target = (out / rel).resolve()
-        if not str(target).startswith(str(out.resolve())):
-            warnings.append(f"[IGNORADO - caminho suspeito] {rel}")
+        piece = int(m.group('piece')) if m.group('piece') else None
+        # Nos trechos, a quebra de linha do corte foi para o rodapé: volta ao juntar
+        blocks.append(_Block(m.group('rel'), content, piece, m.group('ref'), cut=piece is not None))
+    return blocks
+
+
+def _read_blocks(path, warnings):
+    """(blocos de `path`, True se vieram do índice). Índice que não confere: cabeçalhos."""
+    # .txt, .txt.gz ou .txt.xz (detectado pelo conteúdo)
+    with open_input(path) as src:
+        # Compactado: seek para trás descompactaria tudo de novo; lê uma vez só
+        f = src if isinstance(src, io.BufferedReader) else io.BytesIO(src.read())
+        entries = read_index(f)
+        if entries is not None:
+            try:
+                return _blocks_from_index(f, entries), True
+            except ValueError as exc:
+                # Índice não confere com o texto (editado à mão?): usa os cabeçalhos
+                warnings.append(f"[AVISO] {exc}; restaurando pelos cabeçalhos.")
+        f.seek(0)
+        raw = f.read()
+    return _blocks_from_headers(raw.decode('utf-8').replace('\r\n', '\n'), path, warnings), False
+
+
+def _join_pieces(blocks, warnings):
+    """Junta os trechos seguidos de um mesmo arquivo (numa parte ou entre partes)."""
+    files = []
+    prev = None
+    for b in blocks:
+        if b.continues(prev):
+            prev.content += ('\n' if prev.cut else '') + b.content
+            prev.cut = b.cut
+            prev.piece = b.piece
             continue
+        if b.piece and b.piece > 1:
+            warnings.append(f"[AVISO - trechos anteriores ao {b.piece} não encontrados] {b.rel}")
+        files.append(b)
+        prev = b
+    return files
 
-        if rel in seen_paths:
-            warnings.append(f"[AVISO - caminho duplicado, sobrescrito] {rel}")
-        seen_paths.add(rel)
 
-        target.parent.mkdir(parents=True, exist_ok=True)
-        target.write_text(content, encoding='utf-8', newline='\n')
-        n += 1
+def restore_codefilecopier(txt_path, out_dir, verbose=True):
+    """
+    Restaura os arquivos de `txt_path`: um arquivo ou uma lista de partes
+    (saída dividida, em ordem; ver part_paths). Retorna (arquivos, avisos).
+    """
+    paths = [txt_path] if isinstance(txt_path, (str, os.PathLike)) else list(txt_path)
+    warnings = []
+    blocks = []
+    all_indexed = True
+    for path in paths:
+        part_blocks, indexed = _read_blocks(path, warnings)
+        blocks.extend(part_blocks)
+        all_indexed = all_indexed and indexed
+
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+
+    n = 0
+    seen_paths = set()
+    # Conteúdo das primeiras ocorrências que algum bloco deduplicado referencia
+    files = _join_pieces(blocks, warnings)
+    referenced = {b.ref for b in files if b.ref}
+    originals = {}
+
+    for b in files:
+        content = b.content
+        if b.ref:
+            if b.ref not in originals:
+                warnings.append(f"[IGNORADO - referência não encontrada: {b.ref}] {b.rel}")
+                continue
+            content = originals[b.ref]
+        elif b.rel in referenced:
+            originals[b.rel] = content
+
+        if _write_restored(out, b.rel, content, warnings, seen_paths):
+            n += 1
 
     if verbose:
-        print(f"Arquivos restaurados: {n}")
-        if footer_idx == -1:
-            warnings.append("[AVISO] Marcador 'Estrutura de pastas:' não encontrado no .txt.")
+        print(f"Arquivos restaurados{' (pelo índice)' if all_indexed else ''}: {n}")
         for w in warnings:
             print(w)
 
@@ -85,4 +210,5 @@ def restore_codefilecopier(txt_path, out_dir, verbose=True):
 if __name__ == "__main__":
     txt_path = sys.argv[1] if len(sys.argv) > 1 else 'codigo_completo.txt'
     out_dir = sys.argv[2] if len(sys.argv) > 2 else 'projeto_restaurado'
-    restore_codefilecopier(txt_path, out_dir)
+    # Uma parte (<stem>.part01.txt...) restaura o conjunto inteiro
+    restore_codefilecopier(part_paths(txt_path), out_dir)
@@ -0,0 +1,225 @@
+"""Índice persistente de varredura para abrir a mesma pasta de novo sem relistar tudo.
+
+Para cada pasta de entrada é gravado um índice no diretório de cache do
+usuário com, por subpasta: mtime (ns) e inode da pasta e a listagem crua dos
+filhos (nome, tipo, tamanho, mtime, inode). Em uma nova abertura:
+
+  1. `cached_files()` entrega imediatamente a listagem gravada, sem nenhuma
+     chamada ao disco, para a interface mostrar algo na hora;
+  2. `list_directory()` é usado como `lister` do walker para revalidar em
+     segundo plano: só as pastas cujo mtime/inode mudou são relistadas.
+
+Criar, remover ou renomear um arquivo altera o mtime da pasta que o contém;
+editar o conteúdo não. Por isso `revalidate_files=True` refaz o stat dos
+arquivos de pastas inalteradas (sem relistar) quando o tamanho importa.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import pickle
+import stat
+import sys
+import time
+from typing import Iterator
+
+from walker import DirListing, FileEntry, IgnoreFn, join_rel
+
+INDEX_VERSION = 1
+
+# Tipos de item gravados na listagem crua
+KIND_FILE = 0        # arquivo regular com stat
+KIND_FILE_LAZY = 1   # arquivo descartado pelo filtro: stat só se for aceito depois
+KIND_DIR = 2
+KIND_DIR_LINK = 3    # link para pasta (não é seguido, como no os.walk)
+KIND_OTHER = 4       # FIFO, socket, link quebrado...
+
+# Pastas modificadas há menos que isso podem receber novos arquivos ainda no
+# mesmo "tique" do relógio do sistema de arquivos; não confiamos no mtime delas.
+RACY_WINDOW_NS = 2_000_000_000
+
+
+def cache_dir() -> str:
+    """Diretório de cache do usuário (XDG no Linux, LOCALAPPDATA no Windows)."""
+    if sys.platform.startswith("win"):
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    elif sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Caches")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "codefilecopier", "scan_index")
+
+
+def index_path_for(root: str) -> str:
+    key = os.path.normcase(os.path.abspath(root)).encode("utf-8", "surrogateescape")
+    return os.path.join(cache_dir(), hashlib.sha1(key).hexdigest() + ".idx")
+
+
+class ScanIndex:
+    """Listagens de pastas de uma raiz, reaproveitadas entre aberturas."""
+
+    def __init__(self, root, path: str | None = None, revalidate_files: bool = True):
+        self.root = os.path.abspath(os.fspath(root))
+        self.path = path or index_path_for(self.root)
+        self.revalidate_files = revalidate_files
+        # rel_dir -> (mtime_ns, inode, [(nome, tipo, tamanho, mtime, inode)])
+        self._dirs: dict = {}
+        self._seen: set = set()
+        self._dirty = False
+
+    @classmethod
+    def load(cls, root, path: str | None = None, revalidate_files: bool = True) -> "ScanIndex":
+        """Carrega o índice gravado; índice ausente, antigo ou corrompido vira vazio."""
+        index = cls(root, path, revalidate_files)
+        try:
+            with open(index.path, "rb") as f:
+                data = pickle.load(f)
+            if data.get("version") == INDEX_VERSION and data.get("root") == index.root:
+                index._dirs = data["dirs"]
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError,
+                KeyError, TypeError, ValueError):
+            pass
+        return index
+
+    @property
+    def has_data(self) -> bool:
+        return "" in self._dirs
+
+    def save(self) -> None:
+        """Grava o índice de forma atômica, descartando pastas não visitadas na última varredura."""
+        if self._seen:
+            stale = self._dirs.keys() - self._seen
+            if stale:
+                self._dirty = True
+                for rel in stale:
+                    del self._dirs[rel]
+        if not self._dirty:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                pickle.dump({"version": INDEX_VERSION, "root": self.root, "dirs": self._dirs},
+                            f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self.path)
+            self._dirty = False
+        except OSError:
+            pass
+
+    # ------------------------------------------------------------------
+    # Leitura instantânea (sem disco)
+    # ------------------------------------------------------------------
+
+    def cached_files(self, ignore: IgnoreFn | None = None) -> Iterator[FileEntry]:
+        """Gera os arquivos gravados, na mesma ordem do walker, sem tocar no disco.
+
+        Pastas que o filtro atual aceita mas que nunca foram listadas ficam de
+        fora: a revalidação em segundo plano completa o resultado.
+        """
+        stack = [iter([("", self.root)])]
+        while stack:
+            item = next(stack[-1], None)
+            if item is None:
+                stack.pop()
+                continue
+            rel_dir, abs_dir = item
+            cached = self._dirs.get(rel_dir)
+            if cached is None:
+                continue
+            listing = self._to_listing(abs_dir, rel_dir, cached[2], ignore, touch_disk=False)
+            yield from listing.files
+            if listing.subdirs:
+                stack.append(iter([(rel, abs_path) for _n, abs_path, rel in listing.subdirs]))
+
+    # ------------------------------------------------------------------
+    # Revalidação (lister para walker.walk_files)
+    # ------------------------------------------------------------------
+
+    def list_directory(self, abs_dir: str, rel_dir: str, ignore: IgnoreFn | None = None,
+                       with_stat: bool = True) -> DirListing:
+        """Equivalente a walker.list_directory que só relista pastas modificadas."""
+        self._seen.add(rel_dir)
+        try:
+            st = os.stat(abs_dir)
+        except OSError:
+            return DirListing([], [], [])
+        cached = self._dirs.get(rel_dir)
+        if cached is not None and cached[0] == st.st_mtime_ns and cached[1] == st.st_ino:
+            entries = cached[2]
+            if self.revalidate_files:
+                self._restat_files(abs_dir, entries)
+        else:
+            entries = self._read_raw(abs_dir, rel_dir, ignore)
+            racy = time.time_ns() - st.st_mtime_ns < RACY_WINDOW_NS
+            self._dirs[rel_dir] = (-1 if racy else st.st_mtime_ns, st.st_ino, entries)
+            self._dirty = True
+        return self._to_listing(abs_dir, rel_dir, entries, ignore, touch_disk=True)
+
+    def _read_raw(self, abs_dir, rel_dir, ignore):
+        entries = []
+        try:
+            it = os.scandir(abs_dir)
+        except OSError:
+            return entries
+        with it:
+            for entry in it:
+                name = entry.name
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if is_dir:
+                    try:
+                        kind = KIND_DIR_LINK if entry.is_symlink() else KIND_DIR
+                    except OSError:
+                        kind = KIND_DIR_LINK
+                    entries.append((name, kind, None, None, None))
+                    continue
+                # Arquivos recusados pelo filtro atual não pagam o stat agora.
+                if ignore is not None and ignore(name, join_rel(rel_dir, name), False):
+                    entries.append((name, KIND_FILE_LAZY, None, None, None))
+                    continue
+                entries.append(_stat_entry(entry.path, name, entry))
+        return entries
+
+    def _restat_files(self, abs_dir, entries):
+        for i, (name, kind, size, mtime, ino) in enumerate(entries):
+            if kind != KIND_FILE:
+                continue
+            new = _stat_entry(os.path.join(abs_dir, name), name)
+            if new != entries[i]:
+                entries[i] = new
+                self._dirty = True
+
+    def _to_listing(self, abs_dir, rel_dir, entries, ignore, touch_disk):
+        files: list = []
+        subdirs: list = []
+        skipped: list = []
+        for i, (name, kind, size, mtime, ino) in enumerate(entries):
+            rel = join_rel(rel_dir, name)
+            is_dir = kind in (KIND_DIR, KIND_DIR_LINK)
+            if ignore is not None and ignore(name, rel, is_dir):
+                skipped.append((rel, is_dir))
+                continue
+            abs_path = os.path.join(abs_dir, name)
+            if kind == KIND_DIR:
+                subdirs.append((name, abs_path, rel))
+            elif kind == KIND_FILE_LAZY and touch_disk:
+                entries[i] = _stat_entry(abs_path, name)
+                self._dirty = True
+                if entries[i][1] == KIND_FILE:
+                    files.append(FileEntry(name, rel, abs_path, *entries[i][2:]))
+            elif kind == KIND_FILE:
+                files.append(FileEntry(name, rel, abs_path, size, mtime, ino))
+        return DirListing(files, subdirs, skipped)
+
+
+def _stat_entry(path, name, dir_entry=None):
+    try:
+        st = dir_entry.stat() if dir_entry is not None else os.stat(path)
+    except OSError:
+        return (name, KIND_OTHER, None, None, None)
+    if not stat.S_ISREG(st.st_mode):
+        return (name, KIND_OTHER, None, None, None)
+    return (name, KIND_FILE, st.st_size, st.st_mtime, st.st_ino)
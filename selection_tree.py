@@ -0,0 +1,206 @@
+"""Pastas da varredura com contadores de arquivos e de selecionados.
+
+O estado da caixa de uma pasta no Explorador (marcada, parcial, desmarcada)
+dependia de um os.walk da pasta a cada redesenho, e o redesenho passa por
+todas as pastas da árvore. Aqui cada pasta guarda quantos arquivos tem abaixo
+dela (`total_files`) e quantos estão selecionados (`selected_files`); marcar
+ou desmarcar um arquivo só ajusta os contadores no caminho até a raiz, e o
+estado de qualquer pasta é uma consulta O(1), sem tocar no disco.
+
+SelectionSet é o conjunto de arquivos selecionados da interface: um set
+comum que repassa cada inclusão/remoção à SelectionTree, então qualquer
+código que mexe na seleção mantém os contadores certos.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Dict, Iterable, List, Optional
+
+CHECKED = "checked"
+PARTIAL = "partial"
+UNCHECKED = "unchecked"
+
+
+class DirCounts:
+    """Uma pasta: arquivos diretos, subpastas e os contadores de tudo abaixo dela."""
+
+    __slots__ = ("files", "dirs", "total_files", "selected_files")
+
+    def __init__(self):
+        self.files = set()
+        self.dirs = set()
+        self.total_files = 0
+        self.selected_files = 0
+
+    def state(self) -> str:
+        if self.selected_files == 0:
+            return UNCHECKED
+        return CHECKED if self.selected_files == self.total_files else PARTIAL
+
+
+class SelectionTree:
+    """
+    Modelo das pastas de `root` montado a partir da lista de arquivos da
+    varredura. Caminhos absolutos, como na lista; arquivos fora de `root`
+    são ignorados.
+    """
+
+    def __init__(self, root: Optional[str] = None, files: Iterable[str] = (),
+                 selected: Iterable[str] = ()):
+        self.reset(root, files, selected)
+
+    def reset(self, root: Optional[str], files: Iterable[str] = (),
+              selected: Iterable[str] = ()) -> None:
+        self.root = os.path.normpath(root) if root else None
+        self._dirs: Dict[str, DirCounts] = {}
+        if self.root is None:
+            return
+        self._prefix = self.root if self.root.endswith(os.sep) else self.root + os.sep
+        self._dirs[self.root] = DirCounts()
+        selected = set(selected)
+        for path in files:
+            self.add_file(path, path in selected)
+
+    def __contains__(self, path) -> bool:
+        """`path` é um arquivo conhecido."""
+        node = self._dirs.get(os.path.dirname(path))
+        return node is not None and path in node.files
+
+    def dir_counts(self, path) -> Optional[DirCounts]:
+        """Contadores da pasta `path`, ou None se ela não tem arquivos na varredura."""
+        return self._dirs.get(path)
+
+    def state(self, path, selected) -> str:
+        """Estado da caixa de `path` (pasta ou arquivo); `selected` é o conjunto selecionado."""
+        node = self._dirs.get(path)
+        if node is not None:
+            return node.state()
+        return CHECKED if path in selected else UNCHECKED
+
+    def _chain(self, path) -> Optional[List[str]]:
+        """Pastas de `path` até a raiz, da mais próxima para a raiz; None fora da raiz."""
+        if self.root is None or not path.startswith(self._prefix):
+            return None
+        chain = []
+        current = os.path.dirname(path)
+        while True:
+            chain.append(current)
+            if current == self.root:
+                return chain
+            parent = os.path.dirname(current)
+            if parent == current:
+                return None
+            current = parent
+
+    def add_file(self, path, selected: bool = False) -> None:
+        if path in self:
+            return
+        chain = self._chain(path)
+        if chain is None:
+            return
+        child = None
+        for dir_path in chain:
+            node = self._dirs.get(dir_path)
+            if node is None:
+                node = self._dirs[dir_path] = DirCounts()
+            if child is not None:
+                node.dirs.add(child)
+            node.total_files += 1
+            node.selected_files += selected
+            child = dir_path
+        self._dirs[chain[0]].files.add(path)
+
+    def remove_file(self, path, selected: bool = False) -> None:
+        if path not in self:
+            return
+        chain = self._chain(path)
+        self._dirs[chain[0]].files.discard(path)
+        for dir_path, parent in zip(chain, chain[1:] + [None]):
+            node = self._dirs[dir_path]
+            node.total_files -= 1
+            node.selected_files -= selected
+            if node.total_files == 0 and parent is not None:
+                # Pasta sem arquivos sai do modelo
+                del self._dirs[dir_path]
+                self._dirs[parent].dirs.discard(dir_path)
+
+    def set_selected(self, path, selected: bool) -> None:
+        """Ajusta os contadores até a raiz; quem chama garante que o estado mudou."""
+        if path not in self:
+            return
+        delta = 1 if selected else -1
+        for dir_path in self._chain(path):
+            self._dirs[dir_path].selected_files += delta
+
+    def files_under(self, path) -> List[str]:
+        """Arquivos conhecidos abaixo da pasta `path` (sem tocar no disco)."""
+        node = self._dirs.get(path)
+        if node is None:
+            return []
+        files = []
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            files.extend(node.files)
+            stack.extend(self._dirs[d] for d in node.dirs)
+        return files
+
+
+class SelectionSet(set):
+    """set da seleção que mantém `tree` (SelectionTree) em dia a cada mudança."""
+
+    def __init__(self, iterable=(), tree: Optional[SelectionTree] = None):
+        super().__init__(iterable)
+        self.tree = tree
+
+    def _changed(self, path, selected) -> None:
+        if self.tree is not None:
+            self.tree.set_selected(path, selected)
+
+    def add(self, path) -> None:
+        if path not in self:
+            super().add(path)
+            self._changed(path, True)
+
+    def discard(self, path) -> None:
+        if path in self:
+            super().discard(path)
+            self._changed(path, False)
+
+    def remove(self, path) -> None:
+        super().remove(path)
+        self._changed(path, False)
+
+    def clear(self) -> None:
+        removed = list(self)
+        super().clear()
+        for path in removed:
+            self._changed(path, False)
+
+    def update(self, *iterables) -> None:
+        for iterable in iterables:
+            for path in iterable:
+                self.add(path)
+
+    def difference_update(self, *iterables) -> None:
+        for iterable in iterables:
+            for path in list(iterable):
+                self.discard(path)
+
+    def intersection_update(self, *iterables) -> None:
+        keep = set(self).intersection(*iterables)
+        for path in [p for p in self if p not in keep]:
+            self.discard(path)
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def __isub__(self, other):
+        self.difference_update(other)
+        return self
+
+    def __iand__(self, other):
+        self.intersection_update(other)
+        return self
@@ -0,0 +1,355 @@
+"""Saída dividida em partes com orçamento de tamanho (tokens ou bytes).
+
+Quem consome o codigo_completo.txt costuma ter uma janela de contexto fixa.
+Com um orçamento, a saída vai para <stem>.part01.txt, <stem>.part02.txt...,
+na mesma passada que lê os arquivos: cada bloco é escrito na parte atual se
+couber, senão abre a próxima. As fronteiras caem sempre entre blocos; só um
+arquivo que sozinho não cabe em uma parte é cortado, em quebras de linha, em
+trechos com cabeçalho próprio. Cada parte tem cabeçalho e, no fim, a árvore
+só dos arquivos que contém (header_fn/footer_fn do chamador).
+
+Sem orçamento, o mesmo writer grava um único <stem>.txt, como antes
+(`extension` troca o .txt, conforme o formato da saída, ver output_format). Com
+`compression` ("gz"/"xz"), cada arquivo ganha a extensão e é comprimido em
+paralelo (compressed_output); o orçamento continua valendo para o texto.
+Com `index`, cada arquivo termina com o índice de bundle_index, depois da
+árvore; os deslocamentos são relativos à própria parte. Com `dedup`, um
+bloco igual a outro já escrito na mesma parte vira só um cabeçalho de
+referência (dedup): cada parte continua legível e restaurável sozinha.
+
+Os tamanhos são bytes UTF-8 antes da conversão de quebras de linha; tokens
+viram bytes pela razão bytes/token do chamador (BYTES_PER_TOKEN sem contagem). O orçamento inclui o cabeçalho e uma estimativa da árvore final.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from typing import Callable, Iterable, List, Optional, Union
+
+from bundle_index import TRAILER_OVERHEAD, IndexRecorder, entry_cost, position
+from compressed_output import open_text, suffix_for
+from dedup import ContentDeduper
+from passthrough import PassthroughBlock, write_block as write_passthrough_block
+
+BYTES_PER_TOKEN = 4
+READ_SIZE = 1 << 20
+
+
+def budget_bytes(max_tokens: Optional[int] = None, max_bytes: Optional[int] = None,
+                 bytes_per_token: float = BYTES_PER_TOKEN) -> Optional[int]:
+    """
+    Orçamento por parte em bytes: o menor dos limites dados, ou None (sem
+    divisão). `bytes_per_token` converte tokens em bytes; quem tem contagens
+    reais (token_counter) passa a razão medida nos arquivos selecionados.
+    """
+    limits = []
+    if max_tokens:
+        limits.append(int(max_tokens * bytes_per_token))
+    if max_bytes:
+        limits.append(max_bytes)
+    return min(limits) if limits else None
+
+
+def text_size(text: str) -> int:
+    """Bytes de `text` em UTF-8 (sem codificar quando é ASCII)."""
+    return len(text) if text.isascii() else len(text.encode("utf-8"))
+
+
+def _as_written(text: str) -> bytes:
+    """`text` como a escrita em modo texto grava (quebras de linha do SO)."""
+    if os.linesep != "\n":
+        text = text.replace("\n", os.linesep)
+    return text.encode("utf-8")
+
+
+def _tree_cost(key: str) -> int:
+    # Uma linha na árvore final: nome, recuo e pastas, em média
+    return len(key) + 8
+
+
+class ShardWriter:
+    """
+    Escreve blocos em partes de até `budget` bytes. `header_fn(parte)` e
+    `footer_fn(parte, chaves)` montam o começo e o fim de cada arquivo; `parte`
+    é None sem divisão. O rodapé pode vir em linhas (iterável), gravadas à
+    medida que são geradas. As chaves são as passadas a write_block (na ordem),
+    para a árvore local da parte.
+    """
+
+    def __init__(self, output_dir, stem: str, budget: Optional[int],
+                 header_fn: Callable[[Optional[int]], str],
+                 footer_fn: Callable[[Optional[int], List[str]], Union[str, Iterable[str]]],
+                 compression: Optional[str] = None, index: bool = False,
+                 dedup: bool = False, extension: str = ".txt"):
+        self.output_dir = output_dir
+        self.compression = compression
+        self.index = index
+        self.dedup = dedup
+        self.stem = stem
+        self.extension = extension
+        self.budget = budget
+        self.header_fn = header_fn
+        self.footer_fn = footer_fn
+        self.paths: List[str] = []
+        self.file = None
+        self._part = 0
+        self._used = 0
+        self._keys: List[str] = []
+        self._recorder: Optional[IndexRecorder] = None
+        self._deduper: Optional[ContentDeduper] = None
+        self._header_size = text_size(header_fn(1)) if budget is not None else 0
+        if index:
+            self._header_size += TRAILER_OVERHEAD
+
+    def part_path(self, part: Optional[int]) -> str:
+        name = (f"{self.stem}{self.extension}" if part is None
+                else f"{self.stem}.part{part:02d}{self.extension}")
+        return os.path.join(self.output_dir, name + suffix_for(self.compression))
+
+    def __enter__(self):
+        # O primeiro arquivo existe mesmo que nenhum bloco seja escrito
+        if self.file is None:
+            self._open_next()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        self._remove_stale_parts()
+
+    def _remove_stale_parts(self):
+        """Apaga partes de uma execução anterior que esta não regravou (ex.: part05 de 5)."""
+        pattern = re.compile(re.escape(self.stem) + r"\.part\d+" + re.escape(self.extension)
+                             + r"(\.gz|\.xz)?")
+        written = {os.path.basename(p) for p in self.paths}
+        try:
+            names = os.listdir(self.output_dir)
+        except OSError:
+            return
+        for name in names:
+            if pattern.fullmatch(name) and name not in written:
+                try:
+                    os.remove(os.path.join(self.output_dir, name))
+                except OSError:
+                    pass
+
+    def close(self) -> List[str]:
+        """Fecha a parte atual (escrevendo a árvore) e devolve os caminhos gerados."""
+        if self.file is not None:
+            footer = self.footer_fn(self._part or None, self._keys)
+            if isinstance(footer, str):
+                self.file.write(footer)
+            else:
+                self.file.writelines(footer)
+            if self._recorder is not None:
+                self._recorder.write_trailer(self.file)
+            self.file.close()
+            self.file = None
+        return self.paths
+
+    def _open_next(self):
+        self.close()
+        part = None
+        if self.budget is not None:
+            self._part += 1
+            part = self._part
+        path = self.part_path(part)
+        self.file = open_text(path, self.compression)
+        self.paths.append(path)
+        header = self.header_fn(part)
+        self.file.write(header)
+        self._used = text_size(header) + (TRAILER_OVERHEAD if self.index else 0)
+        self._keys = []
+        # newline=None: o índice mede o texto com as quebras de linha do SO, como gravado
+        self._recorder = IndexRecorder(newline=None) if self.index else None
+        self._deduper = ContentDeduper() if self.dedup else None
+
+    def _room(self) -> int:
+        return self.budget - self._used if self.budget is not None else -1
+
+    def _reserve(self, key: str, size: int):
+        """Garante uma parte aberta onde `size` bytes caibam (se couberem em alguma)."""
+        cost = size + self._key_cost(key)
+        if self.file is None or (self.budget is not None and self._keys
+                                 and cost > self._room()):
+            self._open_next()
+        self._used += cost
+        self._keys.append(key)
+        return cost
+
+    def _key_cost(self, key: str) -> int:
+        """Bytes do fim da parte por bloco: linha na árvore e, com índice, linha no índice."""
+        cost = _tree_cost(key)
+        if self.index:
+            cost += entry_cost(key)
+        return cost
+
+    def write_block(self, key: str, block, head: str = "", tail: str = "",
+                    piece_head: Optional[Callable[[int], str]] = None,
+                    path: Optional[str] = None,
+                    ref_head: Optional[Callable[[str], str]] = None) -> bool:
+        """
+        Escreve `block`: str, bytes (UTF-8, já com as quebras de linha do SO) ou
+        PassthroughBlock. Para str/bytes, `head`/`tail` dizem onde estão o
+        cabeçalho e o rodapé dentro do bloco. Com `piece_head(i)`, um bloco maior
+        que uma parte inteira é cortado em trechos (i = 1, 2, ...). `path` é o
+        caminho no índice (padrão: `key`). Com a deduplicação ligada e
+        `ref_head(primeiro)`, um conteúdo já escrito na parte vira só esse
+        cabeçalho de referência mais o rodapé. Retorna False, sem escrever nada,
+        se o arquivo de um PassthroughBlock mudou.
+        """
+        path = key if path is None else path
+        dedup = self._deduper if ref_head is not None else None
+        if isinstance(block, PassthroughBlock):
+            size = text_size(block.head) + block.span.length + text_size(block.tail)
+            if piece_head is not None and self._too_big(size):
+                return self._write_file_pieces(key, path, block, piece_head)
+            if dedup is not None:
+                first = dedup.find_span(block.path, block.span)
+                if first is not None and self._write_reference(key, path, first,
+                                                               ref_head(first) + block.tail):
+                    return True
+            cost = self._reserve(key, size)
+            if self._recorder is not None:
+                written = self._recorder.write_passthrough(self.file, path, block)
+            else:
+                written = write_passthrough_block(self.file, block)
+            if written:
+                if dedup is not None:
+                    self._deduper.add_span(path, block.path, block.span)
+                return True
+            self._used -= cost
+            self._keys.pop()
+            return False
+        if isinstance(block, bytes):
+            size = len(block)
+            if piece_head is not None and self._too_big(size):
+                block = block.decode("utf-8")
+                if os.linesep != "\n":
+                    block = block.replace(os.linesep, "\n")
+            else:
+                body = None
+                if dedup is not None:
+                    body = memoryview(block)[len(_as_written(head)):
+                                             len(block) - len(_as_written(tail))]
+                    first = dedup.find_bytes(body)
+                    if first is not None and self._write_reference(key, path, first,
+                                                                   ref_head(first) + tail):
+                        return True
+                self._reserve(key, size)
+                if body is not None:
+                    self._deduper.add_bytes(path, body)
+                if self._recorder is not None:
+                    self._recorder.write_bytes(self.file, path, block, head, tail)
+                    return True
+                self.file.flush()
+                self.file.buffer.write(block)
+                return True
+        size = text_size(block)
+        if piece_head is not None and self._too_big(size):
+            body = block[len(head):len(block) - len(tail)].encode("utf-8")
+            self._write_pieces(key, path, len(body), lambda pos, n: body[pos:pos + n],
+                               piece_head, tail, as_bytes=False)
+            return True
+        body = None
+        if dedup is not None:
+            body = _as_written(block[len(head):len(block) - len(tail)])
+            first = dedup.find_bytes(body)
+            if first is not None and self._write_reference(key, path, first,
+                                                           ref_head(first) + tail):
+                return True
+        self._reserve(key, size)
+        if body is not None:
+            self._deduper.add_bytes(path, body)
+        if self._recorder is not None:
+            self._recorder.write_text(self.file, path, block, head, tail)
+        else:
+            self.file.write(block)
+        return True
+
+    def _write_reference(self, key: str, path: str, first: str, text: str) -> bool:
+        """
+        Escreve o bloco de referência `text` na parte atual. False se ele não cabe
+        nela: em outra parte a primeira ocorrência não estaria, e o bloco vai inteiro.
+        """
+        cost = text_size(text) + self._key_cost(key)
+        if self.budget is not None and cost > self._room():
+            return False
+        self._used += cost
+        self._keys.append(key)
+        self.file.write(text)
+        if self._recorder is not None:
+            self._recorder.add_alias(path, first)
+        return True
+
+    def _too_big(self, size: int) -> bool:
+        """O bloco não cabe nem em uma parte vazia."""
+        return self.budget is not None and self._header_size + size > self.budget
+
+    def _write_file_pieces(self, key, path, block, piece_head) -> bool:
+        span = block.span
+        try:
+            src = open(block.path, "rb")
+        except OSError:
+            return False
+        with src:
+            st = os.fstat(src.fileno())
+            if st.st_size != span.size or st.st_mtime_ns != span.mtime_ns:
+                return False
+
+            def read(pos, n):
+                src.seek(span.offset + pos)
+                return src.read(n)
+
+            self._write_pieces(key, path, span.length, read, piece_head, block.tail,
+                               as_bytes=True)
+        return True
+
+    def _write_pieces(self, key, path, total, read, piece_head, tail, as_bytes):
+        """Corta o conteúdo em quebras de linha, um trecho por parte (o último pode dividir a parte)."""
+        pos = 0
+        i = 0
+        tail_size = text_size(tail)
+        while pos < total:
+            i += 1
+            head = piece_head(i)
+            frame = text_size(head) + tail_size + self._key_cost(key)
+            # Começa o trecho em uma parte nova se a atual não tem espaço útil
+            if self.file is None or (self._keys and self._room() < frame + 1):
+                self._open_next()
+            limit = max(1, self._room() - frame)
+            piece = read(pos, limit)
+            if pos + len(piece) < total:
+                cut = piece.rfind(b"\n")
+                if cut >= 0:
+                    piece = piece[:cut + 1]
+                else:
+                    # Linha maior que o orçamento: vai inteira
+                    while pos + len(piece) < total:
+                        more = read(pos + len(piece), READ_SIZE)
+                        nl = more.find(b"\n")
+                        if nl >= 0:
+                            piece += more[:nl + 1]
+                            break
+                        piece += more
+            pos += len(piece)
+            last = pos >= total
+            content = piece if last or not piece.endswith(b"\n") else piece[:-1]
+            self._used += frame + len(piece)
+            self._keys.append(key)
+            self.file.write(head)
+            start = position(self.file) if self._recorder is not None else 0
+            if as_bytes:
+                self.file.flush()
+                self.file.buffer.write(content)
+            else:
+                self.file.write(content.decode("utf-8"))
+            if self._recorder is not None:
+                # A quebra de linha do corte é a 1ª do rodapé: os trechos concatenados
+                # dão o conteúdo inteiro
+                cut = piece[len(content):].decode("utf-8")
+                data = content if as_bytes else self._recorder.encoded(content.decode("utf-8"))
+                self._recorder.add(path, start, data + self._recorder.encoded(cut))
+            self.file.write(tail)
+            if not last:
+                self._open_next()
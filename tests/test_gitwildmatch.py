@@ -0,0 +1,123 @@
+"""gitwildmatch.GitignoreSpec contra os resultados de pathspec (gitwildmatch)."""
+
+import random
+import warnings
+
+import pytest
+
+from gitwildmatch import GitignoreSpec
+
+# (regras, caminho, ignorado): resultados de pathspec.PathSpec.from_lines("gitwildmatch", ...)
+VECTORS = [
+    # Negação depois de "dir/**": o arquivo volta, mas a pasta em si casa com a regra
+    (["foo/**", "!foo/keep"], "foo/keep", False),
+    (["foo/**", "!foo/keep"], "foo/keep/x", False),
+    (["foo/**", "!foo/keep"], "foo/other", True),
+    (["foo/**", "!foo/keep"], "foo/", True),
+    (["foo/**", "!foo/keep"], "foo", False),
+    (["foo/**", "!foo/keep"], "bar/foo/x", False),
+    # Espaço no fim: só fica se escapado
+    (["trail\\ "], "trail ", True),
+    (["trail\\ "], "d/trail ", True),
+    (["trail\\ "], "trail", False),
+    (["trail "], "trail", True),
+    (["trail "], "trail ", False),
+    # Classes negadas
+    (["[!x]y"], "ay", True),
+    (["[!x]y"], "d/by", True),
+    (["[!x]y"], "xy", False),
+    (["[!x]y"], "y", False),
+    (["[^a].py"], "b.py", True),
+    (["[^a].py"], "a.py", False),
+    # "**" no meio: ancorado na raiz, zero ou mais pastas
+    (["a/**/b"], "a/b", True),
+    (["a/**/b"], "a/x/b", True),
+    (["a/**/b"], "a/x/y/b", True),
+    (["a/**/b"], "a/b/c", True),
+    (["a/**/b"], "c/a/b", False),
+    (["a/**/b"], "ab", False),
+    (["/a/**/b"], "a/x/b", True),
+    (["/a/**/b"], "z/a/x/b", False),
+    # Regras de nome, pasta e caminho
+    (["*.log", "!keep.log"], "a/x.log", True),
+    (["*.log", "!keep.log"], "d/keep.log", False),
+    (["build/"], "build/", True),
+    (["build/"], "src/build/x", True),
+    (["build/"], "build", False),
+    (["/build"], "build/x", True),
+    (["/build"], "src/build", False),
+    (["doc/*.txt"], "doc/a.txt", True),
+    (["doc/*.txt"], "doc/sub/a.txt", False),
+    (["doc/*.txt"], "x/doc/a.txt", False),
+    (["**/logs"], "a/logs/x", True),
+    (["logs/**"], "logs/x", True),
+    (["logs/**"], "logs", False),
+    (["logs/**"], "a/logs/x", False),
+    (["a?c"], "abc", True),
+    (["a?c"], "a/c", False),
+    (["*"], "a/b", True),
+    (["node_modules", "!node_modules/keep.js"], "node_modules/keep.js", False),
+    (["node_modules", "!node_modules/keep.js"], "node_modules/x", True),
+    # Escapes de "#" e "!", comentários e linhas vazias
+    (["\\#hash", "\\!bang"], "#hash", True),
+    (["\\#hash", "\\!bang"], "!bang", True),
+    (["# comment", ""], "# comment", False),
+]
+
+
+@pytest.mark.parametrize("rules, path, expected", VECTORS)
+def test_vectors(rules, path, expected):
+    assert GitignoreSpec(rules).match_file(path) is expected
+
+
+def test_dir_rule_with_negation_prunes_like_pathspec():
+    # Como pathspec (e diferente do git): "foo/**" casa com a pasta, que é podada
+    # mesmo com "!foo/keep"; o arquivo, consultado direto, não é ignorado
+    spec = GitignoreSpec(["foo/**", "!foo/keep"])
+    assert spec.is_ignored("foo", is_dir=True)
+    assert not spec.is_ignored("foo/keep")
+
+
+_ATOMS = ["a", "b", "foo", "*", "**", "?", "[ab]", "[!a]", "[^b]", "*.py", "x*", "\\*", "\\!",
+          ".", "", "a b", "c\\ "]
+_NAMES = ["a", "b", "foo", "x", "xy", "a.py", "b.py", ".hidden", "*", "!", "c ", "ab", "[ab]"]
+
+
+def _random_rule(rng):
+    rule = "/".join(rng.choice(_ATOMS) for _ in range(rng.randint(1, 4)))
+    if rng.random() < .2:
+        rule = "/" + rule
+    if rng.random() < .2:
+        rule += "/"
+    if rng.random() < .25:
+        rule = "!" + rule
+    if rng.random() < .05:
+        rule = "#" + rule
+    return rule
+
+
+def _random_path(rng):
+    path = "/".join(rng.choice(_NAMES) for _ in range(rng.randint(1, 5)))
+    return path + "/" if rng.random() < .3 else path
+
+
+def test_fuzz_parity_with_pathspec():
+    pathspec = pytest.importorskip("pathspec")
+    rng = random.Random(0)
+    mismatches = []
+    checked = 0
+    while checked < 12_000:
+        rules = [_random_rule(rng) for _ in range(rng.randint(1, 8))]
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                reference = pathspec.PathSpec.from_lines("gitwildmatch", rules)
+        except Exception:
+            continue    # regra que o pathspec recusa
+        spec = GitignoreSpec(rules)
+        for _ in range(30):
+            path = _random_path(rng)
+            checked += 1
+            if spec.match_file(path) != reference.match_file(path):
+                mismatches.append((rules, path))
+    assert not mismatches[:10]
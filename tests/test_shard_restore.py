@@ -0,0 +1,62 @@
+"""Saída dividida (shard_writer) -> restore_codefilecopier, com um arquivo maior que a parte."""
+
+import os
+
+import pytest
+
+from output_format import get_format
+from restore_codefilecopier import part_paths, restore_codefilecopier
+from shard_writer import ShardWriter
+
+BUDGET = 4000
+
+
+def _project():
+    big = "".join(f"linha {i:05d} " + "x" * (i % 50) + "\n" for i in range(400))
+    return {
+        "proj/a/x.py": "print('a')\n",
+        "proj/big.txt": big,
+        "proj/z.py": "fim = True",     # sem quebra de linha no fim
+    }
+
+
+def _write(tmp_path, files, index):
+    fmt = get_format("texto")
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+    writer = ShardWriter(str(out_dir), "codigo", BUDGET,
+                         header_fn=lambda part: f"Parte {part}\n\n",
+                         footer_fn=lambda part, keys: "\n==========================================\n"
+                                                      "Estrutura de pastas:\n"
+                                                      "==========================================\n"
+                                                      + "".join(k + "\n" for k in keys),
+                         index=index)
+    with writer:
+        for rel, content in files.items():
+            frame = fmt.frame(os.path.basename(rel), rel, "utf-8")
+            writer.write_block(rel, fmt.block(frame, content), frame.head, frame.tail,
+                               piece_head=frame.pieces)
+    return writer.paths
+
+
+@pytest.mark.parametrize("index", [False, True])
+def test_pieces_restore_across_parts(tmp_path, index):
+    files = _project()
+    paths = _write(tmp_path, files, index)
+    assert len(paths) > 2
+
+    restored = tmp_path / "restored"
+    n, warnings = restore_codefilecopier(part_paths(paths[0]), restored, verbose=False)
+
+    assert n == len(files)
+    assert not warnings
+    for rel, content in files.items():
+        assert (restored / rel).read_text(encoding="utf-8") == content
+
+
+def test_part_with_only_a_piece(tmp_path):
+    files = _project()
+    paths = _write(tmp_path, files, index=False)
+    n, warnings = restore_codefilecopier(paths[2], tmp_path / "restored", verbose=False)
+    assert n == 1
+    assert "trechos anteriores" in warnings[0]
@@ -0,0 +1,362 @@
+"""Contagem de tokens offline (BPE) com cache por conteúdo.
+
+`tamanho // 4` erra muito em código, e mais ainda com identificadores e
+strings em português (cada acento vira dois bytes e costuma quebrar a
+palavra em vários tokens). Aqui o texto é contado por um tokenizador BPE
+carregado do disco, sem rede:
+
+- arquivo .tiktoken (uma linha "<token em base64> <rank>" por token);
+- tokenizer.json do Hugging Face (modelo BPE byte-level, vocab + merges);
+- pasta com vocab.json + merges.txt (formato GPT-2).
+
+Sem arquivo configurado, EstimateTokenizer faz uma estimativa pela mesma
+pré-tokenização (palavras, números, pontuação, espaços), ainda bem melhor
+que bytes / 4.
+
+O texto é pré-tokenizado por regex e cada pedaço passa pelo merge de pares
+de menor rank; como código repete muito os mesmos identificadores, a contagem
+de cada pedaço fica em cache. TokenCounter guarda a contagem de cada arquivo
+pelo hash do conteúdo (blake2b de 128 bits, o mesmo do content_probe), então
+arquivos repetidos ou já vistos não são contados de novo, e o cache pode ser
+salvo em disco entre sessões.
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import os
+import re
+import threading
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+PIECE_CACHE_LIMIT = 200_000
+
+# Pré-tokenização no estilo cl100k, com o `re` da biblioteca padrão: [^\W\d_]
+# faz o papel de \p{L} e \d o de \p{N}
+CL100K_PATTERN = (r"(?i:'s|'t|'re|'ve|'m|'ll|'d)|(?:[^\r\n\w]|_)?[^\W\d_]+|\d{1,3}"
+                  r"| ?(?:[^\s\w]|_)+[\r\n]*|\s*[\r\n]+|\s+(?!\S)|\s+")
+GPT2_PATTERN = r"'s|'t|'re|'ve|'m|'ll|'d| ?[^\W\d_]+| ?\d+| ?(?:[^\s\w]|_)+|\s+(?!\S)|\s+"
+
+
+class Tokenizer:
+    """Interface: `count(text)` devolve o número de tokens de `text`."""
+
+    name = "tokenizer"
+
+    def count(self, text: str) -> int:
+        raise NotImplementedError
+
+
+class EstimateTokenizer(Tokenizer):
+    """Sem vocabulário: cada pedaço da pré-tokenização vale ~1 token a cada 4 bytes."""
+
+    name = "estimativa"
+
+    def __init__(self, pattern: str = CL100K_PATTERN):
+        self._split = re.compile(pattern).findall
+
+    def count(self, text: str) -> int:
+        return sum(1 + (len(piece.encode("utf-8")) - 1) // 4 if not piece.isascii()
+                   else 1 + (len(piece) - 1) // 4
+                   for piece in self._split(text))
+
+
+def _merge_count(parts: list, rank: Callable) -> int:
+    """Aplica os merges (sempre o par adjacente de menor rank) e conta as partes finais."""
+    while len(parts) > 1:
+        best = None
+        best_i = -1
+        for i in range(len(parts) - 1):
+            r = rank(parts[i], parts[i + 1])
+            if r is not None and (best is None or r < best):
+                best = r
+                best_i = i
+        if best is None:
+            break
+        parts[best_i:best_i + 2] = [parts[best_i] + parts[best_i + 1]]
+    return len(parts)
+
+
+class _BPETokenizer(Tokenizer):
+    """Base dos BPE: pré-tokenização por regex e cache da contagem de cada pedaço."""
+
+    def __init__(self, name: str, pattern: str):
+        self.name = name
+        self._split = re.compile(pattern).findall
+        self._pieces: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def count(self, text: str) -> int:
+        cache = self._pieces
+        total = 0
+        for piece in self._split(text):
+            n = cache.get(piece)
+            if n is None:
+                n = self._count_piece(piece)
+                if len(cache) >= PIECE_CACHE_LIMIT:
+                    with self._lock:
+                        cache.clear()
+                cache[piece] = n
+            total += n
+        return total
+
+    def _count_piece(self, piece: str) -> int:
+        raise NotImplementedError
+
+
+class RankBPETokenizer(_BPETokenizer):
+    """BPE por ranks de sequências de bytes (formato .tiktoken)."""
+
+    def __init__(self, ranks: Dict[bytes, int], name: str, pattern: str = CL100K_PATTERN):
+        super().__init__(name, pattern)
+        self._ranks = ranks
+
+    def _count_piece(self, piece: str) -> int:
+        data = piece.encode("utf-8")
+        if data in self._ranks:
+            return 1
+        ranks = self._ranks
+        return _merge_count([data[i:i + 1] for i in range(len(data))],
+                            lambda a, b: ranks.get(a + b))
+
+
+def _bytes_to_unicode() -> Dict[int, str]:
+    """Mapa byte -> caractere do BPE byte-level do GPT-2 (tokens legíveis no vocab)."""
+    visible = (list(range(ord("!"), ord("~") + 1)) + list(range(ord("¡"), ord("¬") + 1))
+               + list(range(ord("®"), ord("ÿ") + 1)))
+    mapping = {b: chr(b) for b in visible}
+    extra = 0
+    for b in range(256):
+        if b not in mapping:
+            mapping[b] = chr(256 + extra)
+            extra += 1
+    return mapping
+
+
+_BYTE_CHARS = _bytes_to_unicode()
+
+
+class MergesBPETokenizer(_BPETokenizer):
+    """BPE byte-level por lista de merges (Hugging Face / GPT-2)."""
+
+    def __init__(self, vocab: Dict[str, int], merges: List[Tuple[str, str]], name: str,
+                 pattern: str = GPT2_PATTERN):
+        super().__init__(name, pattern)
+        self._vocab = vocab
+        self._merges = {pair: i for i, pair in enumerate(merges)}
+
+    def _count_piece(self, piece: str) -> int:
+        chars = "".join(_BYTE_CHARS[b] for b in piece.encode("utf-8"))
+        if chars in self._vocab:
+            return 1
+        merges = self._merges
+        return _merge_count(list(chars), lambda a, b: merges.get((a, b)))
+
+
+def _parse_merges(lines: Iterable[str]) -> List[Tuple[str, str]]:
+    merges = []
+    for line in lines:
+        if isinstance(line, list):     # tokenizer.json recente: ["a", "b"]
+            merges.append((line[0], line[1]))
+            continue
+        if not line or line.startswith("#version"):
+            continue
+        left, _sep, right = line.rstrip("\n").partition(" ")
+        merges.append((left, right))
+    return merges
+
+
+def load_tokenizer(path) -> Tokenizer:
+    """
+    Carrega o tokenizador de `path` (.tiktoken, tokenizer.json ou pasta com
+    vocab.json + merges.txt). ValueError se o formato não é reconhecido.
+    """
+    path = os.fspath(path)
+    name = os.path.basename(os.path.normpath(path))
+    if os.path.isdir(path):
+        with open(os.path.join(path, "vocab.json"), encoding="utf-8") as f:
+            vocab = json.load(f)
+        with open(os.path.join(path, "merges.txt"), encoding="utf-8") as f:
+            merges = _parse_merges(f)
+        return MergesBPETokenizer(vocab, merges, name)
+    if path.endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        model = data.get("model") or {}
+        if model.get("type") != "BPE":
+            raise ValueError(f"tokenizer.json sem modelo BPE: {path}")
+        return MergesBPETokenizer(model["vocab"], _parse_merges(model["merges"]), name)
+    ranks = {}
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                token, rank = line.split()
+                ranks[base64.b64decode(token)] = int(rank)
+            except ValueError:
+                raise ValueError(f"Formato de tokenizador não reconhecido: {path}") from None
+    return RankBPETokenizer(ranks, name)
+
+
+def _decode(data: bytes) -> str:
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError:
+        return data.decode("latin-1")
+
+
+class TokenTotal(NamedTuple):
+    """Resultado de TokenCounter.total(), com os tamanhos do stat que ela já faz."""
+    tokens: int             # dos arquivos já contados
+    pending: list           # arquivos ainda sem contagem
+    size: int               # bytes de todos os arquivos existentes
+    counted_size: int       # bytes dos arquivos contados com tokens (razão bytes/token)
+    pending_size: int       # bytes dos arquivos pendentes (para a estimativa)
+
+    @property
+    def bytes_per_token(self) -> Optional[float]:
+        """Razão medida nos arquivos contados, ou None sem nenhum."""
+        return self.counted_size / self.tokens if self.tokens else None
+
+
+class TokenCounter:
+    """
+    Tokens por arquivo, em cache pelo hash do conteúdo. `cached(path)` só
+    consulta (não lê o disco além de um stat); `count_file` lê, conta e guarda.
+    `peek_total` nem faz o stat: usa a última contagem de cada caminho.
+    Seguro para uma thread contando enquanto a interface consulta.
+    """
+
+    def __init__(self, tokenizer: Optional[Tokenizer] = None):
+        self.tokenizer = tokenizer or EstimateTokenizer()
+        self._by_digest: Dict[str, int] = {}
+        self._by_stat: Dict[tuple, str] = {}   # (caminho, mtime_ns, tamanho) -> digest
+        self._by_path: Dict[str, str] = {}     # caminho -> digest da última contagem
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _stat_key(path) -> Optional[tuple]:
+        """(caminho, mtime_ns, tamanho), ou None se o arquivo não existe."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return path, st.st_mtime_ns, st.st_size
+
+    def _cached(self, key) -> Optional[int]:
+        digest = self._by_stat.get(key)
+        return self._by_digest.get(digest) if digest is not None else None
+
+    def cached(self, path) -> Optional[int]:
+        """Tokens de `path` se já contados para o conteúdo atual; senão None."""
+        key = self._stat_key(path)
+        return self._cached(key) if key is not None else None
+
+    def count_file(self, path, digest: Optional[str] = None) -> Optional[int]:
+        """
+        Tokens de `path` (binário = 0); None se não pôde ser lido. `digest` (o
+        FileFacts.digest, se houver) evita contar de novo um conteúdo já visto.
+        """
+        key = self._stat_key(path)
+        if key is None:
+            return None
+        if digest is not None and digest in self._by_digest:
+            with self._lock:
+                self._by_stat[key] = digest
+                self._by_path[path] = digest
+            return self._by_digest[digest]
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+        count = self._by_digest.get(digest)
+        if count is None:
+            count = 0 if b"\0" in data[:1024] else self.tokenizer.count(_decode(data))
+        with self._lock:
+            self._by_digest[digest] = count
+            self._by_stat[key] = digest
+            self._by_path[path] = digest
+        return count
+
+    def count_text(self, text: str) -> int:
+        return self.tokenizer.count(text)
+
+    def total(self, paths: Iterable) -> TokenTotal:
+        """
+        Tokens dos arquivos já contados e os ainda sem contagem, com os tamanhos
+        (um stat por arquivo). Arquivos que não existem mais ficam de fora.
+        """
+        tokens = size = counted_size = pending_size = 0
+        pending = []
+        for path in paths:
+            key = self._stat_key(path)
+            if key is None:
+                continue
+            file_size = key[2]
+            size += file_size
+            n = self._cached(key)
+            if n is None:
+                pending.append(path)
+                pending_size += file_size
+            else:
+                tokens += n
+                if n:
+                    counted_size += file_size
+        return TokenTotal(tokens, pending, size, counted_size, pending_size)
+
+    def peek_total(self, paths: Iterable) -> Tuple[int, list]:
+        """(tokens, pendentes) como total(), sem tocar no disco: um arquivo alterado
+        desde a última contagem vale a contagem antiga até ser contado de novo
+        (count_files)."""
+        tokens = 0
+        pending = []
+        for path in paths:
+            digest = self._by_path.get(path)
+            n = self._by_digest.get(digest) if digest is not None else None
+            if n is None:
+                pending.append(path)
+            else:
+                tokens += n
+        return tokens, pending
+
+    def count_files(self, paths: Iterable, cancel_event: Optional[threading.Event] = None,
+                    digest_of: Optional[Callable] = None) -> int:
+        """
+        Conta os arquivos ainda sem contagem (para uma thread de fundo).
+        `digest_of(path)` pode dar o hash já conhecido. Retorna quantos foram contados.
+        """
+        done = 0
+        for path in paths:
+            if cancel_event is not None and cancel_event.is_set():
+                break
+            if self.cached(path) is None and self.count_file(
+                    path, digest_of(path) if digest_of else None) is not None:
+                done += 1
+        return done
+
+    def load(self, cache_path) -> None:
+        """Carrega contagens salvas por save() com o mesmo tokenizador; ignora o resto."""
+        try:
+            with open(cache_path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if isinstance(data, dict) and data.get("tokenizer") == self.tokenizer.name:
+            counts = data.get("counts")
+            if isinstance(counts, dict):
+                with self._lock:
+                    self._by_digest.update(counts)
+
+    def save(self, cache_path) -> None:
+        with self._lock:
+            counts = dict(self._by_digest)
+        try:
+            with open(cache_path, "w", encoding="utf-8") as f:
+                json.dump({"tokenizer": self.tokenizer.name, "counts": counts}, f)
+        except OSError:
+            pass
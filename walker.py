@@ -0,0 +1,161 @@
+"""Varredura paralela de diretórios baseada em os.scandir.
+
+Motor único usado pelos três varredores do projeto (CodeFileCopier.py,
+copiador_de_codigo_tkinter_2.1.py e compactar_projeto.py). As leituras de
+diretório são distribuídas em um pool de threads, os dados de stat vêm do
+próprio DirEntry e o caminho relativo é montado durante a descida, sem
+chamadas a os.path.relpath / getsize / isdir por arquivo.
+
+A ordem dos registros é a mesma de os.walk(topdown=True): primeiro os arquivos
+de um diretório, depois cada subdiretório, recursivamente, na ordem de listagem.
+"""
+
+from __future__ import annotations
+
+import os
+import stat
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, NamedTuple, Optional
+
+# Leitura de diretório é limitada por I/O: mais threads que núcleos compensa.
+DEFAULT_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+# ignore(nome, caminho_relativo, is_dir) -> True para descartar o item.
+# Para diretórios, descartar significa não entrar nele (poda).
+IgnoreFn = Callable[[str, str, bool], bool]
+
+# lister(abs_dir, rel_dir, ignore, with_stat) -> DirListing; ver list_directory.
+ListerFn = Callable[..., "DirListing"]
+
+
+class FileEntry(NamedTuple):
+    """Metadados de um arquivo encontrado na varredura."""
+
+    name: str
+    rel_path: str            # relativo à raiz, sempre com '/'
+    abs_path: str            # os.path.join(diretório, nome), como no os.walk
+    size: Optional[int]      # None quando a varredura é feita sem stat
+    mtime: Optional[float]
+    inode: Optional[int]
+
+
+class DirListing(NamedTuple):
+    """Resultado da leitura de um único diretório."""
+
+    files: list
+    subdirs: list            # [(nome, caminho_absoluto, caminho_relativo)]
+    skipped: list            # [(caminho_relativo, is_dir)] descartados pelo ignore
+
+
+def join_rel(rel_dir: str, name: str) -> str:
+    return f"{rel_dir}/{name}" if rel_dir else name
+
+
+def list_directory(abs_dir: str, rel_dir: str, ignore: IgnoreFn | None = None,
+                   with_stat: bool = True) -> DirListing:
+    """Lê um diretório com os.scandir aplicando o filtro antes de qualquer stat.
+
+    Erros de permissão/IO no diretório resultam em listagem vazia (como os.walk).
+    Com with_stat=True, arquivos que não são regulares ou cujo stat falha
+    (links quebrados, FIFOs, sockets) são descartados.
+    """
+    files: list = []
+    subdirs: list = []
+    skipped: list = []
+    try:
+        it = os.scandir(abs_dir)
+    except OSError:
+        return DirListing(files, subdirs, skipped)
+    with it:
+        for entry in it:
+            name = entry.name
+            rel = join_rel(rel_dir, name)
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            if ignore is not None and ignore(name, rel, is_dir):
+                skipped.append((rel, is_dir))
+                continue
+            if is_dir:
+                # Assim como os.walk(followlinks=False): links para pastas não são seguidos.
+                try:
+                    if entry.is_symlink():
+                        continue
+                except OSError:
+                    continue
+                subdirs.append((name, entry.path, rel))
+                continue
+            if with_stat:
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                if not stat.S_ISREG(st.st_mode):
+                    continue
+                files.append(FileEntry(name, rel, entry.path, st.st_size, st.st_mtime, st.st_ino))
+            else:
+                files.append(FileEntry(name, rel, entry.path, None, None, None))
+    return DirListing(files, subdirs, skipped)
+
+
+def walk_files(root, ignore: IgnoreFn | None = None, *, with_stat: bool = True,
+               workers: int | None = None, cancel_event: threading.Event | None = None,
+               on_skip: Callable[[str, bool], None] | None = None,
+               lister: ListerFn | None = None) -> Iterator[FileEntry]:
+    """Percorre `root` em paralelo e gera FileEntry na ordem do os.walk.
+
+    Cada diretório aceito é enviado ao pool assim que é descoberto, então os
+    subdiretórios irmãos são lidos em paralelo enquanto o consumidor processa
+    os resultados anteriores. `on_skip(rel_path, is_dir)` é chamado na thread
+    consumidora, em ordem, para cada item descartado pelo `ignore`.
+    Interromper a iteração (ou sinalizar `cancel_event`) cancela o trabalho
+    pendente. `lister` substitui list_directory (ex.: ScanIndex.list_directory,
+    que reaproveita listagens de pastas não modificadas).
+    """
+    root = os.fspath(root)
+    lister = lister or list_directory
+    stop = threading.Event()
+
+    def cancelled():
+        return stop.is_set() or (cancel_event is not None and cancel_event.is_set())
+
+    pool = ThreadPoolExecutor(max_workers=workers or DEFAULT_WORKERS,
+                              thread_name_prefix="walker")
+
+    def read_dir(abs_dir, rel_dir):
+        if cancelled():
+            return DirListing([], [], []), []
+        listing = lister(abs_dir, rel_dir, ignore, with_stat)
+        children = []
+        for _name, child_abs, child_rel in listing.subdirs:
+            try:
+                children.append(pool.submit(read_dir, child_abs, child_rel))
+            except RuntimeError:
+                break  # pool encerrado: varredura cancelada
+        return listing, children
+
+    try:
+        stack = [iter([pool.submit(read_dir, root, "")])]
+        while stack:
+            future = next(stack[-1], None)
+            if future is None:
+                stack.pop()
+                continue
+            if cancelled():
+                return
+            listing, children = future.result()
+            if on_skip is not None:
+                for rel, is_dir in listing.skipped:
+                    on_skip(rel, is_dir)
+            for entry in listing.files:
+                # Cancelamento vale também no meio de uma pasta com muitos arquivos
+                if cancel_event is not None and cancel_event.is_set():
+                    return
+                yield entry
+            if children:
+                stack.append(iter(children))
+    finally:
+        stop.set()
+        pool.shutdown(wait=False, cancel_futures=True)